@@ -0,0 +1,177 @@
+"""Бенчмарки конвейера анализа на синтетических графах
+
+Пример: python benchmarks/run_benchmarks.py --sizes 10,1000,100000 --output bench.json
+Сравнение с прошлым запуском: --compare bench_prev.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from dependency_graph import DependencyGraph
+from dependency_parser import DependencyParser
+from graph_diff import diff_graphs
+from png_visualizer import PNGVisualizer
+from synthetic_graphs import GENERATORS, generate, node_name, write_edge_list
+from visualizer import GraphVisualizer
+
+DEFAULT_SIZES = [10, 1000, 100000]
+# Во сколько раз этап может замедлиться, прежде чем это считается регрессией
+REGRESSION_FACTOR = 1.2
+# Отрисовка замеряется только на графах не больше этого размера
+RENDER_MAX_SIZE = 10000
+
+
+def timed(results, shape, size, edges, phase, func):
+    """Выполняет func с подавленным выводом и записывает длительность"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - started
+    results.append({'shape': shape, 'size': size, 'edges': edges, 'phase': phase, 'seconds': elapsed})
+    print(f"  {phase:<24} {elapsed:10.4f} с")
+    return value
+
+
+def benchmark_graph(shape, size, seed, max_depth, workdir):
+    """Замеряет все этапы конвейера на одном графе"""
+    adjacency = generate(shape, size, seed)
+    edges = sum(len(deps) for deps in adjacency)
+    print(f"{shape}: {size} узлов, {edges} ребер")
+
+    path = os.path.join(workdir, f"{shape}_{size}.edges")
+    write_edge_list(adjacency, path)
+
+    config = Config()
+    config.package_name = node_name(0)
+    config.test_mode = True
+    config.test_repo_path = path
+    config.test_repo_format = 'edges'
+    config.max_depth = max_depth
+
+    results = []
+    graph = DependencyGraph(config)
+    timed(results, shape, size, edges, 'build_graph', graph.build_graph)
+    timed(results, shape, size, edges, 'cycle_detection', graph.find_cycle_groups)
+    snapshot_path = os.path.join(workdir, f"{shape}_{size}.snap")
+    timed(results, shape, size, edges, 'snapshot_save', lambda: graph.save_snapshot(snapshot_path))
+    timed(results, shape, size, edges, 'snapshot_load',
+          lambda: DependencyGraph(config).load_snapshot(snapshot_path))
+
+    # Как после синхронизации реестра: у 1% пакетов меняется по одной зависимости
+    changed = DependencyGraph(config)
+    changed.load_snapshot(snapshot_path)
+    for node in range(1, size, 100):
+        dependencies = changed.graph.get(node_name(node), [])
+        if dependencies:
+            changed.remove_dependency(node_name(node), dependencies[0])
+        changed.add_dependency(node_name(node), node_name(size - 1 - node % 50))
+    changed.find_cycle_groups(report=False)
+    timed(results, shape, size, edges, 'graph_diff', lambda: diff_graphs(graph, changed))
+
+    # Самые глубокие пакеты: у них больше всего обратных зависимостей
+    targets = [node_name(node) for node in range(max(0, size - 100), size)]
+    timed(results, shape, size, edges, 'reverse_single',
+          lambda: graph.find_transitive_reverse_dependencies(targets[0]))
+    # Повторная установка хранилища сбрасывает кеши: пакетный запрос считается с нуля
+    graph.store = graph.store
+    timed(results, shape, size, edges, 'reverse_batch_100',
+          lambda: graph.find_transitive_reverse_dependencies_batch(targets))
+
+    visualizer = GraphVisualizer(graph)
+    timed(results, shape, size, edges, 'mermaid', visualizer.generate_mermaid_graph)
+    if size <= RENDER_MAX_SIZE:
+        renderer = PNGVisualizer(graph)
+        timed(results, shape, size, edges, 'render_layout', lambda: renderer.layout)
+        timed(results, shape, size, edges, 'render_svg',
+              lambda: renderer.render_svg(os.path.join(workdir, 'graph.svg'), targets[0]))
+        timed(results, shape, size, edges, 'render_png',
+              lambda: renderer.render_png(os.path.join(workdir, 'graph.png'), targets[0]))
+
+    parser = DependencyParser(config)
+    parser.dependency_cache.update(graph.graph)
+    timed(results, shape, size, edges, 'tree_printer',
+          lambda: parser.print_dependency_tree(config.package_name, io.StringIO()))
+
+    os.remove(path)
+    os.remove(snapshot_path)
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, shapes, seed=0, max_depth=10):
+    """Запускает бенчмарки и возвращает результаты в виде словаря"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for shape in shapes:
+            for size in sizes:
+                results.extend(benchmark_graph(shape, size, seed, max_depth, workdir))
+
+    return {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(report, previous):
+    """Печатает этапы, замедлившиеся относительно прошлого запуска"""
+    before = {(r['shape'], r['size'], r['phase']): r['seconds'] for r in previous['results']}
+    regressions = 0
+    for result in report['results']:
+        key = (result['shape'], result['size'], result['phase'])
+        if key in before and result['seconds'] > before[key] * REGRESSION_FACTOR:
+            regressions += 1
+            print(f"⚠️ Регрессия {key}: {before[key]:.4f} с -> {result['seconds']:.4f} с")
+    if regressions == 0:
+        print("✅ Регрессий не обнаружено")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки анализа зависимостей")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="размеры графов через запятую (до 1000000)")
+    parser.add_argument('--shapes', default=','.join(GENERATORS), help="формы графов через запятую")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-depth', type=int, default=10)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="JSON прошлого запуска для поиска регрессий")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    shapes = args.shapes.split(',')
+    report = run_benchmarks(sizes, shapes, args.seed, args.max_depth)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nРезультаты сохранены в {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare(report, previous):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
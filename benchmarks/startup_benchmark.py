@@ -0,0 +1,107 @@
+"""Время запуска командной строки: от старта процесса до первой строки вывода
+
+Пример: python benchmarks/startup_benchmark.py --runs 20 --output startup.json
+Запуск завершается с ошибкой, если медиана какой-либо команды больше --target мс.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'main.py')
+# Команды, не обращающиеся к сети: для них и ставится цель по времени запуска
+COMMANDS = {
+    'help': ['--help'],
+    'config': ['config'],
+    'graph': ['graph'],
+    'reverse': ['reverse', 'C'],
+}
+TEST_REPO = "A\nB\nC\n\nB\nD\n\nC\nE\nF\n\nE\nC\n\nF\nG\n"
+
+
+def first_output_time(argv, cwd):
+    """Секунды до первой строки stdout и полное время работы процесса"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN] + argv, cwd=cwd, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    process.stdout.readline()
+    first = time.perf_counter() - started
+    process.communicate()
+    total = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError(f"Команда {' '.join(argv)} завершилась с кодом {process.returncode}")
+    return first, total
+
+
+def interpreter_startup():
+    """Время запуска пустого интерпретатора - нижняя граница для любой команды"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.perf_counter() - started
+
+
+def imported_modules(argv, cwd):
+    """Модули проекта и тяжелые зависимости, загруженные командой (по -X importtime)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', MAIN] + argv, cwd=cwd,
+                            capture_output=True, text=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip())
+    return sorted(modules & {'requests', 'sqlite3', 'dependency_parser', 'dependency_graph',
+                             'visualizer', 'crates_fetcher', 'http.server'})
+
+
+def run(runs):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, 'repo.txt'), 'w', encoding='utf-8') as f:
+            f.write(TEST_REPO)
+        with open(os.path.join(workdir, 'config.csv'), 'w', encoding='utf-8') as f:
+            f.write("package_name,test_mode,test_repo_path\nA,true,repo.txt\n")
+
+        for name, argv in COMMANDS.items():
+            # Первый запуск прогревает кеш байткода и файловой системы
+            first_output_time(argv, workdir)
+            samples = [first_output_time(argv, workdir) for _ in range(runs)]
+            result = {
+                'command': name,
+                'first_output_ms': statistics.median(first for first, _ in samples) * 1000,
+                'total_ms': statistics.median(total for _, total in samples) * 1000,
+                'imports': imported_modules(argv, workdir),
+            }
+            results.append(result)
+            print(f"  {name:<10} первая строка {result['first_output_ms']:7.1f} мс, "
+                  f"всего {result['total_ms']:7.1f} мс; {', '.join(result['imports']) or '-'}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска командной строки")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--target', type=float, default=100.0, help="цель для первой строки, мс")
+    parser.add_argument('--output', help="JSON с результатами")
+    args = parser.parse_args()
+
+    baseline = min(interpreter_startup() for _ in range(3))
+    print(f"Пустой запуск интерпретатора: {baseline * 1000:.1f} мс")
+    results = run(args.runs)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version, 'interpreter_ms': baseline * 1000, 'results': results}, f, indent=2)
+        print(f"\nРезультаты сохранены в {args.output}")
+
+    slow = [r['command'] for r in results if r['first_output_ms'] > args.target]
+    if slow:
+        print(f"⚠️ Дольше {args.target:.0f} мс до первой строки: {', '.join(slow)}")
+        sys.exit(1)
+    print(f"✅ Все команды выводят первую строку быстрее {args.target:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
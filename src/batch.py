@@ -0,0 +1,176 @@
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import Config
+from dependency_graph import DependencyGraph
+from dependency_parser import DependencyParser
+from graph_algorithms import find_cycle_groups
+from metrics import METRICS
+
+
+class RootSummary(NamedTuple):
+    """Итог анализа одного корневого пакета в пакетном режиме"""
+    package: str
+    node: str
+    packages: int
+    edges: int
+    cycle_groups: int
+    # Сколько пакетов пришлось загрузить впервые; остальные взяты из уже разобранных поддеревьев
+    new_packages: int
+    seconds: float
+    error: str = ''
+
+
+def _reachable(adjacency: Dict[str, List[str]], root: str, max_depth: int) -> Dict[str, List[str]]:
+    """Подграф, достижимый из корня не глубже max_depth: раскрытые узлы и их ребра"""
+    subgraph = {}
+    frontier = [root]
+    seen = {root}
+    depth = 0
+    while frontier and depth < max_depth:
+        next_frontier = []
+        for package in frontier:
+            dependencies = adjacency.get(package, [])
+            subgraph[package] = dependencies
+            for dep in dependencies:
+                if dep not in seen:
+                    seen.add(dep)
+                    next_frontier.append(dep)
+        frontier = next_frontier
+        depth += 1
+    # Листья на границе глубины входят в граф без ребер
+    for package in frontier:
+        subgraph.setdefault(package, [])
+    return subgraph
+
+
+def analyze_roots(configs: Sequence[Config]) -> Tuple[List[RootSummary], Dict[str, List[str]]]:
+    """Разбирает корни по очереди одним парсером, чтобы общие поддеревья загружались один раз
+
+    Все конфигурации должны иметь одинаковый source_key(). Функция верхнего
+    уровня, поэтому ее можно отправить в пул процессов.
+    """
+    parser = DependencyParser(configs[0])
+    summaries = []
+    try:
+        for config in configs:
+            before = len(parser.dependency_cache)
+            started = time.perf_counter()
+            # Глубина и имя берутся из своей строки CSV, источник ребер - общий
+            parser.config = config
+            try:
+                node = parser.resolve_dependencies(config.package_name, config.max_depth)
+            except Exception as e:
+                summaries.append(RootSummary(config.package_name, config.package_name, 0, 0, 0,
+                                             len(parser.dependency_cache) - before,
+                                             time.perf_counter() - started, str(e)))
+                METRICS.increment('batch.errors')
+                continue
+            subgraph = _reachable(parser.dependency_cache, node, config.max_depth)
+            summaries.append(RootSummary(
+                config.package_name, node, len(subgraph),
+                sum(len(deps) for deps in subgraph.values()),
+                len(find_cycle_groups(subgraph)),
+                max(0, len(parser.dependency_cache) - before),
+                time.perf_counter() - started,
+            ))
+            METRICS.increment('batch.roots')
+    finally:
+        parser.close()
+    return summaries, dict(parser.dependency_cache)
+
+
+def _chunks(items: List[Tuple[int, Config]], count: int) -> List[List[Tuple[int, Config]]]:
+    """Делит корни на count непрерывных частей: соседние строки CSV часто делят поддеревья"""
+    size = -(-len(items) // count)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def run_batch(configs: Sequence[Config],
+              workers: Optional[int] = None) -> Tuple[List[RootSummary], DependencyGraph]:
+    """Анализирует все корни и строит из их зависимостей один общий граф
+
+    Корни с одинаковыми настройками источника разбираются общим парсером.
+    При workers > 1 каждая такая группа делится между процессами; каждый
+    процесс переиспользует поддеревья только внутри своей части.
+    Сводки возвращаются в порядке строк CSV.
+    """
+    if not configs:
+        raise ValueError("Нет корневых пакетов для анализа")
+    if workers is None:
+        workers = configs[0].batch_workers
+
+    groups: Dict[tuple, List[Tuple[int, Config]]] = {}
+    for position, config in enumerate(configs):
+        groups.setdefault(config.source_key(), []).append((position, config))
+
+    tasks = []
+    for items in groups.values():
+        for chunk in _chunks(items, min(workers, len(items))):
+            tasks.append(chunk)
+
+    summaries: List[Optional[RootSummary]] = [None] * len(configs)
+    adjacency: Dict[str, List[str]] = {}
+
+    def collect(chunk, result):
+        chunk_summaries, chunk_adjacency = result
+        for (position, _), summary in zip(chunk, chunk_summaries):
+            summaries[position] = summary
+        for package, dependencies in chunk_adjacency.items():
+            adjacency.setdefault(package, dependencies)
+
+    with METRICS.span('batch.resolve'):
+        if workers > 1 and len(tasks) > 1:
+            # multiprocessing заметно удлиняет запуск, поэтому импортируется только здесь
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                futures = [pool.submit(analyze_roots, [config for _, config in chunk]) for chunk in tasks]
+                for chunk, future in zip(tasks, futures):
+                    collect(chunk, future.result())
+        else:
+            for chunk in tasks:
+                collect(chunk, analyze_roots([config for _, config in chunk]))
+
+    with METRICS.span('graph.build'):
+        graph = DependencyGraph(configs[0])
+        graph.graph = adjacency
+        graph.find_cycle_groups(report=False)
+    METRICS.gauge('graph.nodes', graph.store.node_count)
+    METRICS.gauge('graph.edges', graph.store.edge_count)
+    return summaries, graph
+
+
+def print_batch_summary(summaries: Sequence[RootSummary], graph: DependencyGraph) -> None:
+    """Таблица по корневым пакетам и итог по общему графу"""
+    print(f"\n📦 ПАКЕТНЫЙ АНАЛИЗ: {len(summaries)} корневых пакетов")
+    print("-" * 78)
+    print(f"{'Пакет':<32} {'пакетов':>8} {'ребер':>8} {'циклов':>7} {'новых':>7} {'время, с':>10}")
+    for summary in summaries:
+        if summary.error:
+            print(f"{summary.node:<32} ❌ {summary.error}")
+            continue
+        print(f"{summary.node:<32} {summary.packages:>8} {summary.edges:>8} {summary.cycle_groups:>7} "
+              f"{summary.new_packages:>7} {summary.seconds:>10.3f}")
+    print("-" * 78)
+
+    store = graph.store
+    reused = sum(summary.packages for summary in summaries) - sum(summary.new_packages for summary in summaries)
+    print(f"Общий граф: {store.node_count} пакетов, {store.edge_count} ребер, "
+          f"групп циклов: {len(graph.cycle_groups)}")
+    print(f"Переиспользовано уже разобранных пакетов: {max(0, reused)}")
+
+
+def load_graph(config: Config) -> DependencyGraph:
+    """Граф одного корня: из снимка, тестового репозитория или реестра"""
+    if config.test_mode:
+        graph = DependencyGraph(config)
+        graph.build_graph()
+        return graph
+    graph = DependencyGraph(config)
+    if graph.load_fresh_snapshot():
+        return graph
+
+    _, graph = run_batch([config], workers=1)
+    if config.snapshot_path:
+        graph.save_snapshot(config.snapshot_path)
+    return graph
@@ -1,34 +1,72 @@
 import csv
+from typing import List
 
 class Config:
+    # Допустимые источники зависимостей для рабочего режима
+    DEPENDENCY_SOURCES = ['crates_io', 'local_index']
+    # dag - каждое поддерево печатается один раз, full - полное развертывание
+    TREE_MODES = ['dag', 'full']
+    # blocks - пакет и его зависимости блоками, edges - "пакет зависимость ..." в строке
+    TEST_REPO_FORMATS = ['blocks', 'edges']
+    # Виды зависимостей Cargo: обычные, сборочные (build.rs) и для разработки
+    DEPENDENCY_KINDS = ['normal', 'build', 'dev']
+    
     def __init__(self):
         self.package_name = ""
         self.test_mode = False
         self.test_repo_path = ""
+        self.test_repo_format = "blocks"
         self.max_depth = 3
+        self.tree_mode = "dag"
         self.repository_url = ""
+        # Источник зависимостей и путь к локальной копии индекса реестра
+        self.dependency_source = "crates_io"
+        self.index_path = ""
+        # Параметры загрузки с crates.io
+        self.registry_url = "https://crates.io"
+        # Sparse-индекс со списками версий и фичами; пусто - index.crates.io для crates.io,
+        # иначе <registry_url>/index
+        self.sparse_index_url = ""
+        self.max_workers = 8
+        self.max_retries = 3
+        self.retry_backoff = 0.5
+        self.request_timeout = 10.0
+        # Дисковый кеш ответов реестра (пустой путь - кеш отключен)
+        self.cache_path = ""
+        self.cache_ttl = 86400.0
+        self.cache_max_entries = 100000
+        self.offline = False
+        # Конфигурация сборки: какие ребра попадают в граф
+        self.dependency_kinds = ['normal']
+        self.features = []
+        self.default_features = True
+        self.all_features = False
+        # Целевая платформа (например x86_64-unknown-linux-gnu); пусто - все платформы
+        self.target = ""
+        # Тихий режим: без сообщений по отдельным пакетам; файл для выгрузки метрик
+        self.quiet = False
+        self.metrics_path = ""
+        # Пакетный режим: число процессов, между которыми делятся корневые пакеты
+        self.batch_workers = 1
+        # Обход всего реестра: файл снимка ребер, файл контрольной точки,
+        # лимит запросов в секунду (0 - без лимита) и размер страницы списка пакетов
+        self.crawl_output = ""
+        self.checkpoint_path = ""
+        self.rate_limit = 0.0
+        self.rate_burst = 10
+        self.crawl_page_size = 100
+        # Двоичный снимок графа: загружается вместо разбора, если данные не менялись
+        self.snapshot_path = ""
+        # Адрес сервера запросов: "127.0.0.1:8765" или "unix:/путь/к/сокету"; пусто - без сервера
+        self.serve_address = ""
     
     def load_from_csv(self, filename: str):
-        """Загружает конфигурацию из CSV файла"""
+        """Загружает конфигурацию из CSV файла (при нескольких строках действует последняя)"""
         try:
             with open(filename, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
                 for row in reader:
-                    self.package_name = row.get('package_name', '').strip()
-                    
-                    # Обрабатываем test_mode
-                    test_mode_str = row.get('test_mode', '').strip().lower()
-                    self.test_mode = test_mode_str in ['true', '1', 'yes', 'да']
-                    
-                    self.test_repo_path = row.get('test_repo_path', '').strip()
-                    self.repository_url = row.get('repository_url', '').strip()
-                    
-                    # Обрабатываем max_depth
-                    max_depth_str = row.get('max_depth', '').strip()
-                    if max_depth_str:
-                        self.max_depth = int(max_depth_str)
-                    else:
-                        self.max_depth = 3
+                    self.apply_row(row)
                     
             print("✅ Конфигурация загружена из config.csv")
             
@@ -36,6 +74,138 @@ class Config:
             print(f"❌ Ошибка загрузки конфигурации: {e}")
             raise
     
+    @classmethod
+    def load_all(cls, filename: str) -> List['Config']:
+        """Загружает все строки CSV: каждая строка - отдельный корневой пакет для пакетного режима"""
+        try:
+            configs = []
+            with open(filename, 'r', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    config = cls()
+                    config.apply_row(row)
+                    configs.append(config)
+            if not configs:
+                raise ValueError(f"В {filename} нет ни одной строки с пакетом")
+            
+            print(f"✅ Конфигурация загружена из {filename} (корневых пакетов: {len(configs)})")
+            return configs
+            
+        except Exception as e:
+            print(f"❌ Ошибка загрузки конфигурации: {e}")
+            raise
+    
+    def apply_row(self, row: dict) -> None:
+        """Применяет одну строку CSV; пустые необязательные колонки оставляют значения по умолчанию"""
+        self.package_name = row.get('package_name', '').strip()
+        
+        # Обрабатываем test_mode
+        test_mode_str = row.get('test_mode', '').strip().lower()
+        self.test_mode = test_mode_str in ['true', '1', 'yes', 'да']
+        
+        self.test_repo_path = row.get('test_repo_path', '').strip()
+        test_repo_format = (row.get('test_repo_format') or '').strip().lower()
+        if test_repo_format:
+            if test_repo_format not in self.TEST_REPO_FORMATS:
+                raise ValueError(f"Неизвестный формат тестового репозитория: {test_repo_format}")
+            self.test_repo_format = test_repo_format
+        self.repository_url = row.get('repository_url', '').strip()
+        
+        # Обрабатываем max_depth
+        max_depth_str = row.get('max_depth', '').strip()
+        if max_depth_str:
+            self.max_depth = int(max_depth_str)
+        else:
+            self.max_depth = 3
+        
+        tree_mode = (row.get('tree_mode') or '').strip().lower()
+        if tree_mode:
+            if tree_mode not in self.TREE_MODES:
+                raise ValueError(f"Неизвестный режим дерева: {tree_mode}")
+            self.tree_mode = tree_mode
+        
+        dependency_source = (row.get('dependency_source') or '').strip().lower()
+        if dependency_source:
+            if dependency_source not in self.DEPENDENCY_SOURCES:
+                raise ValueError(f"Неизвестный источник зависимостей: {dependency_source}")
+            self.dependency_source = dependency_source
+        index_path = (row.get('index_path') or '').strip()
+        if index_path:
+            self.index_path = index_path
+        if self.dependency_source == 'local_index' and not self.index_path:
+            raise ValueError("Для источника local_index нужно указать index_path")
+        
+        # Параметры сетевой загрузки (необязательные колонки)
+        registry_url = (row.get('registry_url') or '').strip()
+        if registry_url:
+            self.registry_url = registry_url
+        self.sparse_index_url = (row.get('sparse_index_url') or '').strip() or self.sparse_index_url
+        self.max_workers = self._parse_number(row, 'max_workers', self.max_workers, int)
+        self.max_retries = self._parse_number(row, 'max_retries', self.max_retries, int)
+        self.retry_backoff = self._parse_number(row, 'retry_backoff', self.retry_backoff, float)
+        self.request_timeout = self._parse_number(row, 'request_timeout', self.request_timeout, float)
+        
+        cache_path = (row.get('cache_path') or '').strip()
+        if cache_path:
+            self.cache_path = cache_path
+        self.cache_ttl = self._parse_number(row, 'cache_ttl', self.cache_ttl, float)
+        self.cache_max_entries = self._parse_number(row, 'cache_max_entries', self.cache_max_entries, int)
+        self.offline = self._parse_bool(row, 'offline', self.offline)
+        
+        self.dependency_kinds = self._parse_list(row, 'dependency_kinds', self.dependency_kinds)
+        for kind in self.dependency_kinds:
+            if kind not in self.DEPENDENCY_KINDS:
+                raise ValueError(f"Неизвестный вид зависимостей: {kind}")
+        self.features = self._parse_list(row, 'features', self.features)
+        self.default_features = self._parse_bool(row, 'default_features', self.default_features)
+        self.all_features = self._parse_bool(row, 'all_features', self.all_features)
+        self.target = (row.get('target') or '').strip() or self.target
+        self.quiet = self._parse_bool(row, 'quiet', self.quiet)
+        self.metrics_path = (row.get('metrics_path') or '').strip() or self.metrics_path
+        
+        self.batch_workers = self._parse_number(row, 'batch_workers', self.batch_workers, int)
+        self.crawl_output = (row.get('crawl_output') or '').strip() or self.crawl_output
+        self.checkpoint_path = (row.get('checkpoint_path') or '').strip() or self.checkpoint_path
+        self.rate_limit = self._parse_number(row, 'rate_limit', self.rate_limit, float)
+        self.rate_burst = self._parse_number(row, 'rate_burst', self.rate_burst, int)
+        self.crawl_page_size = self._parse_number(row, 'crawl_page_size', self.crawl_page_size, int)
+        self.snapshot_path = (row.get('snapshot_path') or '').strip() or self.snapshot_path
+        self.serve_address = (row.get('serve_address') or '').strip() or self.serve_address
+        
+        if self.max_workers < 1:
+            raise ValueError("max_workers должен быть не меньше 1")
+        if self.batch_workers < 1:
+            raise ValueError("batch_workers должен быть не меньше 1")
+        if self.rate_limit < 0 or self.rate_burst < 1 or self.crawl_page_size < 1:
+            raise ValueError("rate_limit не может быть отрицательным, rate_burst и crawl_page_size - меньше 1")
+    
+    def source_key(self) -> tuple:
+        """Настройки, от которых зависят ребра графа: корни с одинаковым ключом делят один парсер"""
+        return (self.test_mode, self.dependency_source, self.index_path, self.registry_url,
+                self.sparse_index_url, self.cache_path, self.offline, tuple(self.dependency_kinds),
+                tuple(self.features), self.default_features, self.all_features, self.target)
+    
+    @staticmethod
+    def _parse_number(row: dict, key: str, default, cast):
+        """Читает числовой параметр из строки CSV, пустое значение - значение по умолчанию"""
+        value = (row.get(key) or '').strip()
+        if not value:
+            return default
+        return cast(value)
+    
+    @staticmethod
+    def _parse_bool(row: dict, key: str, default: bool) -> bool:
+        """Читает логический параметр из строки CSV"""
+        value = (row.get(key) or '').strip().lower()
+        if not value:
+            return default
+        return value in ['true', '1', 'yes', 'да']
+    
+    @staticmethod
+    def _parse_list(row: dict, key: str, default: list) -> list:
+        """Читает список из строки CSV: значения разделяются точкой с запятой или пробелами"""
+        value = (row.get(key) or '').replace(';', ' ').split()
+        return value if value else list(default)
+    
     def display_parameters(self):
         """Выводит параметры конфигурации"""
         print("\n⚙️ КОНФИГУРАЦИЯ СИСТЕМЫ")
@@ -44,5 +214,16 @@ class Config:
         print(f"🔧 Режим тестирования: {'Да' if self.test_mode else 'Нет'}")
         print(f"📊 Макс. глубина анализа: {self.max_depth}")
         print(f"🌐 URL репозитория: {self.repository_url}")
+        if not self.test_mode and self.dependency_source == 'local_index':
+            print(f"🗂️ Локальный индекс: {self.index_path}")
+        elif not self.test_mode:
+            print(f"📡 Реестр: {self.registry_url} (потоков: {self.max_workers})")
+            if self.cache_path:
+                print(f"💾 Кеш: {self.cache_path}{' (автономный режим)' if self.offline else ''}")
+        if not self.test_mode:
+            features = 'все' if self.all_features else ', '.join(
+                (['default'] if self.default_features else []) + self.features) or 'нет'
+            print(f"🧩 Виды зависимостей: {', '.join(self.dependency_kinds)}; фичи: {features}; "
+                  f"платформа: {self.target or 'любая'}")
         if self.test_repo_path:
             print(f"📁 Тестовый путь: {self.test_repo_path}")
\ No newline at end of file
@@ -0,0 +1,396 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from edge_filter import EdgeFilter, Requirement
+from metrics import METRICS, node_message
+from persistent_cache import CacheEntry, PersistentCache
+from registry_index import crate_index_parts
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов: в среднем rate в секунду, всплесками до burst
+
+    Потокобезопасен. Каждый вызов acquire() резервирует токен под
+    блокировкой и ждет уже вне ее, поэтому очередность запросов сохраняется.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def reserve(self) -> float:
+        """Забирает токен и возвращает, сколько секунд нужно подождать до его появления"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            METRICS.record('registry.throttled', wait)
+            self._sleep(wait)
+
+
+class CratesFetcher:
+    """Параллельная загрузка зависимостей из crates.io через общую keep-alive сессию"""
+
+    # Коды ответа, после которых имеет смысл повторить запрос
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    # Формат записей кеша; записи другого формата считаются отсутствующими и загружаются заново
+    CACHE_FORMAT = 2
+    # Ключ версии, под которым в кеше лежат версии пакета из sparse-индекса
+    INDEX_CACHE_KEY = '#index'
+
+    def __init__(self, config: Config, cache: Optional[PersistentCache] = None):
+        self.config = config
+        self.cache = cache
+        self.base_url = config.registry_url.rstrip('/')
+        self.index_url = (config.sparse_index_url or self._default_index_url(self.base_url)).rstrip('/')
+        self.session = requests.Session()
+        # Пул соединений не меньше числа потоков, иначе соединения не переиспользуются
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # crates.io требует осмысленный User-Agent
+        self.session.headers['User-Agent'] = 'Prak_2-dependency-analyzer'
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Общий для всех потоков лимит запросов к реестру (rate_limit в config.csv)
+        self.rate_limiter = TokenBucket(config.rate_limit, config.rate_burst) if config.rate_limit else None
+        # Ребра отбрасываются сразу при загрузке, до подбора версий и обхода
+        self.edge_filter = EdgeFilter(config)
+        # Сведения о пакетах и их версиях, уже полученные в этом запуске
+        self._records: Dict[str, dict] = {}
+        self._releases: Dict[str, dict] = {}
+        # Статистика сетевых запросов (обновляется из нескольких потоков)
+        self._stats_lock = threading.Lock()
+        self.requests_made = 0
+        self.bytes_downloaded = 0
+        self.request_seconds = 0.0
+
+    def fetch_dependencies(self, package_name: str) -> List[str]:
+        """Получает список прямых зависимостей основной версии пакета"""
+        version = self.resolve_version(package_name)
+        if not version:
+            return []
+        return self.fetch_version_dependencies(package_name, version)
+
+    def resolve_version(self, package_name: str) -> Optional[str]:
+        """Определяет версию пакета, которую crates.io считает основной"""
+        record = self._package_record(self._records, package_name, '', self._load_crate_record)
+        return record.get('version') if record is not None else None
+
+    def fetch_versions(self, package_name: str) -> List[str]:
+        """Номера всех не отозванных версий пакета (файл пакета в sparse-индексе)"""
+        record = self._package_record(self._releases, package_name, self.INDEX_CACHE_KEY, self._load_index_record)
+        if record is None:
+            return []
+        return list(record['releases'])
+
+    def fetch_features(self, package_name: str, version: str) -> Dict[str, List[str]]:
+        """Таблица фич версии пакета (из того же файла индекса, что и список версий)"""
+        record = self._package_record(self._releases, package_name, self.INDEX_CACHE_KEY, self._load_index_record)
+        if record is None:
+            return {}
+        return record['releases'].get(version) or {}
+
+    def _package_record(self, records: Dict[str, dict], package_name: str, key: str, load) -> Optional[dict]:
+        """Сведения о пакете из памяти, кеша или реестра; key - ключ версии в кеше"""
+        record = records.get(package_name)
+        if record is None:
+            record = load(package_name, key)
+            if record is not None:
+                records[package_name] = record
+        return record
+
+    def _load_crate_record(self, package_name: str, key: str) -> Optional[dict]:
+        # Только основная версия, без списка версий, README и статистики пакета
+        url = f"{self.base_url}/api/v1/crates/{package_name}?include=default_version"
+        return self._load_record(package_name, key, url,
+                                 lambda response: {'version': self._select_version(response.json())})
+
+    def _load_index_record(self, package_name: str, key: str) -> Optional[dict]:
+        # Строки индекса короче объектов версий API: без ссылок, авторов и статистики
+        url = f"{self.index_url}/{'/'.join(crate_index_parts(package_name))}"
+        return self._load_record(package_name, key, url,
+                                 lambda response: {'releases': self._extract_index_versions(response.content)})
+
+    def _load_record(self, package_name: str, key: str, url: str, parse) -> Optional[dict]:
+        """Запись из кеша, если она свежая, иначе запрос с перепроверкой по ETag и Last-Modified"""
+        cached = self._cached_entry(package_name, key)
+        if cached is not None and (self.config.offline or self.cache.is_fresh(cached)):
+            METRICS.increment('cache.hits')
+            return cached.data
+        if self.cache is not None:
+            METRICS.increment('cache.misses')
+
+        if self.config.offline:
+            node_message(self.config, f"⚠️ Пакет {package_name} отсутствует в кеше (автономный режим)")
+            return None
+
+        response = self._get_with_retries(url, self._conditional_headers(cached))
+        if response is None:
+            # Сеть недоступна - лучше устаревшие данные, чем никаких
+            return cached.data if cached is not None else None
+
+        if response.status_code == 304 and cached is not None:
+            METRICS.increment('cache.revalidated')
+            self.cache.touch(package_name, key)
+            return cached.data
+
+        if response.status_code != 200:
+            node_message(self.config, f"⚠️ Не удалось получить сведения о пакете {package_name} (код: {response.status_code})")
+            return None
+
+        try:
+            record = dict(parse(response), format=self.CACHE_FORMAT)
+        except ValueError as e:
+            node_message(self.config, f"❌ Некорректный ответ для {package_name}: {e}")
+            return None
+
+        if self.cache is not None:
+            self.cache.put(package_name, key, record,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return record
+
+    def _cached_entry(self, package_name: str, version: str = '') -> Optional[CacheEntry]:
+        """Запись кеша текущего формата; None - записи нет или она прежнего формата"""
+        if self.cache is None:
+            return None
+        entry = self.cache.get(package_name, version)
+        if entry is None or not isinstance(entry.data, dict) or entry.data.get('format') != self.CACHE_FORMAT:
+            return None
+        return entry
+
+    def fetch_version_dependencies(self, package_name: str, version: str) -> List[str]:
+        """Имена прямых зависимостей конкретной версии"""
+        names = []
+        for requirement in self.fetch_requirements(package_name, version):
+            if requirement.name not in names:
+                names.append(requirement.name)
+        return names
+
+    def fetch_requirements(self, package_name: str, version: str) -> List[Requirement]:
+        """Зависимости версии, подходящие под конфигурацию сборки, с требованиями к версиям"""
+        return self.edge_filter.filter(self._fetch_all_requirements(package_name, version))
+
+    def _fetch_all_requirements(self, package_name: str, version: str) -> List[Requirement]:
+        """Все зависимости версии: в кеше хранится полный список для любых настроек фильтра"""
+        if self.cache is not None:
+            entry = self._cached_entry(package_name, version)
+            if entry is not None:
+                METRICS.increment('cache.hits')
+                return [Requirement.from_row(row) for row in entry.data['edges']]
+            METRICS.increment('cache.misses')
+
+        if self.config.offline:
+            node_message(self.config, f"⚠️ Зависимости {package_name} {version} отсутствуют в кеше (автономный режим)")
+            return []
+
+        node_message(self.config, f"🔍 Получение зависимостей для {package_name} {version}...")
+        url = f"{self.base_url}/api/v1/crates/{package_name}/{version}/dependencies"
+
+        response = self._get_with_retries(url)
+        if response is None:
+            return []
+
+        if response.status_code != 200:
+            node_message(self.config, f"⚠️ Не удалось получить зависимости для {package_name} (код: {response.status_code})")
+            return []
+
+        try:
+            requirements = self._extract_dependencies(response.json())
+        except ValueError as e:
+            node_message(self.config, f"❌ Некорректный ответ для {package_name}: {e}")
+            return []
+
+        if self.cache is not None:
+            self.cache.put(package_name, version, {'format': self.CACHE_FORMAT, 'edges': requirements})
+
+        node_message(self.config, f"📦 Пакет {package_name} {version} имеет {len(requirements)} зависимостей")
+        return requirements
+
+    def fetch_crate_page(self, query: str) -> Tuple[List[str], Optional[str]]:
+        """Страница списка всех пакетов реестра: имена и запрос следующей страницы (None - последняя)
+
+        query - строка запроса вида "?per_page=100&sort=alphabetical" или
+        meta.next_page из предыдущего ответа.
+        """
+        url = f"{self.base_url}/api/v1/crates{query}"
+        response = self._get_with_retries(url)
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else 'нет ответа'
+            raise ConnectionError(f"Не удалось получить список пакетов {query} (код: {status})")
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise ConnectionError(f"Некорректный список пакетов {query}: {e}")
+        names = [crate['name'] for crate in data.get('crates') or [] if crate.get('name')]
+        next_page = (data.get('meta') or {}).get('next_page')
+        return names, (next_page if names and next_page else None)
+
+    def fetch_many(self, packages: Iterable[str]) -> Dict[str, List[str]]:
+        """Параллельно загружает зависимости для набора пакетов"""
+        return self._map(self.fetch_dependencies, packages)
+
+    def fetch_versions_many(self, packages: Iterable[str]) -> Dict[str, List[str]]:
+        """Параллельно загружает списки версий для набора пакетов"""
+        return self._map(self.fetch_versions, packages)
+
+    def fetch_requirements_many(self, packages: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Requirement]]:
+        """Параллельно загружает требования для набора пар (пакет, версия)"""
+        return self._map(lambda package: self.fetch_requirements(*package), packages)
+
+    def _map(self, func, items: Iterable) -> dict:
+        """Применяет func к элементам в общем пуле потоков, сохраняя порядок"""
+        items = list(items)
+        if not items:
+            return {}
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.config.max_workers)
+
+        return dict(zip(items, self._executor.map(func, items)))
+
+    def close(self) -> None:
+        """Освобождает пул потоков и соединения"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def report_statistics(self) -> None:
+        """Выводит объем и длительность сетевых запросов"""
+        with self._stats_lock:
+            requests_made = self.requests_made
+            downloaded = self.bytes_downloaded
+            seconds = self.request_seconds
+
+        print(f"\n📡 СТАТИСТИКА ЗАГРУЗКИ:")
+        print("-" * 40)
+        if requests_made == 0:
+            print("Сетевые запросы не выполнялись")
+            return
+
+        print(f"Запросов: {requests_made}")
+        print(f"Загружено: {downloaded / 1024:.1f} КБ "
+              f"(в среднем {downloaded / requests_made / 1024:.1f} КБ на запрос)")
+        print(f"Суммарное время запросов: {seconds:.2f} с "
+              f"(в среднем {seconds / requests_made * 1000:.0f} мс)")
+
+    @staticmethod
+    def _conditional_headers(cached: Optional[CacheEntry]) -> Dict[str, str]:
+        """Заголовки условного запроса для перепроверки записи кеша"""
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        return headers
+
+    def _get_with_retries(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """GET-запрос с экспоненциальной задержкой между повторами"""
+        attempts = self.config.max_retries + 1
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.config.request_timeout)
+            except requests.RequestException as e:
+                self._record_request(0, time.perf_counter() - started)
+                METRICS.increment('registry.errors')
+                if last_attempt:
+                    print(f"❌ Ошибка при запросе {url}: {e}")
+                    return None
+            else:
+                self._record_request(len(response.content), time.perf_counter() - started)
+                if response.status_code not in self.RETRY_STATUS_CODES or last_attempt:
+                    return response
+
+            METRICS.increment('registry.retries')
+            time.sleep(self.config.retry_backoff * (2 ** attempt))
+
+        return None
+
+    def _record_request(self, size: int, elapsed: float) -> None:
+        """Учитывает размер ответа и длительность запроса"""
+        with self._stats_lock:
+            self.requests_made += 1
+            self.bytes_downloaded += size
+            self.request_seconds += elapsed
+        METRICS.increment('registry.requests')
+        METRICS.increment('registry.bytes', size)
+        METRICS.record('registry.request', elapsed)
+
+    @staticmethod
+    def _select_version(data: dict) -> Optional[str]:
+        """Выбирает версию пакета, которую crates.io считает основной"""
+        crate = data.get('crate') or {}
+        for key in ('default_version', 'max_stable_version', 'max_version', 'newest_version'):
+            if crate.get(key):
+                return crate[key]
+
+        # Старый формат ответа с полным списком версий
+        versions = data.get('versions') or []
+        if versions:
+            return versions[0].get('num')
+        return None
+
+    @staticmethod
+    def _default_index_url(base_url: str) -> str:
+        """Sparse-индекс реестра: у crates.io отдельный домен, у зеркал - каталог index"""
+        if base_url == 'https://crates.io':
+            return 'https://index.crates.io'
+        return f"{base_url}/index"
+
+    @staticmethod
+    def _extract_index_versions(content: bytes) -> Dict[str, Dict[str, List[str]]]:
+        """Не отозванные версии и их таблицы фич из файла пакета в sparse-индексе"""
+        releases = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('vers') and not record.get('yanked'):
+                # features2 хранит фичи с синтаксисом dep: и ?/
+                releases[record['vers']] = dict(record.get('features') or {}, **(record.get('features2') or {}))
+        return releases
+
+    @staticmethod
+    def _extract_dependencies(data: dict) -> List[Requirement]:
+        """Извлекает все зависимости с видом, фичами и платформой из ответа эндпоинта зависимостей"""
+        dependencies = []
+
+        for dep in data.get('dependencies') or []:
+            dep_name = dep.get('crate_id')
+            if dep_name:
+                requirement = Requirement.from_registry(dep_name, dep, dep.get('rename') or '')
+                if requirement not in dependencies:
+                    dependencies.append(requirement)
+
+        return dependencies
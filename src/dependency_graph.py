@@ -1,15 +1,40 @@
-from typing import Dict, List, Set, Optional
+import heapq
+import json
+import os
+import sys
+from array import array
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Set, Optional, Tuple
 from config import Config
-from dependency_parser import DependencyParser
+from graph_algorithms import Condensation, cycle_path, find_cycle_groups
+from graph_snapshot import GraphSnapshot, close_snapshot, read_snapshot, write_snapshot
+from graph_store import AdjacencyView, CompactGraph
+from metrics import METRICS, node_message
+from repo_reader import ParseStats, read_test_repo
+
+if TYPE_CHECKING:
+    from dependency_parser import DependencyParser
 
 class DependencyGraph:
+    # Минимальное число измененных строк, после которого хранилище уплотняется
+    COMPACT_THRESHOLD = 1024
+    
     def __init__(self, config: Config):
         self.config = config
-        self.graph: Dict[str, List[str]] = {}
-        self.reverse_graph: Dict[str, List[str]] = {}
+        # Прямой и обратный графы хранятся в одном компактном хранилище CSR
+        self._store = CompactGraph.empty()
+        # Кеши запросов, сбрасываются при любом изменении ребер
+        self._condensation: Optional[Condensation] = None
+        self._reverse_closure_cache: Dict[str, frozenset] = {}
+        self._cycle_group_ids: Optional[array] = None
         self.visited: Set[str] = set()
-        self.recursion_stack: Set[str] = set()
+        # Группы циклических зависимостей (компоненты сильной связности)
+        self.cycle_groups: List[List[str]] = []
+        # Пример цикла для каждой группы: [A, ..., A]
         self.cycles: List[List[str]] = []
+        self._cycle_group_index: Dict[str, int] = {}
+        # Для сжатого графа: имя узла-группы -> исходные пакеты
+        self.collapsed_groups: Dict[str, List[str]] = {}
     
     def build_graph(self) -> None:
         """Строит полный граф зависимостей с помощью DFS"""
@@ -17,34 +42,300 @@ class DependencyGraph:
         print(f"Построение графа зависимостей для пакета: {start_package}")
         
         if self.config.test_mode:
-            self._build_from_test_repo(start_package)
+            if self.load_fresh_snapshot():
+                print(f"Граф загружен из снимка {self.config.snapshot_path}: пакетов {len(self.graph)}")
+                return
+            with METRICS.span('graph.build'):
+                self._build_from_test_repo(start_package)
         else:
             # Для реальных пакетов пока используем тестовые данные для демонстрации
             print("Режим работы с GitHub будет реализован в следующих этапах")
             return
         
-        # Строим обратный граф после построения основного
-        self._build_reverse_graph()
+        self.find_cycle_groups()
+        METRICS.gauge('graph.nodes', self.store.node_count)
+        METRICS.gauge('graph.edges', self.store.edge_count)
         
         print(f"Граф построен. Найдено пакетов: {len(self.graph)}")
         if self.cycles:
             print(f"Обнаружено циклических зависимостей: {len(self.cycles)}")
+        if self.config.snapshot_path:
+            self.save_snapshot(self.config.snapshot_path)
+    
+    @property
+    def store(self) -> CompactGraph:
+        """Компактное хранилище ребер графа"""
+        return self._store
+    
+    @store.setter
+    def store(self, store: CompactGraph) -> None:
+        self._store = store
+        self._invalidate_caches()
+    
+    def _invalidate_caches(self) -> None:
+        """Сбрасывает результаты запросов, зависящие от ребер графа"""
+        self._condensation = None
+        self._reverse_closure_cache = {}
+        self._cycle_group_ids = None
     
-    def _build_reverse_graph(self) -> None:
-        """Строит обратный граф зависимостей"""
-        self.reverse_graph = {}
+    @property
+    def graph(self) -> Mapping[str, List[str]]:
+        """Прямой граф: пакет -> список зависимостей"""
+        return AdjacencyView(self.store)
+    
+    @graph.setter
+    def graph(self, adjacency: Mapping[str, List[str]]) -> None:
+        self.store = CompactGraph.from_adjacency(adjacency.items())
+    
+    @property
+    def reverse_graph(self) -> Mapping[str, List[str]]:
+        """Обратный граф: пакет -> список пакетов, которые от него зависят"""
+        return AdjacencyView(self.store, reverse=True)
+    
+    def find_cycle_groups(self, report: bool = True) -> List[List[str]]:
+        """Находит все группы циклических зависимостей за один проход O(V+E)"""
+        names = self.store.names
+        with METRICS.span('graph.cycles'):
+            self.cycle_groups = sorted(
+                sorted(names[node] for node in group)
+                for group in find_cycle_groups(self.store.id_adjacency())
+            )
+            self.cycles = [cycle_path(self.graph, group) for group in self.cycle_groups]
+            self._reindex_cycle_groups()
         
-        # Для каждого пакета в графе
-        for package in self.graph:
-            self.reverse_graph[package] = []
+        if report:
+            for cycle in self.cycles:
+                node_message(self.config, f"Обнаружена циклическая зависимость: {' -> '.join(cycle)}")
+        
+        return self.cycle_groups
+    
+    def _reindex_cycle_groups(self) -> None:
+        """Перестраивает отображение пакет -> номер группы циклов"""
+        self._cycle_group_index = {
+            package: i
+            for i, group in enumerate(self.cycle_groups)
+            for package in group
+        }
+        self._cycle_group_ids = None
+    
+    def cycle_group_ids(self) -> array:
+        """Номер группы циклов для каждого номера узла хранилища (-1 - вне циклов)
+        
+        Ребро u -> v лежит на цикле тогда и только тогда, когда оба конца
+        в одной группе, поэтому проверка ребра - два обращения к массиву.
+        """
+        if self._cycle_group_ids is None:
+            ids = array('i', [-1]) * self.store.node_count
+            index = self.store.index
+            for package, group in self._cycle_group_index.items():
+                node = index.get(package)
+                if node is not None:
+                    ids[node] = group
+            self._cycle_group_ids = ids
+        return self._cycle_group_ids
+    
+    def _replace_cycle_groups(self, removed: Set[int], added: List[List[str]]) -> None:
+        """Удаляет группы с номерами removed и добавляет новые группы"""
+        kept = [
+            (group, cycle)
+            for i, (group, cycle) in enumerate(zip(self.cycle_groups, self.cycles))
+            if i not in removed
+        ]
+        for group in added:
+            group = sorted(group)
+            kept.append((group, cycle_path(self.graph, group)))
+        kept.sort()
+        
+        self.cycle_groups = [group for group, _ in kept]
+        self.cycles = [cycle for _, cycle in kept]
+        self._reindex_cycle_groups()
+    
+    def in_same_cycle_group(self, package: str, dep: str) -> bool:
+        """Проверяет, входят ли оба пакета в одну группу циклических зависимостей"""
+        group = self._cycle_group_index.get(package)
+        return group is not None and group == self._cycle_group_index.get(dep)
+    
+    def cycle_group(self, package: str) -> Optional[Tuple[List[str], List[str]]]:
+        """Группа циклов, в которую входит пакет, и пример цикла; None - пакет вне циклов"""
+        group = self._cycle_group_index.get(package)
+        if group is None:
+            return None
+        return self.cycle_groups[group], self.cycles[group]
+    
+    def set_dependencies(self, package: str, dependencies: List[str]) -> None:
+        """Добавляет пакет или заменяет его зависимости без перестроения графа"""
+        store = self.store
+        node = store.ensure_node(package)
+        targets = [store.ensure_node(dep) for dep in dependencies]
+        removed, added = store.set_successors(node, targets)
+        self._apply_edge_changes(node, removed, added)
+    
+    def add_dependency(self, package: str, dep: str) -> None:
+        """Добавляет одно ребро package -> dep"""
+        dependencies = list(self.graph.get(package, []))
+        if dep not in dependencies:
+            self.set_dependencies(package, dependencies + [dep])
+    
+    def remove_dependency(self, package: str, dep: str) -> None:
+        """Удаляет одно ребро package -> dep"""
+        dependencies = list(self.graph.get(package, []))
+        if dep in dependencies:
+            dependencies.remove(dep)
+            self.set_dependencies(package, dependencies)
+    
+    def remove_package(self, package: str) -> None:
+        """Удаляет исходящие ребра пакета, входящие ребра других пакетов остаются"""
+        node = self.store.id_of(package)
+        if node is None or not self.store.known[node]:
+            return
+        removed = self.store.clear_successors(node)
+        self._apply_edge_changes(node, removed, [])
+    
+    def update_package(self, package: str, parser: 'DependencyParser') -> None:
+        """Заново загружает зависимости одного пакета и дописывает новые поддеревья"""
+        parser.dependency_cache.pop(package, None)
+        self.set_dependencies(package, parser.get_dependencies(package))
         
-        # Заполняем обратные зависимости
-        for package, dependencies in self.graph.items():
-            for dep in dependencies:
-                if dep in self.reverse_graph:
-                    self.reverse_graph[dep].append(package)
-                else:
-                    self.reverse_graph[dep] = [package]
+        # Пакеты, впервые появившиеся в графе, загружаются вместе с их зависимостями
+        unknown = [dep for dep in self.graph[package] if dep not in self.graph]
+        if unknown:
+            for name, dependencies in parser.collect_graph(unknown).items():
+                if name not in self.graph:
+                    self.set_dependencies(name, dependencies)
+    
+    def _apply_edge_changes(self, node: int, removed: List[int], added: List[int]) -> None:
+        """Обновляет кеши и группы циклов после изменения ребер одного узла"""
+        METRICS.increment('graph.edge_updates', len(removed) + len(added))
+        self._invalidate_caches()
+        store = self.store
+        package = store.names[node]
+        
+        # Удаление ребра может разбить только ту группу, внутри которой оно лежало
+        group = self._cycle_group_index.get(package)
+        if group is not None and any(self.in_same_cycle_group(package, store.names[t]) for t in removed):
+            members = set(self.cycle_groups[group])
+            subgraph = {
+                member: [dep for dep in self.graph.get(member, []) if dep in members]
+                for member in members
+            }
+            self._replace_cycle_groups({group}, find_cycle_groups(subgraph))
+        
+        # Новое ребро node -> target замыкает цикл, только если target достигает node
+        for target in added:
+            if self.in_same_cycle_group(package, store.names[target]):
+                continue
+            merged = self._nodes_on_paths(target, node)
+            if merged:
+                names = [store.names[member] for member in merged]
+                removed_groups = {
+                    self._cycle_group_index[name]
+                    for name in names if name in self._cycle_group_index
+                }
+                self._replace_cycle_groups(removed_groups, [names])
+        
+        if store.patched_rows > max(self.COMPACT_THRESHOLD, store.node_count // 8):
+            store.compact()
+    
+    def _nodes_on_paths(self, source: int, target: int) -> List[int]:
+        """Узлы, лежащие на путях source -> ... -> target (пусто, если пути нет)"""
+        store = self.store
+        reachable = {source}
+        queue = [source]
+        while queue:
+            for dep in store.successors(queue.pop()):
+                if dep not in reachable:
+                    reachable.add(dep)
+                    queue.append(dep)
+        
+        if target not in reachable:
+            return []
+        
+        on_paths = {target}
+        queue = [target]
+        while queue:
+            for parent in store.predecessors(queue.pop()):
+                if parent in reachable and parent not in on_paths:
+                    on_paths.add(parent)
+                    queue.append(parent)
+        return list(on_paths)
+    
+    def save_to_file(self, filename: str) -> None:
+        """Сохраняет построенный граф, чтобы следующий запуск применял только изменения"""
+        data = {
+            'package_name': self.config.package_name,
+            'graph': dict(self.graph),
+        }
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    
+    def load_from_file(self, filename: str) -> None:
+        """Загружает граф, сохраненный save_to_file"""
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Ошибка загрузки графа: {e}")
+        
+        self.store = CompactGraph.from_adjacency(data['graph'].items())
+        self.visited = set(self.graph)
+        self.find_cycle_groups()
+    
+    def save_snapshot(self, filename: str) -> None:
+        """Сохраняет граф и группы циклов в двоичный снимок для быстрой загрузки"""
+        with METRICS.span('snapshot.save'):
+            write_snapshot(filename, self.store, self.cycle_groups, self.cycles,
+                           {'package_name': self.config.package_name, 'source': self._snapshot_source()})
+    
+    def load_snapshot(self, filename: str) -> dict:
+        """Открывает снимок через mmap без разбора и поиска циклов; возвращает его сведения"""
+        with METRICS.span('snapshot.load'):
+            snapshot = read_snapshot(filename)
+        self._apply_snapshot(snapshot)
+        return snapshot.meta
+    
+    def _apply_snapshot(self, snapshot: GraphSnapshot) -> None:
+        self.store = snapshot.store
+        self.visited = set(self.store.names)
+        self.cycle_groups = snapshot.cycle_groups
+        self.cycles = snapshot.cycles
+        self._reindex_cycle_groups()
+        METRICS.gauge('graph.nodes', self.store.node_count)
+        METRICS.gauge('graph.edges', self.store.edge_count)
+    
+    def _snapshot_source(self) -> Optional[dict]:
+        """Чем построен граф: снимок годится, пока не изменились исходные данные
+
+        Для тестового репозитория это сам файл, для реестра - источник ребер,
+        конфигурация сборки и глубина обхода.
+        """
+        if not self.config.test_mode:
+            settings = [list(value) if isinstance(value, tuple) else value for value in self.config.source_key()]
+            return {'settings': settings, 'max_depth': self.config.max_depth}
+        path = self.config.test_repo_path
+        if not path or not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return {'path': os.path.abspath(path), 'format': self.config.test_repo_format,
+                'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    
+    def load_fresh_snapshot(self) -> bool:
+        """Загружает снимок из snapshot_path, если он построен для того же пакета и тех же данных"""
+        path = self.config.snapshot_path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with METRICS.span('snapshot.load'):
+                snapshot = read_snapshot(path)
+        except ValueError as e:
+            print(f"⚠️ {e}")
+            return False
+        source = self._snapshot_source()
+        if (source is None or snapshot.meta.get('source') != source
+                or snapshot.meta.get('package_name') != self.config.package_name):
+            close_snapshot(snapshot)
+            return False
+        self._apply_snapshot(snapshot)
+        return True
     
     def find_reverse_dependencies(self, package: str) -> List[str]:
         """Находит все обратные зависимости для заданного пакета"""
@@ -55,27 +346,241 @@ class DependencyGraph:
     
     def find_transitive_reverse_dependencies(self, package: str) -> Set[str]:
         """Находит все транзитивные обратные зависимости (пакеты, которые прямо или косвенно зависят от данного)"""
-        if package not in self.reverse_graph:
-            return set()
+        return set(self.find_transitive_reverse_dependencies_batch([package])[package])
+    
+    def find_transitive_reverse_dependencies_batch(self, packages: Iterable[str]) -> Dict[str, frozenset]:
+        """Транзитивные обратные зависимости сразу для многих пакетов
         
-        visited = set()
-        result = set()
+        Граф один раз сжимается до DAG компонент сильной связности, затем
+        все цели обрабатываются общим проходом с битовыми масками. Ответы
+        кешируются до следующего изменения ребер графа.
+        """
+        packages = list(dict.fromkeys(packages))
+        store = self.store
+        missing = [
+            package for package in packages
+            if package not in self._reverse_closure_cache and package in store.index
+        ]
         
-        def dfs_reverse(current: str):
-            if current in visited:
-                return
-            visited.add(current)
+        METRICS.increment('graph.reverse_cache_hits', len(packages) - len(missing))
+        if missing:
+            METRICS.increment('graph.reverse_cache_misses', len(missing))
+            with METRICS.span('graph.reverse_closures'):
+                closures = self.condensation().reverse_closures([store.index[package] for package in missing])
+                names = store.names
+                for package, closure in zip(missing, closures):
+                    self._reverse_closure_cache[package] = frozenset(names[node] for node in closure)
+        
+        return {
+            package: self._reverse_closure_cache.get(package, frozenset())
+            for package in packages
+        }
+    
+    def count_transitive_reverse_dependencies(self, packages: Iterable[str]) -> Dict[str, int]:
+        """Число транзитивных обратных зависимостей для многих пакетов
+        
+        Дешевле find_transitive_reverse_dependencies_batch: множества не
+        строятся, уже посчитанные берутся из кеша. Неизвестные пакеты - 0.
+        """
+        packages = list(dict.fromkeys(packages))
+        store = self.store
+        counts = {
+            package: len(self._reverse_closure_cache.get(package, ()))
+            for package in packages
+        }
+        missing = [
+            package for package in packages
+            if package not in self._reverse_closure_cache and package in store.index
+        ]
+        if missing:
+            with METRICS.span('graph.reverse_counts'):
+                sizes = self.condensation().reverse_closure_sizes([store.index[package] for package in missing])
+            counts.update(zip(missing, sizes))
+        return counts
+    
+    def condensation(self) -> Condensation:
+        """DAG компонент сильной связности, кешируется до изменения ребер"""
+        if self._condensation is None:
+            self._condensation = Condensation(self.store.id_adjacency())
+        return self._condensation
+    
+    def _subgraph(self, nodes: Iterable[int], edges: Optional[Iterable[Tuple[int, int]]] = None) -> 'DependencyGraph':
+        """Новый граф из указанных узлов; без edges берутся все ребра между ними"""
+        store = self.store
+        nodes = list(dict.fromkeys(nodes))
+        if edges is None:
+            sub_store = store.induced(nodes)
+        else:
+            names = store.names
             
-            # Добавляем прямые обратные зависимости
-            if current in self.reverse_graph:
-                for reverse_dep in self.reverse_graph[current]:
-                    result.add(reverse_dep)
-                    dfs_reverse(reverse_dep)
-        
-        # Запускаем DFS из исходного пакета
-        dfs_reverse(package)
+            def edge_stream():
+                for node in nodes:
+                    if store.known[node]:
+                        yield names[node], None
+                for source, target in edges:
+                    yield names[source], names[target]
+            
+            sub_store = CompactGraph.from_edges(edge_stream())
+        
+        result = DependencyGraph(self.config)
+        result.store = sub_store
+        result.visited = set(sub_store.names)
+        result.find_cycle_groups(report=False)
         return result
     
+    def require_node(self, package: str) -> int:
+        """Номер узла пакета в хранилище; ValueError, если пакета нет в графе"""
+        node = self.store.id_of(package)
+        if node is None:
+            raise ValueError(f"Пакет {package} отсутствует в графе")
+        return node
+    
+    def _bfs_distances(self, start: int, reverse: bool = False, limit: Optional[int] = None) -> Dict[int, int]:
+        """Расстояния в ребрах от start по прямым или обратным ребрам"""
+        step = self.store.predecessors if reverse else self.store.successors
+        distances = {start: 0}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            distance = distances[node]
+            if limit is not None and distance >= limit:
+                continue
+            for neighbour in step(node):
+                if neighbour not in distances:
+                    distances[neighbour] = distance + 1
+                    queue.append(neighbour)
+        return distances
+    
+    def neighbourhood(self, package: str, hops: int = 1, direction: str = 'both') -> 'DependencyGraph':
+        """Подграф пакетов на расстоянии не более hops ребер
+        
+        direction: 'forward' - зависимости, 'reverse' - зависящие пакеты, 'both' - оба направления.
+        """
+        if direction not in ('forward', 'reverse', 'both'):
+            raise ValueError(f"Неизвестное направление: {direction}")
+        start = self.require_node(package)
+        
+        nodes = {}
+        if direction in ('forward', 'both'):
+            nodes.update(self._bfs_distances(start, limit=hops))
+        if direction in ('reverse', 'both'):
+            nodes.update(self._bfs_distances(start, reverse=True, limit=hops))
+        return self._subgraph(sorted(nodes, key=nodes.get))
+    
+    def shortest_path(self, source: str, target: str) -> List[str]:
+        """Один из кратчайших путей зависимостей source -> ... -> target (пусто, если пути нет)"""
+        start = self.require_node(source)
+        finish = self.require_node(target)
+        store = self.store
+        
+        parents = {start: -1}
+        queue = deque([start])
+        while queue and finish not in parents:
+            node = queue.popleft()
+            for dep in store.successors(node):
+                if dep not in parents:
+                    parents[dep] = node
+                    queue.append(dep)
+        
+        if finish not in parents:
+            return []
+        path = []
+        node = finish
+        while node != -1:
+            path.append(store.names[node])
+            node = parents[node]
+        path.reverse()
+        return path
+    
+    def shortest_paths_subgraph(self, source: str, target: str) -> 'DependencyGraph':
+        """Подграф из всех кратчайших путей source -> target"""
+        start = self.require_node(source)
+        finish = self.require_node(target)
+        from_start = self._bfs_distances(start)
+        if finish not in from_start:
+            return self._subgraph([start, finish], [])
+        
+        length = from_start[finish]
+        to_finish = self._bfs_distances(finish, reverse=True, limit=length)
+        # Узел лежит на кратчайшем пути, если сумма расстояний равна длине пути
+        on_path = [
+            node for node, distance in from_start.items()
+            if to_finish.get(node, length + 1) + distance == length
+        ]
+        edges = [
+            (node, dep)
+            for node in on_path
+            for dep in self.store.successors(node)
+            if from_start.get(dep) == from_start[node] + 1 and to_finish.get(dep) == to_finish[node] - 1
+        ]
+        return self._subgraph(on_path, edges)
+    
+    def top_by_fan_in(self, count: int) -> List[Tuple[str, int]]:
+        """Пакеты с наибольшим числом прямых обратных зависимостей"""
+        store = self.store
+        top = heapq.nlargest(count, range(store.node_count),
+                             key=lambda node: len(store.predecessors(node)))
+        return [(store.names[node], len(store.predecessors(node))) for node in top]
+    
+    def top_by_fan_in_subgraph(self, count: int) -> 'DependencyGraph':
+        """Подграф из самых востребованных пакетов и ребер между ними"""
+        return self._subgraph(self.store.id_of(name) for name, _ in self.top_by_fan_in(count))
+    
+    def condensed(self) -> 'DependencyGraph':
+        """Граф, в котором каждая группа циклов сжата в один узел"""
+        condensation = self.condensation()
+        names = self.store.names
+        
+        component_names = []
+        collapsed = {}
+        for c, component in enumerate(condensation.components):
+            members = sorted(names[node] for node in component)
+            if condensation.cyclic[c] and len(members) > 1:
+                name = "cycle_" + "_".join(members) if len(members) <= 3 else f"cycle_{members[0]}_{len(members)}"
+                collapsed[name] = members
+            else:
+                name = members[0]
+            component_names.append(name)
+        
+        rows = [
+            (component_names[c], [component_names[target] for target in condensation.successors[c]])
+            for c in range(len(condensation.components))
+        ]
+        result = DependencyGraph(self.config)
+        result.store = CompactGraph.from_adjacency(rows)
+        result.visited = set(result.store.names)
+        result.collapsed_groups = collapsed
+        result.find_cycle_groups(report=False)
+        return result
+    
+    def transitive_reduction(self) -> 'DependencyGraph':
+        """Граф без ребер, которые следуют из других путей; ребра внутри циклов сохраняются"""
+        condensation = self.condensation()
+        component_of = condensation.component_of
+        kept = [set(successors) for successors in condensation.reduced_successors()]
+        store = self.store
+        
+        edges = []
+        # Одно представительное ребро на каждую оставшуюся пару компонент
+        used = set()
+        for node in range(store.node_count):
+            source = component_of[node]
+            for dep in store.successors(node):
+                target = component_of[dep]
+                if source == target:
+                    edges.append((node, dep))
+                elif target in kept[source] and (source, target) not in used:
+                    used.add((source, target))
+                    edges.append((node, dep))
+        return self._subgraph(range(store.node_count), edges)
+    
+    def reverse_dependency_subgraph(self, package: str) -> 'DependencyGraph':
+        """Пакет и все, кто от него транзитивно зависит, с настоящими ребрами между ними"""
+        node = self.require_node(package)
+        closure = self.find_transitive_reverse_dependencies_batch([package])[package]
+        index = self.store.index
+        return self._subgraph([node] + [index[name] for name in sorted(closure)])
+    
     def display_reverse_dependencies(self, package: str) -> None:
         """Выводит обратные зависимости для заданного пакета"""
         print(f"\nПоиск обратных зависимостей для пакета '{package}':")
@@ -101,67 +606,37 @@ class DependencyGraph:
     
     def _build_from_test_repo(self, package: str) -> None:
         """Строит граф из тестового репозитория"""
-        test_data = self._load_test_data()
+        stats = ParseStats()
+        try:
+            # Файл разбирается построчно прямо в хранилище, без промежуточного словаря
+            with METRICS.span('graph.parse'):
+                store = CompactGraph.from_edges(
+                    read_test_repo(self.config.test_repo_path, self.config.test_repo_format, stats))
+        except OSError as e:
+            raise ValueError(f"Ошибка загрузки тестовых данных: {e}")
+        METRICS.increment('parse.lines', stats.lines)
+        METRICS.increment('parse.edges', stats.edges)
+        print(stats.report())
         
-        if package not in test_data:
+        root = store.id_of(package)
+        if root is None or not store.known[root]:
             print(f"Пакет {package} не найден в тестовых данных")
             return
         
-        self._dfs_test(package, test_data)
-    
-    def _dfs_test(self, package: str, test_data: Dict[str, List[str]]) -> None:
-        """DFS для тестовых данных"""
-        if package in self.visited:
-            return
+        # В граф попадают только пакеты, достижимые из начального
+        reachable = store.reachable_from([root])
+        store = store if len(reachable) == store.node_count else store.induced(reachable)
+        # Пакет без собственного блока в тестовых данных считается листом
+        store.mark_all_known()
+        self.store = store
+        self.visited = set(self.store.names)
         
-        if package in self.recursion_stack:
-            cycle = list(self.recursion_stack) + [package]
-            self.cycles.append(cycle)
-            print(f"Обнаружена циклическая зависимость: {' -> '.join(cycle)}")
+        if self.config.quiet:
+            METRICS.increment('messages.suppressed', store.node_count)
             return
-        
-        self.recursion_stack.add(package)
-        self.visited.add(package)
-        
-        dependencies = test_data.get(package, [])
-        self.graph[package] = dependencies
-        
-        print(f"{package} -> {dependencies}")
-        
-        for dep in dependencies:
-            self._dfs_test(dep, test_data)
-        
-        self.recursion_stack.remove(package)
-    
-    def _load_test_data(self) -> Dict[str, List[str]]:
-        """Загружает тестовые данные из файла"""
-        try:
-            with open(self.config.test_repo_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            test_data = {}
-            lines = content.split('\n')
-            current_package = None
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    current_package = None
-                    continue
-                
-                # Если строка состоит из одной заглавной буквы - это пакет
-                if len(line) == 1 and line.isupper():
-                    current_package = line
-                    if current_package not in test_data:
-                        test_data[current_package] = []
-                # Иначе это зависимость текущего пакета
-                elif current_package and len(line) == 1 and line.isupper():
-                    test_data[current_package].append(line)
-            
-            return test_data
-            
-        except Exception as e:
-            raise ValueError(f"Ошибка загрузки тестовых данных: {e}")
+        # Одна запись в поток вместо вызова print на каждый пакет
+        sys.stdout.write("".join(f"{current} -> {dependencies}\n"
+                                 for current, dependencies in self.graph.items()))
     
     def display_graph(self) -> None:
         """Выводит граф зависимостей"""
@@ -175,5 +650,7 @@ class DependencyGraph:
         
         if self.cycles:
             print(f"\nОбнаружены циклические зависимости:")
-            for i, cycle in enumerate(self.cycles, 1):
-                print(f"  {i}. {' -> '.join(cycle)}")
\ No newline at end of file
+            for i, (group, cycle) in enumerate(zip(self.cycle_groups, self.cycles), 1):
+                print(f"  {i}. {' -> '.join(cycle)}")
+                if len(group) > len(cycle) - 1:
+                    print(f"     группа ({len(group)}): {', '.join(group)}")
\ No newline at end of file
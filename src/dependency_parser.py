@@ -1,24 +1,95 @@
-import requests
+import sys
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Set, TextIO, Tuple, Union
 from config import Config
+from edge_filter import EdgeFilter, Requirement
+from graph_algorithms import cycle_path, find_cycle_groups
+from metrics import METRICS, node_message
+from registry_index import LocalRegistryIndex
+from version_req import VersionKey, VersionReq, parse_req, parse_version, sort_versions
+
+if TYPE_CHECKING:
+    # Сетевой стек (requests) загружается только при первом обращении к реестру
+    from crates_fetcher import CratesFetcher
+
+
+def package_id(name: str, version: Optional[str]) -> str:
+    """Узел графа для пары (пакет, версия): "serde@1.0.200"; без версии - просто имя"""
+    return f"{name}@{version}" if version else name
+
+
+def split_package_id(package: str) -> Tuple[str, str]:
+    """Обратное к package_id: (имя, версия или пустая строка)"""
+    name, _, version = package.partition('@')
+    return name, version
+
 
 class DependencyParser:
+    # Сколько строк дерева накапливать перед записью в поток вывода
+    TREE_WRITE_BATCH = 512
+    
     def __init__(self, config: Config):
         self.config = config
         self.dependency_cache = {}
+        self._fetcher: Optional['CratesFetcher'] = None
+        self.index: Optional[LocalRegistryIndex] = None
+        # Версии, уже выбранные для каждого пакета (по убыванию): совместимые
+        # требования переиспользуют их, а не тянут еще одну версию
+        self.selected_versions: Dict[str, List[Tuple[VersionKey, str]]] = {}
+        # Опубликованные версии пакетов (по убыванию), загруженные из реестра
+        self.available_versions: Dict[str, List[Tuple[VersionKey, str]]] = {}
+        self._roots: Dict[str, str] = {}
+        # Фичи, запрошенные у узла всеми входящими ребрами (объединяются, как в Cargo)
+        self.requested_features: Dict[str, Set[str]] = {}
+        # Уже раскрытые узлы, у которых с тех пор добавились фичи: их ребра нужно пересчитать
+        self._stale: Set[str] = set()
     
     def get_dependencies(self, package_name: str):
-        """Получает зависимости для пакета"""
+        """Получает зависимости для пакета
+        
+        В рабочем режиме пакет - узел "имя@версия" (или просто имя для основной
+        версии), а зависимости - узлы выбранных по требованиям версий.
+        """
         if package_name in self.dependency_cache:
             return self.dependency_cache[package_name]
             
         if self.config.test_mode:
             deps = self._get_test_dependencies(package_name)
         else:
-            deps = self._get_real_dependencies(package_name)
+            deps = self._resolve_versions([package_name])[package_name]
             
         self.dependency_cache[package_name] = deps
         return deps
     
+    def resolve_root(self, package_name: str) -> str:
+        """Узел графа для корневого пакета: в рабочем режиме - с основной версией"""
+        if self.config.test_mode or '@' in package_name:
+            return package_name
+        if package_name not in self._roots:
+            source = self._get_source()
+            version = source.resolve_version(package_name)
+            if version:
+                self._remember_version(package_name, version)
+            root = package_id(package_name, version)
+            self._roots[package_name] = root
+            self.requested_features.setdefault(root, set()).update(source.edge_filter.root_features())
+        return self._roots[package_name]
+    
+    def resolve_roots(self, names: List[str]) -> List[str]:
+        """resolve_root для группы пакетов: сведения о них загружаются параллельно"""
+        if not self.config.test_mode:
+            missing = [name for name in dict.fromkeys(names) if name not in self._roots and '@' not in name]
+            if missing:
+                self._versions_many(missing)
+        return [self.resolve_root(name) for name in names]
+    
+    def expand_many(self, packages: List[str]) -> Dict[str, List[str]]:
+        """Прямые зависимости группы узлов без обхода вглубь; загружаются только недостающие"""
+        missing = [package for package in dict.fromkeys(packages) if package not in self.dependency_cache]
+        if missing:
+            self.dependency_cache.update(self._fetch_many(missing))
+            METRICS.increment('parser.nodes_expanded', len(missing))
+        return {package: self.dependency_cache[package] for package in packages}
+    
     def _get_test_dependencies(self, package_name: str):
         """Тестовые данные для демонстрации"""
         test_data = {
@@ -32,38 +103,221 @@ class DependencyParser:
         }
         return test_data.get(package_name, [])
     
-    def _get_real_dependencies(self, package_name: str):
-        """Получает реальные зависимости из crates.io"""
+    def _get_source(self) -> Union['CratesFetcher', LocalRegistryIndex]:
+        """Источник версий и зависимостей: crates.io или локальная копия индекса"""
+        if self.config.dependency_source == 'local_index':
+            if self.index is None:
+                self.index = LocalRegistryIndex(self.config.index_path, EdgeFilter(self.config), self.config)
+            return self.index
+        return self.fetcher
+    
+    @property
+    def fetcher(self) -> 'CratesFetcher':
+        """Общий загрузчик crates.io; создается при первом обращении"""
+        if self._fetcher is None:
+            from crates_fetcher import CratesFetcher
+            from persistent_cache import PersistentCache
+            cache = None
+            if self.config.cache_path:
+                cache = PersistentCache(self.config.cache_path, self.config.cache_ttl,
+                                        self.config.cache_max_entries)
+            self._fetcher = CratesFetcher(self.config, cache)
+        return self._fetcher
+    
+    def _fetch_many(self, packages: List[str]) -> Dict[str, List[str]]:
+        """Загружает зависимости для группы пакетов (параллельно в рабочем режиме)"""
+        if self.config.test_mode:
+            return {package: self._get_test_dependencies(package) for package in packages}
+        return self._resolve_versions(packages)
+    
+    def _resolve_versions(self, packages: List[str]) -> Dict[str, List[str]]:
+        """Загружает требования пакетов и подбирает версию каждой зависимости
+        
+        Сеть нужна только на двух этапах, и оба идут параллельно: требования
+        всех пакетов группы, затем списки версий тех зависимостей, которым не
+        подошла ни одна уже выбранная версия. Сам подбор идет в одном потоке
+        в порядке packages, поэтому результат не зависит от порядка ответов.
+        
+        Ребра, не нужные конфигурации сборки (вид, платформа, выключенные
+        необязательные зависимости), отбрасываются до загрузки версий.
+        """
+        source = self._get_source()
+        edge_filter = source.edge_filter
+        pairs: Dict[str, Tuple[str, str]] = {}
+        for package in packages:
+            name, version = split_package_id(package)
+            if not version:
+                version = split_package_id(self.resolve_root(name))[1]
+            if version:
+                pairs[package] = (name, version)
+        
+        requirements = self._requirements_many(list(dict.fromkeys(pairs.values())))
+        
+        root_nodes = set(self._roots.values())
+        active: Dict[str, List[Tuple[Requirement, FrozenSet[str]]]] = {}
+        for package, pair in pairs.items():
+            requested = self.requested_features.get(package) or edge_filter.root_features()
+            active[package] = edge_filter.select(requirements.get(pair, []), source.fetch_features(*pair),
+                                                 requested, root=package in root_nodes)
+        
+        needed = []
+        for edges in active.values():
+            for requirement, _ in edges:
+                dep = requirement.name
+                if dep in self.available_versions or dep in needed:
+                    continue
+                parsed = self._parse_requirement(dep, requirement.req)
+                if parsed is None or parsed.best_match(self.selected_versions.get(dep, ())) is None:
+                    needed.append(dep)
+        METRICS.increment('parser.version_lists', len(needed))
+        for dep, versions in self._versions_many(needed).items():
+            self.available_versions[dep] = sort_versions(versions)
+        
+        expanding = set(packages)
+        results = {}
+        for package in packages:
+            dependencies = []
+            for requirement, features in active.get(package, []):
+                node = self._select_version(requirement.name, requirement.req)
+                self._request_features(node, features, expanding)
+                if node not in dependencies:
+                    dependencies.append(node)
+            results[package] = dependencies
+        return results
+    
+    def _request_features(self, node: str, features: FrozenSet[str], expanding: Set[str]) -> None:
+        """Добавляет фичи, запрошенные ребром; раскрытый узел с новыми фичами помечается на пересчет"""
+        current = self.requested_features.setdefault(node, set())
+        if features <= current:
+            return
+        current.update(features)
+        if node in self.dependency_cache or node in expanding:
+            self._stale.add(node)
+    
+    def _requirements_many(self, packages: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Requirement]]:
+        source = self._get_source()
+        if source is self.index:
+            # Чтение индекса с диска быстрее, чем накладные расходы на потоки
+            return {package: source.fetch_requirements(*package) for package in packages}
+        return source.fetch_requirements_many(packages)
+    
+    def _versions_many(self, names: List[str]) -> Dict[str, List[str]]:
+        source = self._get_source()
+        if source is self.index:
+            return {name: source.fetch_versions(name) for name in names}
+        return source.fetch_versions_many(names)
+    
+    def _parse_requirement(self, dep: str, req: str) -> Optional[VersionReq]:
         try:
-            print(f"🔍 Получение зависимостей для {package_name}...")
-            url = f"https://crates.io/api/v1/crates/{package_name}"
-            response = requests.get(url, timeout=10)
+            return parse_req(req)
+        except ValueError as e:
+            node_message(self.config, f"⚠️ {dep}: {e}")
+            return None
+    
+    def _select_version(self, dep: str, req: str) -> str:
+        """Узел зависимости: уже выбранная подходящая версия или наибольшая подходящая из реестра
+        
+        Если подобрать версию не удалось, возвращается имя без версии, чтобы
+        зависимость не пропала из графа.
+        """
+        requirement = self._parse_requirement(dep, req)
+        if requirement is None:
+            return dep
+        
+        selected = requirement.best_match(self.selected_versions.get(dep, ()))
+        if selected is not None:
+            return package_id(dep, selected)
+        
+        available = self.available_versions.get(dep)
+        best = requirement.best_match(available) if available else None
+        if best is None:
+            if available:
+                node_message(self.config, f"⚠️ Нет версии {dep}, подходящей под требование {req}")
+            return dep
+        
+        self._remember_version(dep, best)
+        return package_id(dep, best)
+    
+    def _remember_version(self, name: str, version: str) -> None:
+        try:
+            key = parse_version(version)
+        except ValueError:
+            return
+        selected = self.selected_versions.setdefault(name, [])
+        if (key, version) not in selected:
+            selected.append((key, version))
+            selected.sort(reverse=True)
+    
+    def resolve_dependencies(self, package_name: str, max_depth: Optional[int] = None) -> str:
+        """Поуровневый (BFS) обход: все пакеты текущего фронта загружаются одновременно
+        
+        Возвращает узел корня, под которым он попал в граф.
+        """
+        if max_depth is None:
+            max_depth = self.config.max_depth
+        root = self.resolve_root(package_name)
+        self._resolve_frontier([root], max_depth)
+        return root
+    
+    def collect_graph(self, packages: List[str]) -> Dict[str, List[str]]:
+        """Загружает полное замыкание зависимостей и возвращает его как граф"""
+        reachable = self._resolve_frontier(packages, None)
+        return {package: self.dependency_cache[package] for package in reachable}
+    
+    def _resolve_frontier(self, packages: List[str], max_depth: Optional[int]) -> List[str]:
+        """Загружает зависимости уровень за уровнем, max_depth=None - без ограничения"""
+        frontier = list(dict.fromkeys(packages))
+        seen = set(frontier)
+        order = []
+        depth = 0
+        
+        while frontier and (max_depth is None or depth < max_depth):
+            missing = [package for package in frontier if package not in self.dependency_cache]
+            with METRICS.span('parser.level'):
+                self.dependency_cache.update(self._fetch_many(missing))
+            METRICS.increment('parser.nodes_expanded', len(missing))
+            order.extend(frontier)
             
-            if response.status_code == 200:
-                data = response.json()
-                dependencies = []
-                
-                # Получаем последнюю версию
-                versions = data.get('versions', [])
-                if versions:
-                    latest = versions[0]
-                    deps = latest.get('dependencies', [])
-                    
-                    for dep in deps:
-                        if dep.get('kind') in [None, 'normal']:
-                            dep_name = dep.get('crate_id')
-                            if dep_name and dep_name not in dependencies:
-                                dependencies.append(dep_name)
-                
-                print(f"📦 Пакет {package_name} имеет {len(dependencies)} зависимостей")
-                return dependencies
-            else:
-                print(f"⚠️ Не удалось получить зависимости для {package_name} (код: {response.status_code})")
-                return []
-                
-        except Exception as e:
-            print(f"❌ Ошибка при запросе для {package_name}: {e}")
-            return []
+            next_frontier = []
+            edges = 0
+            for package in frontier:
+                dependencies = self.dependency_cache[package]
+                edges += len(dependencies)
+                for dep in dependencies:
+                    if dep not in seen:
+                        seen.add(dep)
+                        next_frontier.append(dep)
+            METRICS.increment('parser.edges_visited', edges)
+            
+            # Узлы, которым новые ребра добавили фичи, раскрываются заново
+            METRICS.increment('parser.reexpanded', len(self._stale))
+            for package in sorted(self._stale):
+                self.dependency_cache.pop(package, None)
+                if package not in next_frontier:
+                    next_frontier.append(package)
+            self._stale.clear()
+            frontier = next_frontier
+            depth += 1
+        
+        return order
+    
+    def forget(self, packages: Iterable[str]) -> None:
+        """Забывает раскрытые узлы вместе с отметками о повторном раскрытии
+
+        Нужно, когда пакеты разбираются как независимые корни и их строки
+        больше не понадобятся парсеру.
+        """
+        self._stale.clear()
+        for package in packages:
+            self.dependency_cache.pop(package, None)
+    
+    def close(self) -> None:
+        """Закрывает сетевые ресурсы парсера"""
+        if self._fetcher is not None:
+            self._fetcher.close()
+            if self._fetcher.cache is not None:
+                self._fetcher.cache.close()
+            self._fetcher = None
     
     def display_dependencies(self):
         """Выводит дерево зависимостей"""
@@ -75,76 +329,97 @@ class DependencyParser:
         for package in start_packages:
             print(f"\n🌳 ДЕРЕВО ЗАВИСИМОСТЕЙ ДЛЯ '{package}':")
             print("-" * 40)
-            self._print_dependency_tree(package)
+            # Заранее загружаем все уровни дерева параллельно
+            with METRICS.span('parser.resolve'):
+                root = self.resolve_dependencies(package)
+            with METRICS.span('parser.print_tree'):
+                self.print_dependency_tree(root)
         
         # Проверка циклических зависимостей
-        self._check_cyclic_dependencies()
-    
-    def _print_dependency_tree(self, package: str, depth: int = 0, path: list = None):
-        """Рекурсивно печатает дерево зависимостей"""
-        if path is None:
-            path = []
+        with METRICS.span('parser.cycle_check'):
+            self._check_cyclic_dependencies()
         
-        # Проверка на цикл
-        if package in path:
-            indent = "  " * depth
-            print(f"{indent}↻ {package} (ЦИКЛ!)")
-            return
+        if self._fetcher is not None:
+            self._fetcher.report_statistics()
+    
+    def print_dependency_tree(self, package: str, writer: Optional[TextIO] = None):
+        """Печатает дерево зависимостей, выводя строки пачками в writer
         
-        if depth >= self.config.max_depth:
-            indent = "  " * depth
-            print(f"{indent}... (достигнута максимальная глубина {self.config.max_depth})")
-            return
+        В режиме tree_mode=dag поддерево каждого пакета раскрывается один раз,
+        повторные вхождения печатаются ссылкой "(см. выше)". Пакет раскрывается
+        повторно, только если встретился ближе к корню, чем в прошлый раз
+        (иначе часть его поддерева была бы обрезана max_depth), поэтому работа
+        ограничена O(max_depth * (V + E)) вместо экспоненциальной.
+        """
+        if writer is None:
+            writer = sys.stdout
         
-        path.append(package)
-        dependencies = self.get_dependencies(package)
+        max_depth = self.config.max_depth
+        dedupe = self.config.tree_mode == 'dag'
+        expanded_at: Dict[str, int] = {}
+        on_path = set()
+        lines: List[str] = []
+        written = 0
         
-        indent = "  " * depth
-        if dependencies:
-            deps_str = ", ".join(dependencies)
-            print(f"{indent}📦 {package} → {deps_str}")
-        else:
-            print(f"{indent}📦 {package} → нет зависимостей")
+        # Явный стек: (пакет, глубина, признак выхода из поддерева)
+        stack = [(package, 0, False)]
+        while stack:
+            current, depth, leaving = stack.pop()
+            if leaving:
+                on_path.discard(current)
+                continue
+            
+            indent = "  " * depth
+            if current in on_path:
+                lines.append(f"{indent}↻ {current} (ЦИКЛ!)")
+            elif depth >= max_depth:
+                lines.append(f"{indent}... (достигнута максимальная глубина {max_depth})")
+            elif dedupe and expanded_at.get(current, max_depth) <= depth:
+                lines.append(f"{indent}📦 {current} (см. выше)")
+            else:
+                expanded_at[current] = depth
+                dependencies = self.get_dependencies(current)
+                if dependencies:
+                    lines.append(f"{indent}📦 {current} → {', '.join(dependencies)}")
+                else:
+                    lines.append(f"{indent}📦 {current} → нет зависимостей")
+                
+                on_path.add(current)
+                stack.append((current, depth, True))
+                for dep in reversed(dependencies):
+                    stack.append((dep, depth + 1, False))
+            
+            if len(lines) >= self.TREE_WRITE_BATCH:
+                written += len(lines)
+                writer.write("\n".join(lines) + "\n")
+                lines.clear()
         
-        # Рекурсивно обрабатываем зависимости
-        for dep in dependencies:
-            self._print_dependency_tree(dep, depth + 1, path.copy())
+        if lines:
+            written += len(lines)
+            writer.write("\n".join(lines) + "\n")
+        METRICS.increment('tree.lines', written)
     
     def _check_cyclic_dependencies(self):
         """Проверяет циклические зависимости"""
         print(f"\n🔍 ПРОВЕРКА ЦИКЛИЧЕСКИХ ЗАВИСИМОСТЕЙ:")
         print("-" * 40)
         
-        def find_cycle(current, visited, stack):
-            visited.add(current)
-            stack.add(current)
-            
-            for dep in self.get_dependencies(current):
-                if dep not in visited:
-                    if find_cycle(dep, visited, stack.copy()):
-                        return True
-                elif dep in stack:
-                    cycle_path = list(stack) + [dep]
-                    print(f"⚠️ Обнаружен цикл: {' → '.join(cycle_path)}")
-                    return True
-            
-            stack.remove(current)
-            return False
-        
         if self.config.test_mode:
             packages = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
         else:
-            packages = [self.config.package_name]
+            packages = [self.resolve_root(self.config.package_name)]
         
-        cycles_found = 0
-        visited = set()
+        # Все циклы ищутся одним проходом по компонентам сильной связности
+        graph = self.collect_graph(packages)
+        groups = find_cycle_groups(graph)
         
-        for package in packages:
-            if package not in visited:
-                if find_cycle(package, visited, set()):
-                    cycles_found += 1
+        for group in groups:
+            path = cycle_path(graph, group)
+            print(f"⚠️ Обнаружен цикл: {' → '.join(path)}")
+            if len(group) > len(path) - 1:
+                print(f"   Пакеты в цикле ({len(group)}): {', '.join(group)}")
         
-        if cycles_found == 0:
+        if not groups:
             print("✅ Циклические зависимости не обнаружены")
         else:
-            print(f"📊 Найдено циклических зависимостей: {cycles_found}")
\ No newline at end of file
+            print(f"📊 Найдено циклических зависимостей: {len(groups)}")
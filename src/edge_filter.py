@@ -0,0 +1,274 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+from config import Config
+from metrics import node_message
+
+
+class Requirement(NamedTuple):
+    """Зависимость версии пакета в том виде, как ее описывает реестр"""
+    name: str
+    req: str = '*'
+    kind: str = 'normal'
+    optional: bool = False
+    default_features: bool = True
+    features: Tuple[str, ...] = ()
+    # cfg(...) или целевая платформа, для которой нужна зависимость; None - всегда
+    target: Optional[str] = None
+    # Имя зависимости внутри пакета (отличается от name при переименовании)
+    alias: str = ''
+
+    @property
+    def local_name(self) -> str:
+        return self.alias or self.name
+
+    @classmethod
+    def from_registry(cls, name: str, dep: Mapping, alias: str = '') -> 'Requirement':
+        """Из записи зависимости crates.io API или индекса"""
+        return cls(name, dep.get('req') or '*', dep.get('kind') or 'normal',
+                   bool(dep.get('optional')), dep.get('default_features', True) is not False,
+                   tuple(dep.get('features') or ()), dep.get('target') or None,
+                   alias if alias and alias != name else '')
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> 'Requirement':
+        """Из строки кеша: поля по порядку, фичи - списком JSON"""
+        name, req, kind, optional, default_features, features, target, alias = row
+        return cls(name, req, kind, optional, default_features, tuple(features), target, alias)
+
+
+# Архитектуры, для которых target_arch отличается от первой части тройки
+_ARCH_ALIASES = {'i386': 'x86', 'i586': 'x86', 'i686': 'x86', 'armv7': 'arm', 'armv6': 'arm',
+                 'thumbv7em': 'arm', 'riscv64gc': 'riscv64', 'riscv32imac': 'riscv32'}
+_BIG_ENDIAN = {'powerpc', 'powerpc64', 's390x', 'mips', 'mips64', 'sparc64'}
+_OS_FAMILIES = {'linux': 'unix', 'android': 'unix', 'macos': 'unix', 'ios': 'unix', 'freebsd': 'unix',
+                'netbsd': 'unix', 'openbsd': 'unix', 'dragonfly': 'unix', 'solaris': 'unix',
+                'illumos': 'unix', 'windows': 'windows'}
+
+
+def target_cfg(triple: str) -> Dict[str, Set[str]]:
+    """Значения cfg для целевой тройки (x86_64-unknown-linux-gnu и т.п.)
+
+    Набор упрощен: распознаются архитектура, ОС, семейство, окружение,
+    производитель, разрядность указателя и порядок байтов.
+    """
+    parts = triple.split('-')
+    arch = parts[0]
+    arch = _ARCH_ALIASES.get(arch, 'arm' if arch.startswith('armv') else arch)
+    vendor = parts[1] if len(parts) >= 3 and parts[1] not in _OS_FAMILIES else 'unknown'
+
+    os_name = 'unknown' if len(parts) >= 3 and parts[2] == 'unknown' else 'none'
+    for part in parts[1:]:
+        if part == 'darwin':
+            os_name = 'macos'
+        elif part in _OS_FAMILIES or part in ('wasi', 'emscripten'):
+            os_name = part
+    # gnueabihf -> gnu, musleabi -> musl
+    env = parts[3] if len(parts) >= 4 else ''
+    for suffix in ('eabihf', 'eabi'):
+        if env.endswith(suffix):
+            env = env[:-len(suffix)]
+
+    cfg: Dict[str, Set[str]] = {
+        'target_arch': {arch},
+        'target_os': {os_name},
+        'target_vendor': {vendor},
+        'target_env': {env},
+        'target_endian': {'big' if arch in _BIG_ENDIAN else 'little'},
+        'target_pointer_width': {'64' if '64' in arch or arch == 's390x' else
+                                 '16' if arch == 'msp430' else '32'},
+        'target_family': set(),
+    }
+    family = _OS_FAMILIES.get(os_name)
+    if family:
+        cfg['target_family'].add(family)
+        # cfg(unix) и cfg(windows) - сокращения для target_family
+        cfg[family] = {''}
+    if arch.startswith('wasm'):
+        cfg['target_family'].add('wasm')
+    return cfg
+
+
+_CFG_TOKEN_RE = re.compile(r'\s*(?:([A-Za-z_][A-Za-z0-9_]*)|"([^"]*)"|([(),=]))')
+
+
+def _tokenize_cfg(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _CFG_TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Некорректное выражение cfg: {text}")
+        ident, string, punct = match.groups()
+        if ident is not None:
+            tokens.append(('ident', ident))
+        elif string is not None:
+            tokens.append(('string', string))
+        else:
+            tokens.append((punct, punct))
+        position = match.end()
+    return tokens
+
+
+def eval_cfg(expression: str, cfg: Mapping[str, Set[str]]) -> bool:
+    """Вычисляет cfg(...) выражение: all, any, not, имя и имя = "значение" """
+    tokens = _tokenize_cfg(expression)
+    position = 0
+
+    def expect(kind):
+        nonlocal position
+        if position >= len(tokens) or tokens[position][0] != kind:
+            raise ValueError(f"Некорректное выражение cfg: {expression}")
+        position += 1
+        return tokens[position - 1][1]
+
+    def predicate() -> bool:
+        nonlocal position
+        name = expect('ident')
+        if name in ('all', 'any', 'not') and position < len(tokens) and tokens[position][0] == '(':
+            expect('(')
+            values = []
+            while tokens[position][0] != ')':
+                values.append(predicate())
+                if tokens[position][0] == ',':
+                    position += 1
+            expect(')')
+            if name == 'all':
+                return all(values)
+            if name == 'any':
+                return any(values)
+            if len(values) != 1:
+                raise ValueError(f"not() принимает одно условие: {expression}")
+            return not values[0]
+        if position < len(tokens) and tokens[position][0] == '=':
+            position += 1
+            return expect('string') in cfg.get(name, ())
+        return name in cfg
+
+    try:
+        result = predicate()
+    except IndexError:
+        raise ValueError(f"Некорректное выражение cfg: {expression}")
+    if position != len(tokens):
+        raise ValueError(f"Некорректное выражение cfg: {expression}")
+    return result
+
+
+def resolve_features(table: Mapping[str, Iterable[str]], requested: Iterable[str],
+                     requirements: Sequence[Requirement],
+                     all_features: bool = False) -> Tuple[Set[str], Dict[str, Set[str]]]:
+    """Включенные необязательные зависимости и фичи, которые нужно включить у зависимостей
+
+    Поддерживаются записи таблицы фич Cargo: "фича", "dep:имя", "имя/фича"
+    и "имя?/фича"; необязательная зависимость без явной фичи с ее именем
+    включается одноименной неявной фичей.
+    """
+    optional = {r.local_name for r in requirements if r.optional}
+    enabled_deps: Set[str] = set()
+    dep_features: Dict[str, Set[str]] = {}
+    weak: List[Tuple[str, str]] = []
+
+    stack = list(table) + list(optional) if all_features else list(requested)
+    enabled: Set[str] = set()
+    while stack:
+        feature = stack.pop()
+        if feature in enabled:
+            continue
+        enabled.add(feature)
+        if feature in optional and feature not in table:
+            enabled_deps.add(feature)
+        for item in table.get(feature, ()):
+            if item.startswith('dep:'):
+                enabled_deps.add(item[4:])
+            elif '/' in item:
+                dep, dep_feature = item.split('/', 1)
+                if dep.endswith('?'):
+                    weak.append((dep[:-1], dep_feature))
+                else:
+                    enabled_deps.add(dep)
+                    dep_features.setdefault(dep, set()).add(dep_feature)
+            else:
+                stack.append(item)
+
+    # "имя?/фича" не включает зависимость, а только дополняет уже включенную
+    for dep, dep_feature in weak:
+        if dep in enabled_deps or dep not in optional:
+            dep_features.setdefault(dep, set()).add(dep_feature)
+    return enabled_deps & optional, dep_features
+
+
+class EdgeFilter:
+    """Отбор ребер под конкретную конфигурацию сборки
+
+    Статическая часть (вид зависимости и платформа) применяется в слое
+    загрузки, поэтому отброшенные зависимости не скачиваются вовсе. Выбор
+    необязательных зависимостей зависит от включенных фич узла и делается
+    при разрешении версий.
+    """
+
+    DEFAULT = 'default'
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.kinds = set(config.dependency_kinds)
+        self.features = list(config.features)
+        self.default_features = config.default_features
+        self.all_features = config.all_features
+        self.cfg = target_cfg(config.target) if config.target else None
+        self.target = config.target
+        self._target_results: Dict[str, bool] = {}
+
+    def root_features(self) -> FrozenSet[str]:
+        """Фичи, запрошенные для корневого пакета"""
+        features = set(self.features)
+        if self.default_features:
+            features.add(self.DEFAULT)
+        return frozenset(features)
+
+    def accepts(self, requirement: Requirement) -> bool:
+        """Подходит ли зависимость по виду и целевой платформе"""
+        if requirement.kind not in self.kinds:
+            return False
+        return self.matches_target(requirement.target)
+
+    def filter(self, requirements: Iterable[Requirement]) -> List[Requirement]:
+        return [requirement for requirement in requirements if self.accepts(requirement)]
+
+    def matches_target(self, target: Optional[str]) -> bool:
+        """Платформенные зависимости учитываются все, если целевая платформа не задана"""
+        if not target or self.cfg is None:
+            return True
+        result = self._target_results.get(target)
+        if result is None:
+            if target.startswith('cfg(') and target.endswith(')'):
+                try:
+                    result = eval_cfg(target[4:-1], self.cfg)
+                except ValueError as e:
+                    node_message(self.config, f"⚠️ {e}")
+                    result = True
+            else:
+                result = target == self.target
+            self._target_results[target] = result
+        return result
+
+    def select(self, requirements: Sequence[Requirement], table: Mapping[str, Iterable[str]],
+               requested: Iterable[str], root: bool = False) -> List[Tuple[Requirement, FrozenSet[str]]]:
+        """Активные ребра узла и фичи, которые каждое ребро запрашивает у зависимости
+
+        Dev-зависимости и all_features, как и в Cargo, относятся только к корневым пакетам.
+        """
+        enabled_deps, dep_features = resolve_features(table, requested, requirements,
+                                                      self.all_features and root)
+        selected = []
+        for requirement in requirements:
+            if requirement.kind == 'dev' and not root:
+                continue
+            if requirement.optional and requirement.local_name not in enabled_deps:
+                continue
+            features = set(requirement.features)
+            features.update(dep_features.get(requirement.local_name, ()))
+            if requirement.default_features:
+                features.add(self.DEFAULT)
+            selected.append((requirement, frozenset(features)))
+        return selected
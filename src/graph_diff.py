@@ -0,0 +1,220 @@
+"""Разница между двумя графами зависимостей, например до и после синхронизации реестра
+
+Узлы сопоставляются по имени через словарь хранилища, строки ребер
+сравниваются слиянием отсортированных номеров, группы циклов - по
+хешируемым множествам пакетов. Число транзитивных обратных зависимостей
+пересчитывается только для пакетов, достижимых из концов измененных ребер:
+у остальных множество зависящих пакетов не могло измениться.
+"""
+from array import array
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+
+from config import Config
+from dependency_graph import DependencyGraph
+from graph_store import CompactGraph
+from metrics import METRICS
+from visualizer import MermaidExporter
+
+Edge = Tuple[str, str]
+
+
+def _merge_rows(old: Sequence[int], new: Sequence[int]) -> Tuple[List[int], List[int]]:
+    """Элементы только старой и только новой отсортированной строки"""
+    removed, added = [], []
+    i = j = 0
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            i += 1
+            j += 1
+        elif old[i] < new[j]:
+            removed.append(old[i])
+            i += 1
+        else:
+            added.append(new[j])
+            j += 1
+    removed.extend(old[i:])
+    added.extend(new[j:])
+    return removed, added
+
+
+def _edge_changes(old: CompactGraph, new: CompactGraph) -> Tuple[List[Edge], List[Edge]]:
+    """Добавленные и удаленные ребра за один проход по строкам обоих хранилищ"""
+    new_index = new.index
+    old_index = old.index
+    old_names, new_names = old.names, new.names
+    # Номер узла в новом хранилище для каждого старого; удаленным узлам - отрицательные номера,
+    # чтобы они не совпали ни с одним новым
+    translate = array('i', (new_index.get(name, -1 - node) for node, name in enumerate(old_names)))
+
+    def old_name(target: int) -> str:
+        return new_names[target] if target >= 0 else old_names[-1 - target]
+
+    added: List[Edge] = []
+    removed: List[Edge] = []
+    for node in range(new.node_count):
+        package = new_names[node]
+        old_node = old_index.get(package)
+        new_row = sorted(new.successors(node))
+        old_row = sorted(translate[dep] for dep in old.successors(old_node)) if old_node is not None else []
+        if new_row == old_row:
+            continue
+        gone, appeared = _merge_rows(old_row, new_row)
+        removed.extend((package, old_name(dep)) for dep in gone)
+        added.extend((package, new_names[dep]) for dep in appeared)
+
+    for node in range(old.node_count):
+        if translate[node] < 0:
+            removed.extend((old_names[node], old_names[dep]) for dep in old.successors(node))
+    added.sort()
+    removed.sort()
+    return added, removed
+
+
+class GraphDiff:
+    """Изменения между старым и новым графом; строится функцией diff_graphs"""
+
+    def __init__(self, old: DependencyGraph, new: DependencyGraph):
+        self.old = old
+        self.new = new
+        old_store, new_store = old.store, new.store
+
+        with METRICS.span('diff.nodes'):
+            self.added_nodes = sorted(name for name in new_store.names if name not in old_store.index)
+            self.removed_nodes = sorted(name for name in old_store.names if name not in new_store.index)
+        with METRICS.span('diff.edges'):
+            self.added_edges, self.removed_edges = _edge_changes(old_store, new_store)
+
+        # Группы циклов берутся из графов как есть: для снимков они уже посчитаны
+        old_groups = {frozenset(group): group for group in old.cycle_groups}
+        new_groups = {frozenset(group): group for group in new.cycle_groups}
+        self.new_cycle_groups = sorted(group for key, group in new_groups.items() if key not in old_groups)
+        self.resolved_cycle_groups = sorted(group for key, group in old_groups.items() if key not in new_groups)
+
+        with METRICS.span('diff.reverse_counts'):
+            self.reverse_count_changes = self._reverse_count_changes()
+        METRICS.gauge('diff.changed_edges', len(self.added_edges) + len(self.removed_edges))
+
+    def _reverse_count_changes(self) -> List[Tuple[str, int, int]]:
+        """(пакет, было, стало) для пакетов, у которых изменилось число транзитивных обратных зависимостей
+
+        Новый путь к пакету проходит через добавленное ребро, пропавший - через
+        удаленное, поэтому пересчитываются только пакеты, достижимые из концов
+        этих ребер в новом или старом графе.
+        """
+        old_store, new_store = self.old.store, self.new.store
+        affected: Set[str] = set()
+        for store, edges in ((new_store, self.added_edges), (old_store, self.removed_edges)):
+            targets = {store.index[target] for _, target in edges}
+            affected.update(store.names[node] for node in store.reachable_from(targets))
+        common = sorted(name for name in affected if name in old_store.index and name in new_store.index)
+        if not common:
+            return []
+
+        before = self.old.count_transitive_reverse_dependencies(common)
+        after = self.new.count_transitive_reverse_dependencies(common)
+        changes = [(name, before[name], after[name]) for name in common if before[name] != after[name]]
+        changes.sort(key=lambda change: (-abs(change[2] - change[1]), change[0]))
+        return changes
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added_nodes or self.removed_nodes or self.added_edges or self.removed_edges)
+
+    def changed_packages(self) -> List[str]:
+        """Пакеты, затронутые изменениями: новые, удаленные, концы измененных ребер и участники изменившихся циклов"""
+        packages = set(self.added_nodes) | set(self.removed_nodes)
+        for source, target in self.added_edges + self.removed_edges:
+            packages.add(source)
+            packages.add(target)
+        for group in self.new_cycle_groups + self.resolved_cycle_groups:
+            packages.update(group)
+        return sorted(packages)
+
+    def changed_region(self) -> DependencyGraph:
+        """Подграф измененной области: ребра нового графа между затронутыми пакетами и удаленные ребра"""
+        packages = set(self.changed_packages())
+        new_graph = self.new.graph
+        adjacency = {package: [] for package in sorted(packages)}
+        for package in adjacency:
+            if package in new_graph:
+                adjacency[package] = [dep for dep in new_graph[package] if dep in packages]
+        for source, target in self.removed_edges:
+            adjacency[source].append(target)
+
+        region = DependencyGraph(self.new.config)
+        region.graph = adjacency
+        region.find_cycle_groups(report=False)
+        return region
+
+    def mermaid(self) -> str:
+        """Mermaid-диаграмма только измененной области"""
+        return "\n".join(DiffMermaidExporter(self).lines())
+
+    def display(self, limit: int = 20) -> None:
+        """Выводит сводку изменений, по каждому виду - не больше limit строк"""
+        print("\n🔀 ИЗМЕНЕНИЯ ГРАФА ЗАВИСИМОСТЕЙ")
+        print("-" * 50)
+        if self.is_empty:
+            print("Графы совпадают")
+            return
+
+        sections = [
+            ("Новые пакеты", [f"+ {name}" for name in self.added_nodes]),
+            ("Удаленные пакеты", [f"- {name}" for name in self.removed_nodes]),
+            ("Новые ребра", [f"+ {source} -> {target}" for source, target in self.added_edges]),
+            ("Удаленные ребра", [f"- {source} -> {target}" for source, target in self.removed_edges]),
+            ("Новые циклы", [f"+ {', '.join(group)}" for group in self.new_cycle_groups]),
+            ("Исчезнувшие циклы", [f"- {', '.join(group)}" for group in self.resolved_cycle_groups]),
+            ("Число транзитивных обратных зависимостей",
+             [f"  {name}: {before} -> {after}" for name, before, after in self.reverse_count_changes]),
+        ]
+        for title, lines in sections:
+            if not lines:
+                continue
+            print(f"{title}: {len(lines)}")
+            for line in lines[:limit]:
+                print(f"  {line}")
+            if len(lines) > limit:
+                print(f"  ... и еще {len(lines) - limit}")
+
+
+class DiffMermaidExporter(MermaidExporter):
+    """Mermaid измененной области: новые ребра и пакеты зеленым, удаленные - красным пунктиром"""
+
+    def __init__(self, diff: GraphDiff, region: Optional[DependencyGraph] = None):
+        super().__init__(region or diff.changed_region())
+        self.diff = diff
+        self.added_edges = set(diff.added_edges)
+        self.removed_edges = set(diff.removed_edges)
+
+    def edge_style(self, node: int, dep: int) -> Tuple[str, Optional[str]]:
+        names = self.store.names
+        edge = (names[node], names[dep])
+        if edge in self.removed_edges:
+            return "-.->", "stroke:#c00,stroke-width:2px,stroke-dasharray:4"
+        if edge in self.added_edges:
+            return "==>", "stroke:#080,stroke-width:2px"
+        # Циклы - по новому графу: удаленные ребра области могли замкнуть ложный цикл
+        if self.diff.new.in_same_cycle_group(*edge):
+            return "-.->", "stroke:red,stroke-width:1px"
+        return "-->", None
+
+    def node_styles(self) -> Iterator[str]:
+        for package in self.diff.added_nodes:
+            yield f"    style {self.package_id(package)} fill:#cfc,stroke:#080"
+        for package in self.diff.removed_nodes:
+            yield f"    style {self.package_id(package)} fill:#fcc,stroke:#c00,stroke-dasharray:4"
+
+
+def diff_graphs(old: DependencyGraph, new: DependencyGraph) -> GraphDiff:
+    """Разница между двумя графами; графы не изменяются"""
+    return GraphDiff(old, new)
+
+
+def diff_snapshots(old_path: str, new_path: str, config: Optional[Config] = None) -> GraphDiff:
+    """Разница между двумя двоичными снимками графа"""
+    config = config or Config()
+    old, new = DependencyGraph(config), DependencyGraph(config)
+    old.load_snapshot(old_path)
+    new.load_snapshot(new_path)
+    return GraphDiff(old, new)
@@ -0,0 +1,221 @@
+"""Двоичные снимки графа зависимостей с загрузкой через mmap
+
+Формат (все числа little-endian):
+
+    заголовок   magic "DGSNAP\\0\\1", версия u32, число секций u32
+    оглавление  для каждой секции: тег (4 байта), смещение i64, длина i64
+    секции      выровнены по 8 байтам
+
+Секции: NAME - имена пакетов через "\\n" в UTF-8, KNWN - признаки known
+по байту на узел, FOFF/FTGT и ROFF/RTGT - прямые и обратные массивы CSR
+(смещения i64, номера узлов i32), GOFF/GMEM и COFF/CMEM - группы циклов и
+примеры циклов в том же виде, META - JSON с произвольными сведениями.
+
+Массивы ребер не копируются при загрузке: хранилище работает прямо
+поверх отображенного в память файла, копируются только имена и признаки.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+from graph_store import CompactGraph
+
+MAGIC = b'DGSNAP\x00\x01'
+VERSION = 1
+_HEADER = struct.Struct('<8sII')
+_SECTION = struct.Struct('<4sqq')
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+_SECTIONS = (b'NAME', b'KNWN', b'FOFF', b'FTGT', b'ROFF', b'RTGT', b'GOFF', b'GMEM', b'COFF', b'CMEM', b'META')
+
+
+class GraphSnapshot(NamedTuple):
+    """Содержимое снимка: хранилище, группы циклов и примеры циклов по именам"""
+    store: CompactGraph
+    cycle_groups: List[List[str]]
+    cycles: List[List[str]]
+    meta: Dict
+    # Отображение файла, поверх которого работают массивы ребер хранилища
+    mapping: Optional[mmap.mmap] = None
+
+
+def _array_bytes(typecode: str, values: Sequence[int]) -> bytes:
+    data = values if isinstance(values, array) and values.typecode == typecode else array(typecode, values)
+    if not _LITTLE_ENDIAN:
+        data = array(typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def _groups_bytes(store: CompactGraph, groups: Sequence[Sequence[str]]) -> List[bytes]:
+    """Группы имен как пара массивов CSR (смещения, номера узлов)"""
+    offsets = array('q', [0])
+    members = array('i')
+    for group in groups:
+        members.extend(store.index[name] for name in group)
+        offsets.append(len(members))
+    return [_array_bytes('q', offsets), _array_bytes('i', members)]
+
+
+def write_snapshot(path: str, store: CompactGraph, cycle_groups: Sequence[Sequence[str]] = (),
+                   cycles: Sequence[Sequence[str]] = (), meta: Optional[Mapping] = None) -> None:
+    """Записывает снимок; файл подменяется атомарно, открытые снимки остаются целыми"""
+    if store.patched_rows:
+        store.compact()
+    for name in store.names:
+        if '\n' in name:
+            raise ValueError(f"Имя пакета не может содержать перевод строки: {name!r}")
+
+    group_offsets, group_members = _groups_bytes(store, cycle_groups)
+    cycle_offsets, cycle_members = _groups_bytes(store, cycles)
+    sections = [
+        (b'NAME', '\n'.join(store.names).encode('utf-8')),
+        (b'KNWN', bytes(store.known)),
+        (b'FOFF', _array_bytes('q', store.forward_offsets)),
+        (b'FTGT', _array_bytes('i', store.forward_targets)),
+        (b'ROFF', _array_bytes('q', store.reverse_offsets)),
+        (b'RTGT', _array_bytes('i', store.reverse_targets)),
+        (b'GOFF', group_offsets),
+        (b'GMEM', group_members),
+        (b'COFF', cycle_offsets),
+        (b'CMEM', cycle_members),
+        (b'META', json.dumps(dict(meta or {}), ensure_ascii=False).encode('utf-8')),
+    ]
+
+    position = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for tag, data in sections:
+        position += -position % 8
+        table.append((tag, position, len(data)))
+        position += len(data)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+        for entry in table:
+            f.write(_SECTION.pack(*entry))
+        for (tag, offset, _), (_, data) in zip(table, sections):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+    os.replace(temporary, path)
+
+
+def read_snapshot(path: str) -> GraphSnapshot:
+    """Открывает снимок через mmap; массивы ребер читаются с диска по мере обращения
+
+    Любое повреждение файла дает ValueError, отображение при этом закрывается.
+    Массивы ребер проверяются по длинам и крайним смещениям, без просмотра
+    содержимого, иначе загрузка читала бы весь файл.
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Ошибка загрузки снимка графа: {e}")
+
+    view = memoryview(mapping)
+    message = _header_error(path, view)
+    if message is None:
+        try:
+            return _parse_sections(view)._replace(mapping=mapping)
+        except (ValueError, struct.error, KeyError, IndexError, TypeError, OverflowError) as e:
+            message = f"Снимок графа {path} поврежден: {e}"
+    # Отображение закрывается вне блока except: трассировка исключения держит представления поверх него
+    view.release()
+    mapping.close()
+    raise ValueError(message)
+
+
+def close_snapshot(snapshot: GraphSnapshot) -> None:
+    """Освобождает отображение снимка, который не пригодился
+
+    Хранилище снимка после этого использовать нельзя.
+    """
+    store = snapshot.store
+    for values in (store.forward_offsets, store.forward_targets,
+                   store.reverse_offsets, store.reverse_targets):
+        if isinstance(values, memoryview):
+            values.release()
+    if snapshot.mapping is not None:
+        snapshot.mapping.close()
+
+
+def _header_error(path: str, view: memoryview) -> Optional[str]:
+    """Причина, по которой файл не читается как снимок; None - заголовок в порядке"""
+    if len(view) < _HEADER.size:
+        return f"{path} не является снимком графа"
+    magic, version, _ = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        return f"{path} не является снимком графа"
+    if version != VERSION:
+        return f"Неподдерживаемая версия снимка графа: {version}"
+    return None
+
+
+def _parse_sections(view: memoryview) -> GraphSnapshot:
+    """Секции снимка с проверкой оглавления, длин и согласованности массивов"""
+    count = _HEADER.unpack_from(view)[2]
+    table_end = _HEADER.size + count * _SECTION.size
+    if table_end > len(view):
+        raise ValueError("оглавление за концом файла")
+
+    sections: Dict[bytes, memoryview] = {}
+    for i in range(count):
+        tag, offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+        if tag in sections:
+            raise ValueError(f"секция {tag!r} повторяется")
+        if offset < table_end or length < 0 or offset + length > len(view):
+            raise ValueError(f"секция {tag!r} за пределами файла")
+        sections[tag] = view[offset:offset + length]
+    missing = [tag for tag in _SECTIONS if tag not in sections]
+    if missing:
+        raise ValueError(f"нет секций {b', '.join(missing)!r}")
+
+    def typed(tag: bytes, typecode: str) -> Sequence[int]:
+        data = sections[tag]
+        if len(data) % array(typecode).itemsize:
+            raise ValueError(f"длина секции {tag!r} не кратна размеру элемента")
+        if _LITTLE_ENDIAN:
+            # Представление поверх mmap: ничего не копируется
+            return data.cast(typecode)
+        values = array(typecode, bytes(data))
+        values.byteswap()
+        return values
+
+    try:
+        text = bytes(sections[b'NAME']).decode('utf-8')
+        meta = json.loads(bytes(sections[b'META']).decode('utf-8'))
+    except ValueError as e:
+        raise ValueError(f"некорректные имена или сведения: {e}")
+    if not isinstance(meta, dict):
+        raise ValueError("сведения META не являются объектом JSON")
+    names = text.split('\n') if text else []
+    node_count = len(names)
+    if len(sections[b'KNWN']) != node_count:
+        raise ValueError("число признаков KNWN не совпадает с числом имен")
+
+    edges = []
+    for offsets_tag, targets_tag in ((b'FOFF', b'FTGT'), (b'ROFF', b'RTGT')):
+        offsets, targets = typed(offsets_tag, 'q'), typed(targets_tag, 'i')
+        if len(offsets) != node_count + 1 or offsets[0] != 0 or offsets[-1] != len(targets):
+            raise ValueError(f"секции {offsets_tag!r} и {targets_tag!r} не согласованы")
+        edges += [offsets, targets]
+    store = CompactGraph(names, bytearray(sections[b'KNWN']), *edges)
+
+    def groups(offsets_tag: bytes, members_tag: bytes) -> List[List[str]]:
+        offsets = typed(offsets_tag, 'q')
+        members = typed(members_tag, 'i')
+        if not offsets or offsets[0] != 0 or offsets[-1] != len(members):
+            raise ValueError(f"секции {offsets_tag!r} и {members_tag!r} не согласованы")
+        result = []
+        for i in range(len(offsets) - 1):
+            group = members[offsets[i]:offsets[i + 1]]
+            if offsets[i] > offsets[i + 1] or any(not 0 <= node < node_count for node in group):
+                raise ValueError(f"секция {members_tag!r} ссылается на несуществующие узлы")
+            result.append([names[node] for node in group])
+        return result
+
+    return GraphSnapshot(store, groups(b'GOFF', b'GMEM'), groups(b'COFF', b'CMEM'), meta)
@@ -0,0 +1,356 @@
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+
+class CompactGraph:
+    """Компактное хранилище графа: интернированные имена и смежность в формате CSR
+
+    Каждое имя пакета хранится один раз и получает целочисленный номер.
+    Зависимости узла i - это targets[offsets[i]:offsets[i + 1]] в массиве
+    прямых ребер, для обратных ребер хранится такая же пара массивов.
+    Признак known отличает пакеты, для которых известен список зависимостей,
+    от пакетов, которые встречались только как чьи-то зависимости.
+
+    Точечные изменения не перестраивают массивы: измененные строки хранятся
+    в словарях поверх CSR, а compact() переносит их обратно в массивы.
+    Номера узлов при этом не меняются.
+    """
+
+    def __init__(self, names: List[str], known: bytearray,
+                 forward_offsets: array, forward_targets: array,
+                 reverse_offsets: array, reverse_targets: array):
+        self.names = names
+        self.index: Dict[str, int] = dict(zip(names, range(len(names))))
+        self.known = known
+        self.known_count = len(known) - known.count(0)
+        self.forward_offsets = forward_offsets
+        self.forward_targets = forward_targets
+        self.reverse_offsets = reverse_offsets
+        self.reverse_targets = reverse_targets
+        # Строки, измененные после построения массивов
+        self._base_count = len(names)
+        self._forward_patch: Dict[int, List[int]] = {}
+        self._reverse_patch: Dict[int, List[int]] = {}
+        self._edge_count = len(forward_targets)
+
+    @classmethod
+    def empty(cls) -> 'CompactGraph':
+        return cls([], bytearray(), array('q', [0]), array('i'), array('q', [0]), array('i'))
+
+    @classmethod
+    def from_adjacency(cls, rows: Iterable[Tuple[str, Iterable[str]]]) -> 'CompactGraph':
+        """Строит граф за один проход по парам (пакет, зависимости)
+
+        Строки могут приходить в любом порядке, поэтому ребра сначала
+        складываются в порядке поступления, а затем раскладываются по
+        номерам узлов сортировкой подсчетом - без словарей списков.
+        """
+        names: List[str] = []
+        index: Dict[str, int] = {}
+        known = bytearray()
+        row_nodes = array('i')
+        row_ends = array('q')
+        edges = array('i')
+
+        def intern(name: str) -> int:
+            node = index.get(name)
+            if node is None:
+                node = len(names)
+                index[name] = node
+                names.append(name)
+                known.append(0)
+            return node
+
+        for package, dependencies in rows:
+            node = intern(package)
+            if known[node]:
+                raise ValueError(f"Зависимости пакета {package} заданы повторно")
+            known[node] = 1
+            for dep in dependencies:
+                edges.append(intern(dep))
+            row_nodes.append(node)
+            row_ends.append(len(edges))
+
+        node_count = len(names)
+        forward_offsets = array('q', bytes(8 * (node_count + 1)))
+        row_starts = array('q', bytes(8 * node_count))
+        start = 0
+        for node, end in zip(row_nodes, row_ends):
+            forward_offsets[node + 1] = end - start
+            row_starts[node] = start
+            start = end
+        for i in range(node_count):
+            forward_offsets[i + 1] += forward_offsets[i]
+
+        forward_targets = array('i', bytes(4 * len(edges)))
+        for node in row_nodes:
+            begin = row_starts[node]
+            length = forward_offsets[node + 1] - forward_offsets[node]
+            position = forward_offsets[node]
+            forward_targets[position:position + length] = edges[begin:begin + length]
+
+        reverse_offsets, reverse_targets = cls._transpose(node_count, forward_offsets, forward_targets)
+        return cls(names, known, forward_offsets, forward_targets, reverse_offsets, reverse_targets)
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple[str, Optional[str]]]) -> 'CompactGraph':
+        """Строит граф из потока ребер (пакет, зависимость) в произвольном порядке
+
+        Ребро с зависимостью None только объявляет пакет. Ребра копятся
+        в двух массивах номеров и раскладываются по источникам сортировкой
+        подсчетом, поэтому память - это только сам граф.
+        """
+        names: List[str] = []
+        index: Dict[str, int] = {}
+        known = bytearray()
+        sources = array('i')
+        targets = array('i')
+
+        def intern(name: str) -> int:
+            node = index.get(name)
+            if node is None:
+                node = len(names)
+                index[name] = node
+                names.append(name)
+                known.append(0)
+            return node
+
+        for source, target in edges:
+            node = intern(source)
+            known[node] = 1
+            if target is not None:
+                sources.append(node)
+                targets.append(intern(target))
+
+        node_count = len(names)
+        forward_offsets = array('q', bytes(8 * (node_count + 1)))
+        for node in sources:
+            forward_offsets[node + 1] += 1
+        for i in range(node_count):
+            forward_offsets[i + 1] += forward_offsets[i]
+
+        fill = array('q', forward_offsets[:-1]) if node_count else array('q')
+        forward_targets = array('i', bytes(4 * len(targets)))
+        for node, target in zip(sources, targets):
+            forward_targets[fill[node]] = target
+            fill[node] += 1
+        del sources, targets, fill
+
+        reverse_offsets, reverse_targets = cls._transpose(node_count, forward_offsets, forward_targets)
+        return cls(names, known, forward_offsets, forward_targets, reverse_offsets, reverse_targets)
+
+    @staticmethod
+    def _transpose(node_count: int, offsets: array, targets: array) -> Tuple[array, array]:
+        """Обратные ребра сортировкой подсчетом, источники идут по возрастанию номера"""
+        reverse_offsets = array('q', bytes(8 * (node_count + 1)))
+        for target in targets:
+            reverse_offsets[target + 1] += 1
+        for i in range(node_count):
+            reverse_offsets[i + 1] += reverse_offsets[i]
+
+        fill = array('q', reverse_offsets[:-1]) if node_count else array('q')
+        reverse_targets = array('i', bytes(4 * len(targets)))
+        for source in range(node_count):
+            for position in range(offsets[source], offsets[source + 1]):
+                target = targets[position]
+                reverse_targets[fill[target]] = source
+                fill[target] += 1
+        return reverse_offsets, reverse_targets
+
+    @property
+    def node_count(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return self._edge_count
+
+    @property
+    def patched_rows(self) -> int:
+        """Число строк, хранящихся вне массивов CSR"""
+        return len(self._forward_patch) + len(self._reverse_patch)
+
+    def id_of(self, name: str) -> Optional[int]:
+        return self.index.get(name)
+
+    def successors(self, node: int) -> Sequence[int]:
+        row = self._forward_patch.get(node)
+        if row is not None:
+            return row
+        if node >= self._base_count:
+            return ()
+        return self.forward_targets[self.forward_offsets[node]:self.forward_offsets[node + 1]]
+
+    def predecessors(self, node: int) -> Sequence[int]:
+        row = self._reverse_patch.get(node)
+        if row is not None:
+            return row
+        if node >= self._base_count:
+            return ()
+        return self.reverse_targets[self.reverse_offsets[node]:self.reverse_offsets[node + 1]]
+
+    def reachable_from(self, roots: Iterable[int]) -> List[int]:
+        """Узлы, достижимые из roots, в порядке обхода в глубину"""
+        seen = bytearray(self.node_count)
+        order = []
+        stack = list(roots)
+        stack.reverse()
+        while stack:
+            node = stack.pop()
+            if seen[node]:
+                continue
+            seen[node] = 1
+            order.append(node)
+            # В обратном порядке, чтобы обходить зависимости в исходной последовательности
+            for dep in reversed(self.successors(node)):
+                if not seen[dep]:
+                    stack.append(dep)
+        return order
+
+    def induced(self, nodes: List[int]) -> 'CompactGraph':
+        """Новый граф из указанных узлов и ребер между ними, номера идут в порядке nodes"""
+        remap = array('i', [-1]) * self.node_count
+        for new, old in enumerate(nodes):
+            remap[old] = new
+
+        forward_offsets = array('q', [0])
+        forward_targets = array('i')
+        for old in nodes:
+            for dep in self.successors(old):
+                if remap[dep] >= 0:
+                    forward_targets.append(remap[dep])
+            forward_offsets.append(len(forward_targets))
+
+        names = [self.names[old] for old in nodes]
+        known = bytearray(self.known[old] for old in nodes)
+        reverse_offsets, reverse_targets = self._transpose(len(nodes), forward_offsets, forward_targets)
+        return CompactGraph(names, known, forward_offsets, forward_targets, reverse_offsets, reverse_targets)
+
+    def mark_all_known(self) -> None:
+        """Считает известными зависимости всех узлов (отсутствующие - пустыми)"""
+        self.known = bytearray(b'\x01') * self.node_count
+        self.known_count = self.node_count
+
+    def ensure_node(self, name: str) -> int:
+        """Номер пакета, новый пакет добавляется в конец таблицы имен"""
+        node = self.index.get(name)
+        if node is None:
+            node = len(self.names)
+            self.index[name] = node
+            self.names.append(name)
+            self.known.append(0)
+        return node
+
+    def set_successors(self, node: int, targets: List[int]) -> Tuple[List[int], List[int]]:
+        """Заменяет зависимости узла, возвращает (удаленные, добавленные) ребра"""
+        old = Counter(self.successors(node))
+        new = Counter(targets)
+        removed = list((old - new).elements())
+        added = list((new - old).elements())
+
+        for target in removed:
+            row = list(self.predecessors(target))
+            row.remove(node)
+            self._reverse_patch[target] = row
+        for target in added:
+            row = self._reverse_patch.get(target)
+            if row is None:
+                row = self._reverse_patch[target] = list(self.predecessors(target))
+            row.append(node)
+
+        self._forward_patch[node] = list(targets)
+        self._edge_count += len(targets) - sum(old.values())
+        self._set_known(node, True)
+        return removed, added
+
+    def clear_successors(self, node: int) -> List[int]:
+        """Удаляет все зависимости узла и снимает признак known"""
+        removed, _ = self.set_successors(node, [])
+        self._set_known(node, False)
+        return removed
+
+    def compact(self) -> None:
+        """Переносит измененные строки обратно в массивы CSR"""
+        rows = [(node, self.successors(node)) for node in range(self.node_count)]
+        forward_offsets = array('q', [0])
+        forward_targets = array('i')
+        for _, targets in rows:
+            forward_targets.extend(targets)
+            forward_offsets.append(len(forward_targets))
+
+        self.forward_offsets = forward_offsets
+        self.forward_targets = forward_targets
+        self.reverse_offsets, self.reverse_targets = self._transpose(
+            self.node_count, forward_offsets, forward_targets)
+        self._base_count = self.node_count
+        self._forward_patch = {}
+        self._reverse_patch = {}
+
+    def _set_known(self, node: int, known: bool) -> None:
+        if bool(self.known[node]) != known:
+            self.known[node] = int(known)
+            self.known_count += 1 if known else -1
+
+    def id_adjacency(self) -> 'IdAdjacency':
+        """Смежность по номерам узлов для алгоритмов на графе"""
+        return IdAdjacency(self)
+
+    def array_bytes(self) -> int:
+        """Объем массивов смежности в байтах (без таблицы имен)"""
+        arrays = (self.forward_offsets, self.forward_targets,
+                  self.reverse_offsets, self.reverse_targets)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self.known)
+
+
+class IdAdjacency(Mapping):
+    """Отображение номер узла -> номера зависимостей поверх массивов CSR"""
+
+    def __init__(self, store: CompactGraph):
+        self._store = store
+
+    def __getitem__(self, node: int) -> array:
+        if not 0 <= node < self._store.node_count:
+            raise KeyError(node)
+        return self._store.successors(node)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._store.node_count))
+
+    def __len__(self) -> int:
+        return self._store.node_count
+
+
+class AdjacencyView(Mapping):
+    """Представление хранилища в виде словаря пакет -> список пакетов
+
+    Прямое представление содержит только пакеты с известными зависимостями
+    (как прежний DependencyGraph.graph), обратное - все встречавшиеся пакеты.
+    Списки создаются при обращении и не хранятся.
+    """
+
+    def __init__(self, store: CompactGraph, reverse: bool = False):
+        self._store = store
+        self._reverse = reverse
+
+    def __getitem__(self, package: str) -> List[str]:
+        store = self._store
+        node = store.index.get(package)
+        if node is None or not (self._reverse or store.known[node]):
+            raise KeyError(package)
+        neighbours = store.predecessors(node) if self._reverse else store.successors(node)
+        names = store.names
+        return [names[i] for i in neighbours]
+
+    def __contains__(self, package: object) -> bool:
+        node = self._store.index.get(package)
+        return node is not None and (self._reverse or bool(self._store.known[node]))
+
+    def __iter__(self) -> Iterator[str]:
+        store = self._store
+        if self._reverse:
+            return iter(store.names)
+        return (name for name, known in zip(store.names, store.known) if known)
+
+    def __len__(self) -> int:
+        return self._store.node_count if self._reverse else self._store.known_count
@@ -1,29 +1,211 @@
-from config import Config
-from dependency_parser import DependencyParser
-from dependency_graph import DependencyGraph
-from visualizer import GraphVisualizer
-from png_visualizer import PNGVisualizer  # Добавляем новый импорт
+"""Командная строка анализатора зависимостей
+
+Каждая подкоманда импортирует только нужные ей модули, поэтому показ
+конфигурации и команды тестового режима не загружают сетевой стек
+(requests) и визуализацию. Без подкоманды режим выбирается по config.csv.
+
+Примеры:
+    python src/main.py config
+    python src/main.py tree
+    python src/main.py graph
+    python src/main.py reverse serde --mermaid
+    python src/main.py export graph.dot.gz
+    python src/main.py render graph.svg --highlight serde
+    python src/main.py diff before.snap after.snap --mermaid changes.mmd
+"""
+import argparse
 import sys
-import os
+from typing import List, Optional
+
+from config import Config
+
+
+def _load_configs(args) -> List[Config]:
+    configs = Config.load_all(args.config)
+    if args.package:
+        for config in configs:
+            config.package_name = args.package
+    return configs
+
+
+def _load_graph(config: Config):
+    # batch тянет парсер и загрузчик только для рабочего режима без снимка
+    from batch import load_graph
+    return load_graph(config)
+
+
+def cmd_config(args, configs: List[Config]) -> None:
+    for config in configs:
+        config.display_parameters()
+
+
+def cmd_tree(args, configs: List[Config]) -> None:
+    from dependency_parser import DependencyParser
 
-def main():
+    parser = DependencyParser(configs[0])
     try:
-        # Загружаем конфигурацию
-        config = Config()
-        config.load_from_csv('config.csv')
-        
+        parser.display_dependencies()
+    finally:
+        parser.close()
+
+
+def cmd_graph(args, configs: List[Config]) -> None:
+    graph = _load_graph(configs[0])
+    graph.display_graph()
+
+
+def cmd_reverse(args, configs: List[Config]) -> None:
+    graph = _load_graph(configs[0])
+    graph.display_reverse_dependencies(args.target)
+    if args.mermaid:
+        from visualizer import GraphVisualizer
+        GraphVisualizer(graph).display_reverse_mermaid_graph(args.target)
+
+
+def cmd_export(args, configs: List[Config]) -> None:
+    from visualizer import GraphVisualizer
+
+    graph = _load_graph(configs[0])
+    GraphVisualizer(graph).export(args.output, args.format, args.compress)
+
+
+def cmd_render(args, configs: List[Config]) -> None:
+    from png_visualizer import PNGVisualizer
+
+    graph = _load_graph(configs[0])
+    PNGVisualizer(graph, args.row_width).render(args.output, args.highlight, args.max_size)
+
+
+def cmd_diff(args, configs: List[Config]) -> None:
+    from dependency_graph import DependencyGraph
+    from graph_diff import diff_graphs
+
+    config = configs[0]
+    old = DependencyGraph(config)
+    old.load_snapshot(args.old)
+    if args.new:
+        new = DependencyGraph(config)
+        new.load_snapshot(args.new)
+    else:
+        new = _load_graph(config)
+
+    diff = diff_graphs(old, new)
+    diff.display(args.limit)
+    if args.mermaid:
+        with open(args.mermaid, 'w', encoding='utf-8') as f:
+            f.write(diff.mermaid() + "\n")
+        print(f"\n Mermaid измененной области сохранен в файл: {args.mermaid}")
+
+
+def cmd_batch(args, configs: List[Config]) -> None:
+    from batch import print_batch_summary, run_batch
+
+    summaries, graph = run_batch(configs, args.workers)
+    print_batch_summary(summaries, graph)
+
+
+def cmd_crawl(args, configs: List[Config]) -> None:
+    from registry_crawler import RegistryCrawler
+
+    crawler = RegistryCrawler(configs[0])
+    try:
+        crawler.crawl(args.max_pages)
+    finally:
+        crawler.close()
+
+
+def cmd_serve(args, configs: List[Config]) -> None:
+    from query_server import QueryServer
+
+    config = configs[0]
+    address = args.address or config.serve_address or '127.0.0.1:8765'
+    QueryServer(_load_graph(config), address).serve_forever()
+
+
+def cmd_run(args, configs: List[Config]) -> None:
+    """Режим по config.csv: сервер, обход реестра, пакетный анализ или дерево одного пакета"""
+    config = configs[0]
+    if config.serve_address:
+        cmd_serve(args, configs)
+    elif config.crawl_output:
+        cmd_crawl(args, configs)
+    elif len(configs) > 1:
+        cmd_batch(args, configs)
+    else:
         # Выводим параметры (требование этапа 1)
         config.display_parameters()
-        
         if not config.test_mode:
             # Этап 2: Прямые зависимости
-            parser = DependencyParser(config)
-            parser.display_dependencies()
+            cmd_tree(args, configs)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Анализ зависимостей пакетов Cargo")
+    parser.add_argument('--config', default='config.csv', help="CSV с параметрами (по строке на корень)")
+    parser.add_argument('--package', help="заменяет package_name из конфигурации")
+    # Параметры подкоманд, которые режим по config.csv берет из конфигурации
+    parser.set_defaults(handler=cmd_run, address=None, max_pages=None, workers=None)
+    commands = parser.add_subparsers(title="команды")
+
+    commands.add_parser('config', help="показать конфигурацию").set_defaults(handler=cmd_config)
+    commands.add_parser('tree', help="дерево зависимостей").set_defaults(handler=cmd_tree)
+    commands.add_parser('graph', help="полный граф и циклы").set_defaults(handler=cmd_graph)
+
+    reverse = commands.add_parser('reverse', help="обратные зависимости пакета")
+    reverse.add_argument('target', help="пакет, для которого ищутся зависящие от него")
+    reverse.add_argument('--mermaid', action='store_true', help="также вывести диаграмму Mermaid")
+    reverse.set_defaults(handler=cmd_reverse)
+
+    export = commands.add_parser('export', help="сохранить граф в mermaid, dot, graphml или json")
+    export.add_argument('output', help="файл; формат определяется по расширению")
+    export.add_argument('--format', help="формат, если его нельзя определить по расширению")
+    export.add_argument('--compress', action='store_true', help="сжать gzip")
+    export.set_defaults(handler=cmd_export)
+
+    render = commands.add_parser('render', help="нарисовать граф в SVG или PNG")
+    render.add_argument('output', help="файл .svg или .png")
+    render.add_argument('--highlight', help="выделить пакет и пути к нему от зависящих пакетов")
+    render.add_argument('--max-size', type=int, default=4096, help="наибольшая сторона PNG в пикселях")
+    render.add_argument('--row-width', type=int, default=64, help="узлов в строке до переноса слоя")
+    render.set_defaults(handler=cmd_render)
+
+    diff = commands.add_parser('diff', help="изменения между двумя снимками графа")
+    diff.add_argument('old', help="снимок до изменений")
+    diff.add_argument('new', nargs='?', help="снимок после; по умолчанию текущий граф из config.csv")
+    diff.add_argument('--mermaid', help="сохранить диаграмму измененной области в файл")
+    diff.add_argument('--limit', type=int, default=20, help="строк на каждый вид изменений")
+    diff.set_defaults(handler=cmd_diff)
+
+    batch = commands.add_parser('batch', help="все строки config.csv в один общий граф")
+    batch.add_argument('--workers', type=int, help="число процессов (по умолчанию batch_workers)")
+    batch.set_defaults(handler=cmd_batch)
+
+    crawl = commands.add_parser('crawl', help="обход всего реестра в crawl_output")
+    crawl.add_argument('--max-pages', type=int, help="остановиться после стольких страниц")
+    crawl.set_defaults(handler=cmd_crawl)
+
+    serve = commands.add_parser('serve', help="сервер запросов к графу")
+    serve.add_argument('--address', help="host:port или unix:/путь (по умолчанию serve_address)")
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    try:
+        configs = _load_configs(args)
+        args.handler(args, configs)
+
+        config = configs[0]
+        if config.metrics_path:
+            from metrics import METRICS
+            METRICS.save(config.metrics_path)
+            print(f"\n📈 Метрики сохранены в {config.metrics_path}")
         print("\n🎉 Все этапы завершены успешно!")
-        
+
     except Exception as e:
         print(f"Ошибка: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
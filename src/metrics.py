@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class SpanStats:
+    """Сводка по одному этапу: число запусков, суммарное и максимальное время"""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        return {'count': self.count, 'total': self.total, 'max': self.max}
+
+
+class Metrics:
+    """Счетчики, значения и длительности этапов работы анализатора
+
+    Все методы потокобезопасны и дешевы: счетчики - словарь под одной
+    блокировкой, этапы агрегируются сразу, без хранения каждого замера.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.spans: Dict[str, SpanStats] = {}
+        self.started = time.time()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        """Запоминает последнее значение величины (размер графа и т.п.)"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(seconds)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Замеряет длительность блока: with METRICS.span('graph.build'): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.spans.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict:
+        """Все метрики в виде словаря, пригодного для JSON"""
+        with self._lock:
+            return {
+                'started': self.started,
+                'counters': dict(sorted(self.counters.items())),
+                'gauges': dict(sorted(self.gauges.items())),
+                'spans': {name: stats.to_dict() for name, stats in sorted(self.spans.items())},
+            }
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+    def report(self) -> str:
+        """Текстовая сводка для вывода в конце запуска"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot['counters'].items():
+            lines.append(f"  {name:<32} {value}")
+        for name, value in snapshot['gauges'].items():
+            lines.append(f"  {name:<32} {value:g}")
+        for name, stats in snapshot['spans'].items():
+            lines.append(f"  {name:<32} {stats['total']:.3f} с ({stats['count']} раз, макс. {stats['max']:.3f} с)")
+        return "\n".join(lines)
+
+
+# Общий реестр метрик процесса
+METRICS = Metrics()
+
+
+def node_message(config, message: str) -> None:
+    """Сообщение об отдельном пакете: в тихом режиме только считается, но не печатается"""
+    if config.quiet:
+        METRICS.increment('messages.suppressed')
+    else:
+        print(message)
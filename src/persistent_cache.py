@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+
+class CacheEntry(NamedTuple):
+    """Запись кеша: данные и сведения для условной перепроверки"""
+    data: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class PersistentCache:
+    """Кеш ответов реестра на диске (SQLite) с TTL и вытеснением по LRU
+
+    Ключ записи - пара (имя пакета, версия). Пустая версия обозначает
+    сведения о пакете в целом (например, какая версия сейчас последняя),
+    они устаревают через ttl секунд. Зависимости конкретной опубликованной
+    версии в crates.io не меняются, поэтому такие записи живут до вытеснения.
+
+    Чтение ничего не пишет в базу: время обращения копится в памяти и
+    записывается пачкой перед вытеснением, при переполнении буфера и при
+    закрытии.
+    """
+
+    # Сколько отметок об обращении копится в памяти до записи в базу
+    ACCESS_FLUSH_SIZE = 1024
+
+    def __init__(self, path: str, ttl: float = 86400, max_entries: int = 100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._accessed: Dict[Tuple[str, str], float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Загрузчик обращается к кешу из нескольких потоков, доступ сериализуется блокировкой
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                name TEXT NOT NULL,
+                version TEXT NOT NULL,
+                data TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (name, version)
+            )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+        )
+        self._connection.commit()
+        self._size = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, name: str, version: str = '') -> Optional[CacheEntry]:
+        """Возвращает запись (в том числе устаревшую) и отмечает обращение к ней"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, etag, last_modified, stored_at FROM entries WHERE name = ? AND version = ?",
+                (name, version),
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._accessed[(name, version)] = time.time()
+            if len(self._accessed) >= self.ACCESS_FLUSH_SIZE:
+                self._flush_accessed()
+                self._connection.commit()
+
+        data, etag, last_modified, stored_at = row
+        return CacheEntry(json.loads(data), etag, last_modified, stored_at)
+
+    def is_fresh(self, entry: CacheEntry, version: str = '') -> bool:
+        """Проверяет, можно ли использовать запись без обращения к реестру"""
+        if version:
+            return True
+        return time.time() - entry.stored_at < self.ttl
+
+    def put(self, name: str, version: str, data: Any,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Сохраняет запись и при переполнении вытесняет давно не использованные"""
+        now = time.time()
+        with self._lock:
+            self._accessed.pop((name, version), None)
+            exists = self._connection.execute(
+                "SELECT 1 FROM entries WHERE name = ? AND version = ?", (name, version)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, version, json.dumps(data), etag, last_modified, now, now),
+            )
+            if not exists:
+                self._size += 1
+            if self._size > self.max_entries:
+                # Вытеснение опирается на время обращения, поэтому сначала записываются отметки из памяти
+                self._flush_accessed()
+                self._evict(self._size - self.max_entries)
+            self._connection.commit()
+
+    def touch(self, name: str, version: str = '') -> None:
+        """Продлевает срок жизни записи после ответа 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._accessed.pop((name, version), None)
+            self._connection.execute(
+                "UPDATE entries SET stored_at = ?, accessed_at = ? WHERE name = ? AND version = ?",
+                (now, now, name, version),
+            )
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        """Записывает накопленные отметки об обращении и закрывает соединение с базой"""
+        with self._lock:
+            self._flush_accessed()
+            self._connection.commit()
+            self._connection.close()
+
+    def _flush_accessed(self) -> None:
+        """Одним запросом записывает время обращения к прочитанным записям"""
+        if not self._accessed:
+            return
+        self._connection.executemany(
+            "UPDATE entries SET accessed_at = ? WHERE name = ? AND version = ?",
+            [(accessed_at, name, version) for (name, version), accessed_at in self._accessed.items()],
+        )
+        self._accessed.clear()
+
+    def _evict(self, count: int) -> None:
+        """Удаляет count записей с самым давним обращением"""
+        self._connection.execute(
+            """DELETE FROM entries WHERE rowid IN (
+                SELECT rowid FROM entries ORDER BY accessed_at LIMIT ?
+            )""",
+            (count,),
+        )
+        self._size -= count
@@ -0,0 +1,540 @@
+"""Отрисовка графа в SVG и PNG без внешних инструментов
+
+Раскладка по слоям в духе Sugiyama: компоненты сильной связности
+упорядочиваются топологически, слой узла - длина самого длинного пути от
+корней, внутри цикла узлы расходятся по слоям обходом в ширину. Пересечения
+уменьшаются несколькими проходами барицентрического метода вниз и вверх,
+каждый проход - O(E + V log V). Слишком широкие слои переносятся на
+несколько строк. PNG растеризуется в bytearray и кодируется через zlib.
+"""
+import struct
+import zlib
+from array import array
+from typing import Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from dependency_graph import DependencyGraph
+from metrics import METRICS
+from visualizer import GraphExporter
+
+NODE_WIDTH = 120
+NODE_HEIGHT = 28
+H_GAP = 20
+V_GAP = 52
+MARGIN = 20
+
+
+class LayeredLayout:
+    """Координаты узлов хранилища: корни сверху, зависимости ниже"""
+
+    def __init__(self, graph: DependencyGraph, max_row_width: int = 64, sweeps: int = 4):
+        if max_row_width < 1:
+            raise ValueError("max_row_width должен быть положительным")
+        self.graph = graph
+        self.store = graph.store
+
+        with METRICS.span('render.layout'):
+            self.layer_of = self._assign_layers()
+            layers: List[List[int]] = [[] for _ in range(max(self.layer_of, default=-1) + 1)]
+            for node, layer in enumerate(self.layer_of):
+                layers[layer].append(node)
+            self.layers = layers
+            self._order_layers(sweeps)
+            self._place(max_row_width)
+
+    def _assign_layers(self) -> array:
+        """Слой каждого узла по DAG компонент; узлы цикла - по глубине обхода внутри компоненты"""
+        store = self.store
+        condensation = self.graph.condensation()
+        component_of = condensation.component_of
+        depth = array('i', [0]) * store.node_count
+        start = array('i', [0]) * len(condensation.components)
+        layer_of = array('i', [0]) * store.node_count
+
+        # Компоненты пронумерованы так, что зависимости имеют меньший номер:
+        # идем от зависящих к зависимостям и сдвигаем зависимости ниже
+        for c in range(len(condensation.components) - 1, -1, -1):
+            component = condensation.components[c]
+            if len(component) > 1:
+                self._component_depths(component, c, component_of, depth)
+            base = start[c]
+            for node in component:
+                layer = base + depth[node]
+                layer_of[node] = layer
+                for dep in store.successors(node):
+                    target = component_of[dep]
+                    if target != c and start[target] <= layer:
+                        start[target] = layer + 1
+        return layer_of
+
+    def _component_depths(self, component: List[int], c: int, component_of: List[int], depth: array) -> None:
+        """Глубина обхода в ширину внутри компоненты от ее первого узла"""
+        store = self.store
+        seen = {component[0]}
+        frontier = [component[0]]
+        level = 0
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                depth[node] = level
+                for dep in store.successors(node):
+                    if component_of[dep] == c and dep not in seen:
+                        seen.add(dep)
+                        next_frontier.append(dep)
+            frontier = next_frontier
+            level += 1
+
+    def _order_layers(self, sweeps: int) -> None:
+        """Барицентрические проходы: узел встает к среднему положению соседей в уже упорядоченных слоях"""
+        store = self.store
+        layer_of = self.layer_of
+        position = array('d', [0.0]) * store.node_count
+        for layer in self.layers:
+            self._renumber(layer, position)
+
+        for _ in range(sweeps):
+            for layers, neighbours, above in ((self.layers[1:], store.predecessors, True),
+                                              (self.layers[-2::-1], store.successors, False)):
+                for layer in layers:
+                    keys = {}
+                    for node in layer:
+                        level = layer_of[node]
+                        total = 0.0
+                        count = 0
+                        for other in neighbours(node):
+                            if (layer_of[other] < level) if above else (layer_of[other] > level):
+                                total += position[other]
+                                count += 1
+                        keys[node] = total / count if count else position[node]
+                    layer.sort(key=keys.__getitem__)
+                    self._renumber(layer, position)
+        self.position = position
+
+    @staticmethod
+    def _renumber(layer: List[int], position: array) -> None:
+        # Относительные положения сравнимы между слоями разной ширины
+        size = len(layer)
+        for i, node in enumerate(layer):
+            position[node] = (i + 0.5) / size
+
+    def _place(self, max_row_width: int) -> None:
+        """Переносит широкие слои на несколько строк и вычисляет координаты центров узлов"""
+        rows = []
+        for layer in self.layers:
+            for start in range(0, len(layer), max_row_width):
+                rows.append(layer[start:start + max_row_width])
+        self.rows = rows
+
+        widest = max((len(row) for row in rows), default=0)
+        step_x = NODE_WIDTH + H_GAP
+        step_y = NODE_HEIGHT + V_GAP
+        self.x = array('d', [0.0]) * self.store.node_count
+        self.y = array('d', [0.0]) * self.store.node_count
+        for r, row in enumerate(rows):
+            offset = (widest - len(row)) / 2
+            y = MARGIN + r * step_y + NODE_HEIGHT / 2
+            for column, node in enumerate(row):
+                self.x[node] = MARGIN + (offset + column) * step_x + NODE_WIDTH / 2
+                self.y[node] = y
+        self.width = 2 * MARGIN + max(0, widest * step_x - H_GAP)
+        self.height = 2 * MARGIN + max(0, len(rows) * step_y - V_GAP)
+
+    def crossings(self) -> int:
+        """Число пересечений ребер между соседними слоями (ребра через слой не учитываются)"""
+        store = self.store
+        layer_of = self.layer_of
+        position = self.position
+        total = 0
+        for layer in self.layers[:-1]:
+            edges = []
+            for node in layer:
+                for dep in store.successors(node):
+                    if layer_of[dep] == layer_of[node] + 1:
+                        edges.append((position[node], position[dep]))
+            edges.sort()
+            total += _inversions([target for _, target in edges])
+        return total
+
+
+def _inversions(values: List[float]) -> int:
+    """Число пар i < j с values[i] > values[j] сортировкой слиянием"""
+    if len(values) < 2:
+        return 0
+    middle = len(values) // 2
+    left, right = values[:middle], values[middle:]
+    count = _inversions(left) + _inversions(right)
+    i = j = 0
+    for k in range(len(values)):
+        if j == len(right) or (i < len(left) and left[i] <= right[j]):
+            values[k] = left[i]
+            i += 1
+        else:
+            values[k] = right[j]
+            j += 1
+            count += len(left) - i
+    return count
+
+
+class Highlight:
+    """Что выделять при отрисовке: циклы всегда, путь обратных зависимостей - для target"""
+
+    def __init__(self, graph: DependencyGraph, target: Optional[str] = None):
+        store = graph.store
+        self.group_of = graph.cycle_group_ids()
+        self.target = -1
+        self.dependents = bytearray(store.node_count)
+        if target is not None:
+            self.target = graph.require_node(target)
+            index = store.index
+            for package in graph.find_transitive_reverse_dependencies_batch([target])[target]:
+                self.dependents[index[package]] = 1
+
+    def node_kind(self, node: int) -> str:
+        if node == self.target:
+            return 'target'
+        if self.dependents[node]:
+            return 'dependent'
+        if self.group_of[node] >= 0:
+            return 'cycle'
+        return 'node'
+
+    def edge_kind(self, node: int, dep: int) -> str:
+        # Ребро лежит на пути к цели, если его начало зависит от цели, а конец - цель или тоже зависит
+        if self.dependents[node] and (dep == self.target or self.dependents[dep]):
+            return 'path'
+        group = self.group_of[node]
+        if group >= 0 and self.group_of[dep] == group:
+            return 'cycle'
+        return 'edge'
+
+
+def _label(name: str, limit: int) -> str:
+    return name if len(name) <= limit else name[:max(0, limit - 1)] + "…"
+
+
+class SvgExporter(GraphExporter):
+    """SVG: ребра линиями (обратные ребра циклов - дугами), узлы прямоугольниками с подписями"""
+
+    name = "svg"
+    extension = ".svg"
+
+    STYLE = (
+        "path{fill:none;stroke:#9aa5b1;stroke-width:1}"
+        "path.cycle{stroke:#d33;stroke-dasharray:4 3}"
+        "path.path{stroke:#e08a00;stroke-width:2}"
+        "rect{fill:#eef3fb;stroke:#4a6fa5}"
+        ".cycle rect{fill:#fde2e2;stroke:#d33}"
+        ".dependent rect{fill:#fff1d6;stroke:#e08a00}"
+        ".target rect{fill:#f9f;stroke:#333;stroke-width:2}"
+        "text{font:11px sans-serif;text-anchor:middle;dominant-baseline:central}"
+    )
+
+    def __init__(self, graph: DependencyGraph, layout: Optional[LayeredLayout] = None,
+                 highlight: Optional[Highlight] = None):
+        super().__init__(graph)
+        self.layout = layout or LayeredLayout(graph)
+        self.highlight = highlight or Highlight(graph)
+
+    def lines(self) -> Iterator[str]:
+        layout = self.layout
+        highlight = self.highlight
+        x, y = layout.x, layout.y
+        names = self.store.names
+        half = NODE_HEIGHT / 2
+
+        yield (f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width:.0f}" '
+               f'height="{layout.height:.0f}" viewBox="0 0 {layout.width:.0f} {layout.height:.0f}">')
+        yield f'<style>{self.STYLE}</style>'
+
+        # Ребра рисуются первыми, чтобы узлы лежали поверх них
+        for node in self._known_nodes():
+            for dep in self.store.successors(node):
+                kind = highlight.edge_kind(node, dep)
+                attribute = "" if kind == 'edge' else f' class="{kind}"'
+                if y[dep] > y[node]:
+                    yield (f'<path{attribute} d="M{x[node]:.0f} {y[node] + half:.0f}'
+                           f'L{x[dep]:.0f} {y[dep] - half:.0f}"/>')
+                else:
+                    # Ребро вверх или вбок бывает только внутри цикла: дуга сбоку от узлов
+                    bend = x[node] + NODE_WIDTH / 2 + 20
+                    yield (f'<path{attribute} d="M{x[node] + NODE_WIDTH / 2:.0f} {y[node]:.0f}'
+                           f'Q{bend:.0f} {(y[node] + y[dep]) / 2:.0f} {x[dep] + NODE_WIDTH / 2:.0f} {y[dep]:.0f}"/>')
+
+        limit = NODE_WIDTH // 7
+        for node in range(self.store.node_count):
+            kind = highlight.node_kind(node)
+            attribute = "" if kind == 'node' else f' class="{kind}"'
+            name = names[node]
+            yield (f'<g{attribute}><title>{escape(name)}</title>'
+                   f'<rect x="{x[node] - NODE_WIDTH / 2:.0f}" y="{y[node] - half:.0f}" '
+                   f'width="{NODE_WIDTH}" height="{NODE_HEIGHT}" rx="4"/>'
+                   f'<text x="{x[node]:.0f}" y="{y[node]:.0f}">{escape(_label(name, limit))}</text></g>')
+        yield '</svg>'
+
+
+# Шрифт 3x5: строки глифа сверху вниз, каждая - восьмеричная цифра из трех пикселей
+FONT = {
+    '0': '75557', '1': '26227', '2': '71747', '3': '71317', '4': '55711',
+    '5': '74717', '6': '74757', '7': '71122', '8': '75757', '9': '75717',
+    'A': '25755', 'B': '65656', 'C': '34443', 'D': '65556', 'E': '74647',
+    'F': '74644', 'G': '34553', 'H': '55755', 'I': '72227', 'J': '11152',
+    'K': '55655', 'L': '44447', 'M': '57755', 'N': '65555', 'O': '25552',
+    'P': '65644', 'Q': '25563', 'R': '65655', 'S': '34216', 'T': '72222',
+    'U': '55557', 'V': '55552', 'W': '55775', 'X': '55255', 'Y': '55222',
+    'Z': '71247', '-': '00700', '_': '00007', '.': '00002', '@': '25743',
+    '+': '02720', '…': '00005', '?': '71202',
+}
+
+COLORS = {
+    'background': (0xff, 0xff, 0xff),
+    'node': ((0xee, 0xf3, 0xfb), (0x4a, 0x6f, 0xa5)),
+    'cycle': ((0xfd, 0xe2, 0xe2), (0xdd, 0x33, 0x33)),
+    'dependent': ((0xff, 0xf1, 0xd6), (0xe0, 0x8a, 0x00)),
+    'target': ((0xff, 0x99, 0xff), (0x33, 0x33, 0x33)),
+    'edge': (0x9a, 0xa5, 0xb1),
+    'edge.cycle': (0xdd, 0x33, 0x33),
+    'edge.path': (0xe0, 0x8a, 0x00),
+    'text': (0x22, 0x22, 0x22),
+}
+
+class Canvas:
+    """Растр с палитрой: один байт на пиксель, цвета добавляются в палитру по мере использования
+
+    Все операции сводятся к присваиванию срезов bytearray, поэтому число
+    операций Python на отрезок не зависит от его длины в пикселях.
+    """
+
+    def __init__(self, width: int, height: int, background: Tuple[int, int, int] = COLORS['background']):
+        self.width = width
+        self.height = height
+        self.palette: List[Tuple[int, int, int]] = []
+        self._color_index = {}
+        self.pixels = bytearray([self.color(background)]) * (width * height)
+
+    def color(self, rgb: Tuple[int, int, int]) -> int:
+        """Номер цвета в палитре"""
+        index = self._color_index.get(rgb)
+        if index is None:
+            if len(self.palette) == 256:
+                raise ValueError("В палитре PNG не больше 256 цветов")
+            index = self._color_index[rgb] = len(self.palette)
+            self.palette.append(rgb)
+        return index
+
+    def fill_rect(self, x0: int, y0: int, x1: int, y1: int, color: int) -> None:
+        """Закрашивает прямоугольник с углами (x0, y0) и (x1, y1) включительно"""
+        x0, x1 = max(x0, 0), min(x1, self.width - 1)
+        if x0 > x1:
+            return
+        run = bytes([color]) * (x1 - x0 + 1)
+        for y in range(max(y0, 0), min(y1, self.height - 1) + 1):
+            start = y * self.width + x0
+            self.pixels[start:start + len(run)] = run
+
+    def rect(self, x0: int, y0: int, x1: int, y1: int, fill: int, stroke: int) -> None:
+        self.fill_rect(x0, y0, x1, y1, stroke)
+        if x1 - x0 > 1 and y1 - y0 > 1:
+            self.fill_rect(x0 + 1, y0 + 1, x1 - 1, y1 - 1, fill)
+
+    def line(self, x0: float, y0: float, x1: float, y1: float, color: int) -> None:
+        """Отрезок: побочная координата k-го пикселя - точное значение, округленное вверх от половины
+
+        Вдоль главной оси за q шагов побочная координата сдвигается почти
+        ровно на p пикселей, поэтому каждые q-е пиксели отрезка образуют
+        арифметическую прогрессию индексов с шагом q * stride + p. Длина
+        прогрессии считается в целых числах по остатку, как в алгоритме
+        Брезенхэма: прогрессия обрывается ровно там, где округление сменилось
+        бы, и начинается заново; q выбирается в _line_period.
+        """
+        width = self.width
+        x0 = min(max(int(round(x0)), 0), width - 1)
+        x1 = min(max(int(round(x1)), 0), width - 1)
+        y0 = min(max(int(round(y0)), 0), self.height - 1)
+        y1 = min(max(int(round(y1)), 0), self.height - 1)
+        if abs(y1 - y0) >= abs(x1 - x0):
+            major0, length, minor0, minor_delta = y0, y1 - y0, x0, x1 - x0
+            major_stride, minor_stride = width, 1
+        else:
+            major0, length, minor0, minor_delta = x0, x1 - x0, y0, y1 - y0
+            major_stride, minor_stride = 1, width
+        if length < 0:
+            major0, length, minor0, minor_delta = major0 + length, -length, minor0 + minor_delta, -minor_delta
+        pixels = self.pixels
+        if length == 0:
+            pixels[major0 * major_stride + minor0 * minor_stride] = color
+            return
+
+        period, shift = _line_period(minor_delta, length)
+        step = period * major_stride + shift * minor_stride
+        # Смещение k-го пикселя - (2 * minor_delta * k + length) // (2 * length), остаток
+        # за period шагов меняется на drift
+        twice = 2 * length
+        drift = 2 * (minor_delta * period - shift * length)
+
+        value = bytes([color])
+        for first in range(min(period, length + 1)):
+            while first <= length:
+                offset, residual = divmod(2 * minor_delta * first + length, twice)
+                count = (length - first) // period + 1
+                if drift > 0:
+                    count = min(count, (twice - 1 - residual) // drift + 1)
+                elif drift < 0:
+                    count = min(count, residual // -drift + 1)
+                start = (major0 + first) * major_stride + (minor0 + offset) * minor_stride
+                if count == 1:
+                    pixels[start] = color
+                else:
+                    stop = start + (count - 1) * step + (1 if step > 0 else -1)
+                    pixels[start:stop if stop >= 0 else None:step] = value * count
+                first += count * period
+
+    def text(self, x: int, y: int, text: str, color: int, scale: int = 1) -> None:
+        """Подпись шрифтом 3x5, увеличенным в scale раз; (x, y) - левый верхний угол"""
+        for i, char in enumerate(text):
+            glyph = FONT.get(char.upper(), FONT['?'])
+            left = x + i * 4 * scale
+            for row, bits in enumerate(glyph):
+                bits = int(bits)
+                for column in range(3):
+                    if bits & (4 >> column):
+                        px = left + column * scale
+                        py = y + row * scale
+                        self.fill_rect(px, py, px + scale - 1, py + scale - 1, color)
+
+    def to_png(self) -> bytes:
+        return encode_png(self.width, self.height, self.pixels, self.palette)
+
+
+def _line_period(delta: int, length: int) -> Tuple[int, int]:
+    """Период q и сдвиг p прогрессий для отрезка с наклоном delta / length
+
+    Кандидаты - подходящие дроби цепной дроби наклона, лучшие приближения
+    при своем знаменателе. Выбирается тот, при котором меньше присваиваний:
+    q на каждый перезапуск прогрессий плюс сами перезапуски.
+    """
+    sign = -1 if delta < 0 else 1
+    delta = abs(delta)
+    previous_p, p, previous_q, q = 1, delta // length, 0, 1
+    numerator, denominator = length, delta % length
+    best = None
+    while q <= length:
+        # Ошибка за q шагов в долях пикселя - error / length
+        error = abs(q * delta - p * length)
+        repeats = length + 1 if error == 0 else max(1, length // (2 * error))
+        cost = q + length // repeats
+        if best is None or cost < best[0]:
+            best = (cost, q, sign * p)
+        if denominator == 0:
+            break
+        term = numerator // denominator
+        numerator, denominator = denominator, numerator % denominator
+        previous_p, p = p, term * p + previous_p
+        previous_q, q = q, term * q + previous_q
+    return best[1], best[2]
+
+
+def encode_png(width: int, height: int, pixels: bytes, palette: List[Tuple[int, int, int]]) -> bytes:
+    """PNG с палитрой: по байту на пиксель, строки без фильтрации"""
+    view = memoryview(pixels)
+    raw = b"".join(b"\x00" + view[y * width:(y + 1) * width] for y in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+            + chunk(b"PLTE", bytes(channel for rgb in palette for channel in rgb))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+
+def render_png(graph: DependencyGraph, layout: LayeredLayout, highlight: Highlight,
+               max_size: int = 4096) -> bytes:
+    """Растеризует раскладку; большие графы уменьшаются так, чтобы сторона не превышала max_size"""
+    scale = min(1.0, max_size / max(layout.width, layout.height, 1))
+    canvas = Canvas(max(1, int(layout.width * scale)), max(1, int(layout.height * scale)))
+    store = graph.store
+    x = [value * scale for value in layout.x]
+    y = [value * scale for value in layout.y]
+    half_width = NODE_WIDTH * scale / 2
+    half_height = NODE_HEIGHT * scale / 2
+    edge_colors = {kind: canvas.color(COLORS['edge' if kind == 'edge' else f'edge.{kind}'])
+                   for kind in ('edge', 'cycle', 'path')}
+    node_colors = {kind: (canvas.color(fill), canvas.color(stroke))
+                   for kind, (fill, stroke) in ((kind, COLORS[kind]) for kind in ('node', 'cycle', 'dependent', 'target'))}
+
+    with METRICS.span('render.rasterize'):
+        # Выделенные ребра рисуются вторым проходом поверх обычных
+        highlighted: List[Tuple[int, int, str]] = []
+        line = canvas.line
+        plain = edge_colors['edge']
+        for node in range(store.node_count):
+            if not store.known[node]:
+                continue
+            for dep in store.successors(node):
+                kind = highlight.edge_kind(node, dep)
+                if kind == 'edge':
+                    line(x[node], y[node] + half_height, x[dep], y[dep] - half_height, plain)
+                else:
+                    highlighted.append((node, dep, kind))
+        for node, dep, kind in highlighted:
+            if y[dep] > y[node]:
+                line(x[node], y[node] + half_height, x[dep], y[dep] - half_height, edge_colors[kind])
+            else:
+                line(x[node] + half_width, y[node], x[dep] + half_width, y[dep], edge_colors[kind])
+
+        # Подписи - только если шрифт помещается в узел
+        font = int(2 * scale)
+        limit = int((2 * half_width - 4) // (4 * font)) if font else 0
+        text_color = canvas.color(COLORS['text'])
+        for node in range(store.node_count):
+            fill, stroke = node_colors[highlight.node_kind(node)]
+            canvas.rect(int(x[node] - half_width), int(y[node] - half_height),
+                        int(x[node] + half_width), int(y[node] + half_height), fill, stroke)
+            if limit:
+                label = _label(store.names[node], limit)
+                canvas.text(int(x[node] - len(label) * 2 * font + font // 2),
+                            int(y[node] - 2.5 * font), label, text_color, font)
+
+    with METRICS.span('render.encode'):
+        return canvas.to_png()
+
+
+class PNGVisualizer:
+    """Отрисовка DependencyGraph в SVG или PNG по расширению файла"""
+
+    def __init__(self, graph: DependencyGraph, max_row_width: int = 64, sweeps: int = 4):
+        self.graph = graph
+        self.max_row_width = max_row_width
+        self.sweeps = sweeps
+        self._layout: Optional[LayeredLayout] = None
+
+    @property
+    def layout(self) -> LayeredLayout:
+        if self._layout is None:
+            self._layout = LayeredLayout(self.graph, self.max_row_width, self.sweeps)
+        return self._layout
+
+    def render_svg(self, filename: str, highlight: Optional[str] = None) -> None:
+        exporter = SvgExporter(self.graph, self.layout, Highlight(self.graph, highlight))
+        with open(filename, 'w', encoding='utf-8') as f:
+            exporter.write(f)
+
+    def render_png(self, filename: str, highlight: Optional[str] = None, max_size: int = 4096) -> None:
+        data = render_png(self.graph, self.layout, Highlight(self.graph, highlight), max_size)
+        with open(filename, 'wb') as f:
+            f.write(data)
+
+    def render(self, filename: str, highlight: Optional[str] = None, max_size: int = 4096) -> None:
+        """Сохраняет рисунок графа; highlight - пакет, пути к которому выделяются"""
+        if filename.endswith('.svg'):
+            self.render_svg(filename, highlight)
+        elif filename.endswith('.png'):
+            self.render_png(filename, highlight, max_size)
+        else:
+            raise ValueError(f"Ожидается файл .svg или .png: {filename}")
+
+        layout = self.layout
+        print(f"\n Граф нарисован в файл: {filename} "
+              f"({self.graph.store.node_count} узлов, {len(layout.layers)} слоев)")
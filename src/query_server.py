@@ -0,0 +1,329 @@
+"""Сервер запросов: граф строится один раз и держится в памяти
+
+JSON API поверх HTTP (TCP или Unix-сокет):
+
+    GET /health                               состояние и размер графа
+    GET /reverse?package=X                    прямые обратные зависимости
+    GET /reverse/transitive?package=X[&limit=N]  все пакеты, зависящие от X
+    GET /cycles[?package=Y]                   группы циклов или группа, через которую проходит Y
+    GET /mermaid?package=X[&hops=N&direction=both|forward|reverse]  окрестность X в Mermaid
+    GET /mermaid/reverse?package=X            Mermaid обратных зависимостей X
+    GET /stats                                задержки по каждому запросу
+"""
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from dependency_graph import DependencyGraph
+from metrics import METRICS
+from visualizer import GraphVisualizer
+
+
+class QueryError(Exception):
+    """Ошибка запроса с HTTP-кодом ответа"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    """Задержки одного вида запросов: счетчики и процентили по последним замерам"""
+
+    # Сколько последних замеров хранится для процентилей
+    WINDOW = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=self.WINDOW)
+
+    def add(self, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.count += 1
+            self.errors += int(error)
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self._recent.append(seconds)
+
+    def to_dict(self) -> Dict[str, float]:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, errors, total, longest = self.count, self.errors, self.total, self.max
+
+        def percentile(p: float) -> float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000 if recent else 0.0
+
+        return {'count': count, 'errors': errors, 'mean_ms': total / count * 1000 if count else 0.0,
+                'p50_ms': percentile(0.5), 'p95_ms': percentile(0.95), 'p99_ms': percentile(0.99),
+                'max_ms': longest * 1000}
+
+
+class ReverseClosureBatcher:
+    """Объединяет одновременные запросы транзитивных обратных зависимостей
+
+    Замыкание для одного пакета стоит полного прохода по графу, а пачка
+    до 1024 пакетов - столько же. Пока один поток считает пачку, новые
+    запросы копятся и считаются следующей пачкой целиком.
+    """
+
+    def __init__(self, graph: DependencyGraph, lock: threading.Lock):
+        self.graph = graph
+        # Общая блокировка графа: кеши замыканий и конденсации строятся лениво
+        self._graph_lock = lock
+        self._condition = threading.Condition()
+        self._pending: List[str] = []
+        # Номер последней начатой и последней завершенной пачки
+        self._started = 0
+        self._completed = 0
+        self._running = False
+
+    def get(self, package: str) -> FrozenSet[str]:
+        with self._condition:
+            self._pending.append(package)
+            # Пакет попадет в пачку, которая начнется следующей
+            ticket = self._started + 1
+            while self._completed < ticket:
+                if self._running:
+                    self._condition.wait()
+                else:
+                    self._run_batches()
+        # Замыкание уже в кеше графа
+        with self._graph_lock:
+            return self.graph.find_transitive_reverse_dependencies_batch([package])[package]
+
+    def _run_batches(self) -> None:
+        """Вызывается под _condition; сама пачка считается без нее"""
+        self._running = True
+        try:
+            while self._pending:
+                self._started += 1
+                generation = self._started
+                batch = list(dict.fromkeys(self._pending))
+                self._pending.clear()
+                self._condition.release()
+                try:
+                    with self._graph_lock:
+                        self.graph.find_transitive_reverse_dependencies_batch(batch)
+                    METRICS.increment('query.reverse_batches')
+                finally:
+                    self._condition.acquire()
+                    # При ошибке ожидающие повторят запрос сами и получат исключение
+                    self._completed = generation
+                    self._condition.notify_all()
+        finally:
+            self._running = False
+            self._condition.notify_all()
+
+
+class QueryService:
+    """Обработчики запросов к графу без привязки к транспорту"""
+
+    def __init__(self, graph: DependencyGraph):
+        self.graph = graph
+        self._lock = threading.Lock()
+        self.reverse_closures = ReverseClosureBatcher(graph, self._lock)
+        self.stats: Dict[str, LatencyStats] = {}
+        self.started = time.time()
+        self.routes: Dict[str, Callable[[Dict[str, str]], Dict]] = {
+            '/health': self.health,
+            '/reverse': self.reverse,
+            '/reverse/transitive': self.transitive_reverse,
+            '/cycles': self.cycles,
+            '/mermaid': self.mermaid,
+            '/mermaid/reverse': self.mermaid_reverse,
+            '/stats': self.latency,
+        }
+        for route in self.routes:
+            self.stats[route] = LatencyStats()
+        # Конденсация и номера групп циклов строятся заранее, а не первым запросом
+        graph.condensation()
+        graph.cycle_group_ids()
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict]:
+        """Выполняет запрос и учитывает его задержку; возвращает (код, JSON)"""
+        handler = self.routes.get(path)
+        if handler is None:
+            return 404, {'error': f"Неизвестный запрос: {path}"}
+
+        started = time.perf_counter()
+        try:
+            status, body = 200, handler(params)
+        except QueryError as e:
+            status, body = e.status, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': f"Внутренняя ошибка: {e}"}
+        elapsed = time.perf_counter() - started
+        self.stats[path].add(elapsed, status != 200)
+        METRICS.record(f"query{path.replace('/', '.')}", elapsed)
+        return status, body
+
+    def _package(self, params: Dict[str, str]) -> str:
+        package = params.get('package')
+        if not package:
+            raise QueryError(400, "Не указан параметр package")
+        if package not in self.graph.reverse_graph:
+            raise QueryError(404, f"Пакет {package} отсутствует в графе")
+        return package
+
+    @staticmethod
+    def _number(params: Dict[str, str], key: str, default: int) -> int:
+        try:
+            return int(params.get(key, default))
+        except ValueError:
+            raise QueryError(400, f"Параметр {key} должен быть целым числом")
+
+    def health(self, params: Dict[str, str]) -> Dict:
+        store = self.graph.store
+        return {'status': 'ok', 'package': self.graph.config.package_name, 'nodes': store.node_count,
+                'edges': store.edge_count, 'cycle_groups': len(self.graph.cycle_groups),
+                'uptime': time.time() - self.started}
+
+    def reverse(self, params: Dict[str, str]) -> Dict:
+        package = self._package(params)
+        dependents = self.graph.find_reverse_dependencies(package)
+        return {'package': package, 'count': len(dependents), 'dependents': sorted(dependents)}
+
+    def transitive_reverse(self, params: Dict[str, str]) -> Dict:
+        package = self._package(params)
+        limit = self._number(params, 'limit', 0)
+        dependents = sorted(self.reverse_closures.get(package))
+        return {'package': package, 'count': len(dependents),
+                'dependents': dependents[:limit] if limit > 0 else dependents}
+
+    def cycles(self, params: Dict[str, str]) -> Dict:
+        graph = self.graph
+        if 'package' not in params:
+            return {'count': len(graph.cycle_groups),
+                    'groups': [{'packages': group, 'cycle': cycle}
+                               for group, cycle in zip(graph.cycle_groups, graph.cycles)]}
+        package = self._package(params)
+        group = graph.cycle_group(package)
+        if group is None:
+            return {'package': package, 'in_cycle': False}
+        packages, cycle = group
+        return {'package': package, 'in_cycle': True, 'packages': packages, 'cycle': cycle}
+
+    def mermaid(self, params: Dict[str, str]) -> Dict:
+        package = self._package(params)
+        hops = self._number(params, 'hops', 1)
+        direction = params.get('direction', 'both')
+        try:
+            with self._lock:
+                subgraph = self.graph.neighbourhood(package, hops, direction)
+        except ValueError as e:
+            raise QueryError(400, str(e))
+        return {'package': package, 'nodes': subgraph.store.node_count,
+                'mermaid': GraphVisualizer(subgraph).generate_mermaid_graph()}
+
+    def mermaid_reverse(self, params: Dict[str, str]) -> Dict:
+        package = self._package(params)
+        with self._lock:
+            mermaid = GraphVisualizer(self.graph).generate_mermaid_reverse_graph(package)
+        return {'package': package, 'mermaid': mermaid}
+
+    def latency(self, params: Dict[str, str]) -> Dict:
+        return {route: stats.to_dict() for route, stats in self.stats.items() if stats.count}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Ответ - заголовки и тело отдельными записями; без этого каждый ждет отложенного ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self) -> str:
+        # У Unix-сокета нет адреса клиента
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        status, body = self.server.service.handle(url.path.rstrip('/') or '/', params)
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _UnixHandler(_Handler):
+    # TCP_NODELAY к Unix-сокету неприменим
+    disable_nagle_algorithm = False
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class QueryServer:
+    """Запускает QueryService на TCP-адресе "host:port" или Unix-сокете "unix:/путь" """
+
+    def __init__(self, graph: DependencyGraph, address: str):
+        self.service = QueryService(graph)
+        self.address = address
+        if address.startswith('unix:'):
+            self.socket_path = address[len('unix:'):]
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self._server = _UnixHTTPServer(self.socket_path, _UnixHandler)
+        else:
+            host, _, port = address.rpartition(':')
+            self.socket_path = None
+            self._server = ThreadingHTTPServer((host or '127.0.0.1', int(port or 0)), _Handler)
+            self._server.daemon_threads = True
+        self._server.service = self.service
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Адрес для клиентов; для TCP с портом 0 - фактический порт"""
+        if self.socket_path is not None:
+            return f"unix:{self.socket_path}"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self) -> None:
+        print(f"🛰️ Сервер запросов слушает {self.url}")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 Сервер остановлен")
+            for route, stats in self.service.latency({}).items():
+                print(f"  {route:<22} {stats['count']} запросов, p50 {stats['p50_ms']:.2f} мс, "
+                      f"p99 {stats['p99_ms']:.2f} мс")
+        finally:
+            self.close()
+
+    def start(self) -> 'QueryServer':
+        """Запуск в фоновом потоке (для тестов и встраивания)"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
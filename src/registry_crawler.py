@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import Config
+from dependency_graph import DependencyGraph
+from dependency_parser import DependencyParser
+from graph_store import CompactGraph
+from metrics import METRICS
+from repo_reader import read_test_repo
+
+
+class CrawlCheckpoint(NamedTuple):
+    """Состояние обхода, после которого его можно продолжить"""
+    # Строка запроса следующей страницы списка пакетов; None - список пройден
+    cursor: Optional[str]
+    # Сколько байт файла снимка записано полностью (хвост после сбоя отбрасывается)
+    offset: int = 0
+    crates: int = 0
+    pages: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.cursor is None
+
+
+class RegistryCrawler:
+    """Обход всего реестра: зависимости основной версии каждого пакета
+
+    Список пакетов читается постранично, и, пока одна страница разбирается
+    парсером (сам он загружает сведения о пакетах параллельно), следующая
+    уже запрашивается. Все запросы проходят через общий лимит частоты
+    загрузчика (rate_limit). После каждой страницы ее ребра дописываются
+    в снимок (формат edges) и в компактное хранилище, а затем атомарно
+    сохраняется контрольная точка: прерванный обход продолжается с первой
+    незаписанной страницы.
+    """
+
+    # Сколько страниц списка может ждать разбора
+    PREFETCH_PAGES = 2
+
+    def __init__(self, config: Config, parser: Optional[DependencyParser] = None):
+        if config.test_mode or config.dependency_source != 'crates_io':
+            raise ValueError("Обход реестра возможен только для источника crates_io в рабочем режиме")
+        if not config.crawl_output:
+            raise ValueError("Для обхода реестра нужно указать crawl_output")
+        self.config = config
+        self.parser = parser or DependencyParser(config)
+        self.output_path = config.crawl_output
+        self.checkpoint_path = config.checkpoint_path or f"{config.crawl_output}.checkpoint"
+        self.store = CompactGraph.empty()
+        self.checkpoint = CrawlCheckpoint(f"?per_page={config.crawl_page_size}&sort=alphabetical")
+
+    def crawl(self, max_pages: Optional[int] = None) -> CrawlCheckpoint:
+        """Обходит реестр (или max_pages страниц) и возвращает итоговую контрольную точку"""
+        self._restore()
+        if self.checkpoint.finished:
+            print(f"✅ Обход уже завершен: {self.checkpoint.crates} пакетов в {self.output_path}")
+            return self.checkpoint
+
+        with METRICS.span('crawl.total'):
+            asyncio.run(self._crawl(max_pages))
+        self.store.compact()
+        state = 'завершен' if self.checkpoint.finished else 'приостановлен'
+        print(f"🕸️ Обход {state}: пакетов {self.checkpoint.crates}, страниц {self.checkpoint.pages}, "
+              f"узлов в графе {self.store.node_count}, ребер {self.store.edge_count}")
+        return self.checkpoint
+
+    def to_graph(self) -> DependencyGraph:
+        """Граф для запросов и экспорта поверх собранного хранилища"""
+        graph = DependencyGraph(self.config)
+        graph.store = self.store
+        return graph
+
+    def close(self) -> None:
+        self.parser.close()
+
+    def _restore(self) -> None:
+        """Загружает контрольную точку и уже записанную часть снимка"""
+        if not os.path.exists(self.checkpoint_path) or not os.path.exists(self.output_path):
+            # Новый обход: снимок предыдущего начинается заново. Контрольная точка
+            # без снимка бесполезна и перезапишется после первой страницы
+            open(self.output_path, 'w', encoding='utf-8').close()
+            return
+
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.checkpoint = CrawlCheckpoint(data['cursor'], data['offset'], data['crates'], data['pages'])
+        # Строки, дописанные после последней контрольной точки, относятся к незавершенной странице
+        with open(self.output_path, 'r+b') as f:
+            f.truncate(self.checkpoint.offset)
+        self.store = CompactGraph.from_edges(read_test_repo(self.output_path, 'edges'))
+        print(f"↩️ Продолжение обхода: уже записано {self.checkpoint.crates} пакетов")
+
+    async def _crawl(self, max_pages: Optional[int]) -> None:
+        loop = asyncio.get_running_loop()
+        # Список пакетов и разбор страницы идут в разных потоках одновременно
+        executor = ThreadPoolExecutor(max_workers=2)
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.PREFETCH_PAGES)
+        fetcher = self.parser.fetcher
+
+        async def list_pages():
+            cursor = self.checkpoint.cursor
+            listed = 0
+            while cursor is not None and (max_pages is None or listed < max_pages):
+                names, next_cursor = await loop.run_in_executor(executor, fetcher.fetch_crate_page, cursor)
+                await pages.put((names, next_cursor))
+                cursor = next_cursor
+                listed += 1
+            await pages.put(None)
+
+        async def expand_pages():
+            with open(self.output_path, 'a', encoding='utf-8') as output:
+                while True:
+                    page = await pages.get()
+                    if page is None:
+                        return
+                    names, next_cursor = page
+                    with METRICS.span('crawl.page'):
+                        rows = await loop.run_in_executor(executor, self._expand, names)
+                        self._write_page(output, rows, next_cursor)
+
+        try:
+            await asyncio.gather(list_pages(), expand_pages())
+        finally:
+            executor.shutdown(wait=True)
+
+    def _expand(self, names: List[str]) -> List[Tuple[str, List[str]]]:
+        """Прямые зависимости основных версий пакетов страницы"""
+        parser = self.parser
+        roots = parser.resolve_roots(names)
+        dependencies = parser.expand_many(roots)
+        # Каждый пакет - отдельный корень со своими фичами: узлы не раскрываются
+        # повторно, а разобранные строки не нужны парсеру после записи в снимок
+        parser.forget(roots)
+        return [(root, dependencies[root]) for root in roots]
+
+    def _write_page(self, output, rows: List[Tuple[str, List[str]]], next_cursor: Optional[str]) -> None:
+        store = self.store
+        for root, dependencies in rows:
+            output.write(' '.join([root] + dependencies) + '\n')
+            store.set_successors(store.ensure_node(root), [store.ensure_node(dep) for dep in dependencies])
+        if store.patched_rows > max(DependencyGraph.COMPACT_THRESHOLD, store.node_count // 8):
+            store.compact()
+        output.flush()
+        os.fsync(output.fileno())
+
+        checkpoint = self.checkpoint
+        self.checkpoint = CrawlCheckpoint(next_cursor, output.tell(), checkpoint.crates + len(rows),
+                                          checkpoint.pages + 1)
+        self._save_checkpoint()
+        METRICS.increment('crawl.pages')
+        METRICS.increment('crawl.crates', len(rows))
+
+    def _save_checkpoint(self) -> None:
+        """Контрольная точка пишется во временный файл и подменяется атомарно"""
+        data: Dict = dict(self.checkpoint._asdict())
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temporary, self.checkpoint_path)
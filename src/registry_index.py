@@ -0,0 +1,129 @@
+import json
+import mmap
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from edge_filter import EdgeFilter, Requirement
+from metrics import node_message
+
+# Номер версии и признак отзыва читаются из строки индекса без разбора JSON
+_VERS = re.compile(rb'"vers"\s*:\s*"([^"]+)"')
+_YANKED = re.compile(rb'"yanked"\s*:\s*true')
+
+
+def crate_index_parts(package_name: str) -> List[str]:
+    """Путь к файлу пакета в индексе crates.io (локальном или sparse) по частям"""
+    name = package_name.lower()
+    if len(name) <= 2:
+        return [str(len(name)), name]
+    if len(name) == 3:
+        return ['3', name[0], name]
+    return [name[:2], name[2:4], name]
+
+
+class LocalRegistryIndex:
+    """Чтение локальной копии индекса crates.io без обращения к сети
+
+    Индекс - каталог, в котором для каждого пакета есть файл с JSON-строкой
+    на каждую опубликованную версию (в порядке публикации). Файл пакета
+    отображается в память и просматривается один раз: из строк берутся только
+    номер версии и признак отзыва, а JSON разбирается лишь для версий, к
+    которым действительно обратились.
+    """
+
+    def __init__(self, index_path: str, edge_filter: Optional[EdgeFilter] = None,
+                 config: Optional[Config] = None):
+        if not os.path.isdir(index_path):
+            raise ValueError(f"Каталог индекса не найден: {index_path}")
+        self.index_path = index_path
+        # Настройки вывода: в тихом режиме сообщения о пакетах не печатаются
+        self.config = config or Config()
+        # Без фильтра учитываются только обычные зависимости для всех платформ
+        self.edge_filter = edge_filter
+        # Неразобранные строки не отозванных версий: имя -> {версия: строка}
+        self._lines: Dict[str, Dict[str, bytes]] = {}
+        # Разобранные записи версий, к которым уже обращались
+        self._records: Dict[Tuple[str, str], Dict] = {}
+
+    def crate_path(self, package_name: str) -> str:
+        """Путь к файлу пакета по правилам раскладки индекса crates.io"""
+        return os.path.join(self.index_path, *crate_index_parts(package_name))
+
+    def latest_version(self, package_name: str) -> Optional[Dict]:
+        """Возвращает запись последней не отозванной версии пакета"""
+        lines = self._package_lines(package_name)
+        if not lines:
+            return None
+        return self._record(package_name, next(reversed(lines)))
+
+    def resolve_version(self, package_name: str) -> Optional[str]:
+        """Номер последней не отозванной версии пакета"""
+        record = self.latest_version(package_name)
+        return record.get('vers') if record is not None else None
+
+    def fetch_versions(self, package_name: str) -> List[str]:
+        """Номера всех не отозванных версий пакета"""
+        return list(self._package_lines(package_name))
+
+    def fetch_features(self, package_name: str, version: str) -> Dict[str, List[str]]:
+        """Таблица фич версии; features2 хранит фичи с синтаксисом dep: и ?/"""
+        record = self._record(package_name, version)
+        if record is None:
+            return {}
+        return dict(record.get('features') or {}, **(record.get('features2') or {}))
+
+    def fetch_requirements(self, package_name: str, version: str) -> List[Requirement]:
+        """Зависимости версии, подходящие под конфигурацию сборки, с требованиями к версиям"""
+        record = self._record(package_name, version)
+        if record is None:
+            node_message(self.config, f"⚠️ Версия {package_name} {version} не найдена в локальном индексе")
+            return []
+
+        requirements = []
+        for dep in record.get('deps') or []:
+            # Переименованная зависимость хранит настоящее имя в поле package
+            dep_name = dep.get('package') or dep.get('name')
+            if not dep_name:
+                continue
+            requirement = Requirement.from_registry(dep_name, dep, dep.get('name') or '')
+            if self.edge_filter is not None:
+                accepted = self.edge_filter.accepts(requirement)
+            else:
+                accepted = requirement.kind == 'normal'
+            if accepted and requirement not in requirements:
+                requirements.append(requirement)
+        return requirements
+
+    def _package_lines(self, package_name: str) -> Dict[str, bytes]:
+        """Строки не отозванных версий пакета в порядке публикации; файл читается один раз"""
+        lines = self._lines.get(package_name)
+        if lines is None:
+            lines = {}
+            try:
+                with open(self.crate_path(package_name), 'rb') as f:
+                    if os.fstat(f.fileno()).st_size:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                            for line in iter(data.readline, b''):
+                                # Отозванные версии отсеиваются без разбора JSON
+                                if _YANKED.search(line):
+                                    continue
+                                match = _VERS.search(line)
+                                if match:
+                                    lines[match.group(1).decode('utf-8')] = line
+            except FileNotFoundError:
+                node_message(self.config, f"⚠️ Пакет {package_name} не найден в локальном индексе")
+            self._lines[package_name] = lines
+        return lines
+
+    def _record(self, package_name: str, version: str) -> Optional[Dict]:
+        """Полная запись версии; JSON строки разбирается при первом обращении"""
+        key = (package_name, version)
+        record = self._records.get(key)
+        if record is None:
+            line = self._package_lines(package_name).get(version)
+            if line is None:
+                return None
+            record = self._records[key] = json.loads(line)
+        return record
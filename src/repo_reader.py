@@ -0,0 +1,93 @@
+import time
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Ребро (пакет, зависимость); зависимость None означает пакет без зависимостей
+Edge = Tuple[str, Optional[str]]
+
+
+class ParseStats:
+    """Счетчики разбора тестового репозитория"""
+
+    def __init__(self):
+        self.lines = 0
+        self.packages = 0
+        self.edges = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self) -> None:
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self) -> str:
+        """Строка с объемом и скоростью разбора"""
+        rate = self.lines / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"Разобрано строк: {self.lines}, пакетов: {self.packages}, "
+                f"ребер: {self.edges} за {self.elapsed:.3f} с ({rate:,.0f} строк/с)")
+
+
+def iter_block_format(lines: Iterable[str], stats: Optional[ParseStats] = None) -> Iterator[Edge]:
+    """Разбор блочного формата: первая строка блока - пакет, остальные - его зависимости
+
+    Блоки разделяются пустыми строками, строки с # считаются комментариями.
+    Имена пакетов - произвольные идентификаторы без пробелов по краям.
+    """
+    stats = stats or ParseStats()
+    current = None
+
+    for line in lines:
+        stats.lines += 1
+        name = line.strip()
+        if not name:
+            current = None
+            continue
+        if name.startswith('#'):
+            continue
+
+        if current is None:
+            current = name
+            stats.packages += 1
+            yield current, None
+        else:
+            stats.edges += 1
+            yield current, name
+
+    stats.finish()
+
+
+def iter_edge_list(lines: Iterable[str], stats: Optional[ParseStats] = None) -> Iterator[Edge]:
+    """Разбор компактного списка ребер: "пакет зависимость1 зависимость2 ..." в строке
+
+    Строка из одного имени объявляет пакет без зависимостей. Строки одного
+    пакета не обязаны идти подряд.
+    """
+    stats = stats or ParseStats()
+
+    for line in lines:
+        stats.lines += 1
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+
+        source = fields[0]
+        stats.packages += 1
+        yield source, None
+        for target in fields[1:]:
+            stats.edges += 1
+            yield source, target
+
+    stats.finish()
+
+
+FORMATS = {
+    'blocks': iter_block_format,
+    'edges': iter_edge_list,
+}
+
+
+def read_test_repo(path: str, fmt: str = 'blocks', stats: Optional[ParseStats] = None) -> Iterator[Edge]:
+    """Построчно читает файл тестового репозитория, не загружая его целиком"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат тестового репозитория: {fmt}")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from FORMATS[fmt](f, stats)
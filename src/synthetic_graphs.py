@@ -0,0 +1,115 @@
+import random
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Граф как список зависимостей по номерам узлов; узел 0 - корень, из которого достижимы все
+Adjacency = List[List[int]]
+
+
+def node_name(node: int) -> str:
+    return f"crate{node}"
+
+
+def random_dag(size: int, degree: int = 3, seed: int = 0) -> Adjacency:
+    """Случайный ациклический граф: зависимости только на узлы с большим номером"""
+    rng = random.Random(seed)
+    adjacency: Adjacency = [[] for _ in range(size)]
+    for node in range(1, size - 1):
+        count = min(rng.randint(0, 2 * degree), size - node - 1)
+        adjacency[node] = sorted(rng.sample(range(node + 1, size), count))
+    return _add_root(adjacency)
+
+
+def deep_chain(size: int, seed: int = 0) -> Adjacency:
+    """Цепочка 0 -> 1 -> ... -> size-1"""
+    return [[node + 1] for node in range(size - 1)] + [[]] if size else []
+
+
+def dense_diamonds(size: int, width: int = 4, seed: int = 0) -> Adjacency:
+    """Слои по width узлов, каждый узел зависит от всех узлов следующего слоя"""
+    adjacency: Adjacency = [[] for _ in range(size)]
+    if size:
+        adjacency[0] = list(range(1, min(1 + width, size)))
+    for node in range(1, size):
+        layer_start = 1 + ((node - 1) // width + 1) * width
+        adjacency[node] = list(range(layer_start, min(layer_start + width, size)))
+    return adjacency
+
+
+def many_cycles(size: int, cycle_length: int = 5, seed: int = 0) -> Adjacency:
+    """Случайный граф, в котором каждый cycle_length-й узел замыкает цикл назад"""
+    rng = random.Random(seed)
+    adjacency = random_dag(size, degree=2, seed=seed)
+    for node in range(cycle_length, size, cycle_length):
+        # Путь node - cycle_length -> ... -> node гарантирует цикл через обратное ребро
+        for step in range(node - cycle_length, node):
+            if step + 1 not in adjacency[step]:
+                adjacency[step].append(step + 1)
+        adjacency[node].append(node - rng.randint(1, cycle_length))
+    return adjacency
+
+
+def power_law(size: int, degree: int = 4, seed: int = 0) -> Adjacency:
+    """Граф, похожий на реестр: новые пакеты чаще зависят от уже популярных
+
+    Предпочтительное присоединение дает степенное распределение числа
+    обратных зависимостей, как у serde или libc в crates.io.
+    """
+    rng = random.Random(seed)
+    adjacency: Adjacency = [[] for _ in range(size)]
+    # Каждое вхождение узла в popular - один "голос" за его популярность
+    popular: List[int] = []
+    for node in range(1, size):
+        chosen = set()
+        for _ in range(min(rng.randint(0, 2 * degree), node - 1)):
+            if popular and rng.random() < 0.8:
+                chosen.add(rng.choice(popular))
+            else:
+                chosen.add(rng.randint(1, node - 1))
+        chosen.discard(node)
+        adjacency[node] = sorted(chosen)
+        popular.extend(adjacency[node])
+        popular.append(node)
+    return _add_root(adjacency)
+
+
+GENERATORS: Dict[str, Callable[..., Adjacency]] = {
+    'random_dag': random_dag,
+    'deep_chain': deep_chain,
+    'dense_diamonds': dense_diamonds,
+    'many_cycles': many_cycles,
+    'power_law': power_law,
+}
+
+
+def generate(shape: str, size: int, seed: int = 0) -> Adjacency:
+    """Воспроизводимый граф заданной формы: одинаковые seed дают одинаковые графы"""
+    if shape not in GENERATORS:
+        raise ValueError(f"Неизвестная форма графа: {shape}")
+    return GENERATORS[shape](size, seed=seed)
+
+
+def to_edges(adjacency: Adjacency) -> Iterator[Tuple[str, Optional[str]]]:
+    """Поток ребер для CompactGraph.from_edges"""
+    for node, deps in enumerate(adjacency):
+        source = node_name(node)
+        yield source, None
+        for dep in deps:
+            yield source, node_name(dep)
+
+
+def write_edge_list(adjacency: Adjacency, path: str) -> None:
+    """Записывает граф в компактном формате тестового репозитория (edges)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for node, deps in enumerate(adjacency):
+            f.write(' '.join([node_name(node)] + [node_name(dep) for dep in deps]) + '\n')
+
+
+def _add_root(adjacency: Adjacency) -> Adjacency:
+    """Делает узел 0 корнем: он зависит от всех узлов без входящих ребер"""
+    has_parent = bytearray(len(adjacency))
+    for deps in adjacency:
+        for dep in deps:
+            has_parent[dep] = 1
+    if adjacency:
+        adjacency[0] = [node for node in range(1, len(adjacency)) if not has_parent[node]]
+    return adjacency
@@ -0,0 +1,187 @@
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+# Ключ сравнения версии: (major, minor, patch, ключ пре-релиза)
+VersionKey = Tuple[int, int, int, tuple]
+
+# Ключ пре-релиза у обычной версии больше любого пре-релиза той же версии
+RELEASE = (1, ())
+
+_VERSION_RE = re.compile(r'^(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$')
+_COMPARATOR_RE = re.compile(
+    r'^(=|>=|<=|>|<|~|\^)?\s*'
+    r'(\d+|[*xX])(?:\.(\d+|[*xX]))?(?:\.(\d+|[*xX]))?'
+    r'(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$'
+)
+
+
+def _prerelease_key(pre: Optional[str]) -> tuple:
+    """Числовые части сравниваются как числа и меньше буквенных"""
+    if not pre:
+        return RELEASE
+    return (0, tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in pre.split('.')))
+
+
+@lru_cache(maxsize=65536)
+def parse_version(text: str) -> VersionKey:
+    """Разбирает версию semver в ключ, по которому версии сравниваются обычным <"""
+    match = _VERSION_RE.match(text.strip())
+    if not match:
+        raise ValueError(f"Некорректная версия: {text}")
+    major, minor, patch, pre = match.groups()
+    return int(major), int(minor), int(patch), _prerelease_key(pre)
+
+
+def compatibility_key(version: VersionKey) -> Tuple[int, ...]:
+    """Группа совместимых версий по правилам Cargo: 1.x.y, 0.2.x или 0.0.3"""
+    major, minor, patch = version[:3]
+    if major:
+        return (major,)
+    if minor:
+        return (0, minor)
+    return (0, 0, patch)
+
+
+class Comparator(NamedTuple):
+    """Один интервал требования: [lower, upper) с учетом включения границ"""
+    lower: Optional[VersionKey]
+    lower_inclusive: bool
+    upper: Optional[VersionKey]
+    upper_inclusive: bool
+    # Версия (major, minor, patch), пре-релизы которой разрешены этим сравнением
+    prerelease_base: Optional[Tuple[int, int, int]]
+
+    def contains(self, version: VersionKey) -> bool:
+        if self.lower is not None:
+            if version < self.lower or (version == self.lower and not self.lower_inclusive):
+                return False
+        if self.upper is not None:
+            if version > self.upper or (version == self.upper and not self.upper_inclusive):
+                return False
+        return True
+
+
+def _release(major: int, minor: int = 0, patch: int = 0) -> VersionKey:
+    return major, minor, patch, RELEASE
+
+
+def _parse_comparator(text: str) -> Optional[Comparator]:
+    """Переводит одно сравнение Cargo (^1.2, ~0.3, >=1, 1.*, =2.0.1) в интервал
+
+    None означает требование "*", которому подходит любая версия.
+    """
+    match = _COMPARATOR_RE.match(text)
+    if not match:
+        raise ValueError(f"Некорректное требование к версии: {text}")
+    op, major, minor, patch, pre = match.groups()
+
+    wildcard = lambda part: part is not None and part in '*xX'
+    if wildcard(major):
+        return None
+    if wildcard(minor) or wildcard(patch):
+        # 1.* и 1.2.* эквивалентны =1 и =1.2
+        op = '='
+        minor = None if wildcard(minor) else minor
+        patch = None
+    op = op or '^'
+
+    major = int(major)
+    minor = int(minor) if minor is not None else None
+    patch = int(patch) if patch is not None else None
+    exact = (major, minor or 0, patch or 0, _prerelease_key(pre))
+    prerelease_base = exact[:3] if pre else None
+
+    def next_bound():
+        # Первая версия за пределами частично указанной версии
+        if minor is None:
+            return _release(major + 1)
+        if patch is None:
+            return _release(major, minor + 1)
+        return None
+
+    if op == '=':
+        upper = next_bound()
+        if upper is None:
+            return Comparator(exact, True, exact, True, prerelease_base)
+        return Comparator(exact, True, upper, False, prerelease_base)
+    if op == '>':
+        upper = next_bound()
+        if upper is None:
+            return Comparator(exact, False, None, False, prerelease_base)
+        return Comparator(upper, True, None, False, prerelease_base)
+    if op == '>=':
+        return Comparator(exact, True, None, False, prerelease_base)
+    if op == '<':
+        return Comparator(None, False, exact, False, prerelease_base)
+    if op == '<=':
+        upper = next_bound()
+        if upper is None:
+            return Comparator(None, False, exact, True, prerelease_base)
+        return Comparator(None, False, upper, False, prerelease_base)
+    if op == '~':
+        upper = _release(major + 1) if minor is None else _release(major, minor + 1)
+        return Comparator(exact, True, upper, False, prerelease_base)
+
+    # ^: меняться может все правее первой ненулевой указанной части
+    if major > 0 or minor is None:
+        upper = _release(major + 1)
+    elif minor > 0 or patch is None:
+        upper = _release(0, minor + 1)
+    else:
+        upper = _release(0, 0, patch + 1)
+    return Comparator(exact, True, upper, False, prerelease_base)
+
+
+class VersionReq:
+    """Требование к версии в синтаксисе Cargo: сравнения через запятую должны выполняться все"""
+
+    def __init__(self, text: str):
+        self.text = text.strip()
+        comparators = []
+        for part in self.text.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            comparator = _parse_comparator(part)
+            if comparator is not None:
+                comparators.append(comparator)
+        self.comparators: List[Comparator] = comparators
+        self._prerelease_bases = {c.prerelease_base for c in comparators if c.prerelease_base}
+
+    def matches(self, version: VersionKey) -> bool:
+        """Пре-релиз подходит, только если требование явно называет пре-релиз той же версии"""
+        if version[3] != RELEASE and version[:3] not in self._prerelease_bases:
+            return False
+        for comparator in self.comparators:
+            if not comparator.contains(version):
+                return False
+        return True
+
+    def best_match(self, versions: Sequence[Tuple[VersionKey, str]]) -> Optional[str]:
+        """Наибольшая подходящая версия; versions отсортированы по убыванию"""
+        for key, text in versions:
+            if self.matches(key):
+                return text
+        return None
+
+    def __repr__(self):
+        return f"VersionReq({self.text!r})"
+
+
+@lru_cache(maxsize=16384)
+def parse_req(text: str) -> VersionReq:
+    """Разобранные требования переиспользуются: одни и те же ^1 встречаются тысячи раз"""
+    return VersionReq(text or '*')
+
+
+def sort_versions(versions: Sequence[str]) -> List[Tuple[VersionKey, str]]:
+    """Версии по убыванию с ключами сравнения; некорректные номера пропускаются"""
+    parsed = []
+    for text in versions:
+        try:
+            parsed.append((parse_version(text), text))
+        except ValueError:
+            continue
+    parsed.sort(reverse=True)
+    return parsed
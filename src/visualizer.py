@@ -1,5 +1,204 @@
-from typing import Dict, List
+import gzip
+import json
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import quoteattr
 from dependency_graph import DependencyGraph
+from metrics import METRICS
+
+
+class GraphExporter:
+    """Базовый экспортер: выдает текст построчно и пишет его в поток без сборки целиком"""
+    
+    name = ""
+    extension = ""
+    
+    def __init__(self, graph: DependencyGraph):
+        self.graph = graph
+        self.store = graph.store
+        # Группы циклов считаются один раз на граф, а не для каждого ребра
+        self.group_of = graph.cycle_group_ids()
+    
+    def lines(self) -> Iterator[str]:
+        raise NotImplementedError
+    
+    def write(self, out: TextIO) -> None:
+        """Пишет экспорт в любой текстовый файловый объект"""
+        written = 0
+        
+        def counted():
+            nonlocal written
+            for line in self.lines():
+                written += 1
+                yield f"{line}\n"
+        
+        with METRICS.span(f"export.{self.name}"):
+            out.writelines(counted())
+        METRICS.increment('export.lines', written)
+    
+    def _is_cyclic(self, node: int, dep: int) -> bool:
+        group = self.group_of[node]
+        return group >= 0 and self.group_of[dep] == group
+    
+    def _known_nodes(self) -> Iterator[int]:
+        store = self.store
+        return (node for node in range(store.node_count) if store.known[node])
+
+
+class MermaidExporter(GraphExporter):
+    """Mermaid: одна строка на ребро, циклические ребра пунктиром и красным
+    
+    Имена вида serde@1.0.1 не годятся в идентификаторы Mermaid, поэтому
+    узлы объявляются один раз с номером и подписью в кавычках, а ребра
+    и стили ссылаются на номера.
+    """
+    
+    name = "mermaid"
+    extension = ".mmd"
+    
+    def lines(self) -> Iterator[str]:
+        names = self.store.names
+        styled_links: Dict[str, List[int]] = {}
+        link = 0
+        
+        yield "graph TD"
+        
+        nodes = sorted(range(self.store.node_count), key=names.__getitem__)
+        for node in nodes:
+            yield f"    {self.node_label(node)}"
+        
+        for node in nodes:
+            if not self.store.known[node]:
+                continue
+            source = self.node_id(node)
+            for dep in self.store.successors(node):
+                arrow, style = self.edge_style(node, dep)
+                if style:
+                    styled_links.setdefault(style, []).append(link)
+                yield f"    {source} {arrow} {self.node_id(dep)}"
+                link += 1
+        
+        for style, links in styled_links.items():
+            yield f"    linkStyle {','.join(map(str, links))} {style}"
+        yield from self.node_styles()
+    
+    @staticmethod
+    def node_id(node: int) -> str:
+        """Идентификатор узла в диаграмме"""
+        return f"n{node}"
+    
+    def node_label(self, node: int) -> str:
+        """Объявление узла: идентификатор и имя пакета в кавычках"""
+        return mermaid_node(self.node_id(node), self.store.names[node])
+    
+    def package_id(self, package: str) -> str:
+        """Идентификатор узла пакета для строк style"""
+        return self.node_id(self.store.index[package])
+    
+    def edge_style(self, node: int, dep: int) -> Tuple[str, Optional[str]]:
+        """Стрелка ребра и стиль для linkStyle (None - без выделения)"""
+        # Красным выделяются только ребра, лежащие на циклах
+        if self._is_cyclic(node, dep):
+            return "-.->", "stroke:red,stroke-width:1px"
+        return "-->", None
+    
+    def node_styles(self) -> Iterator[str]:
+        """Строки style для выделенных узлов"""
+        return iter(())
+
+
+def mermaid_node(node_id: str, package: str) -> str:
+    """Узел Mermaid с подписью; кавычки в подписи записываются сущностью"""
+    label = package.replace('"', '#quot;')
+    return f'{node_id}["{label}"]'
+
+
+class DotExporter(GraphExporter):
+    """Graphviz DOT"""
+    
+    name = "dot"
+    extension = ".dot"
+    
+    def lines(self) -> Iterator[str]:
+        names = self.store.names
+        yield "digraph dependencies {"
+        yield "    node [shape=box];"
+        for node in range(self.store.node_count):
+            yield f"    {self._quote(names[node])};"
+        for node in self._known_nodes():
+            source = self._quote(names[node])
+            for dep in self.store.successors(node):
+                style = " [color=red, style=dashed]" if self._is_cyclic(node, dep) else ""
+                yield f"    {source} -> {self._quote(names[dep])}{style};"
+        yield "}"
+    
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class GraphMLExporter(GraphExporter):
+    """GraphML для Gephi, yEd и networkx"""
+    
+    name = "graphml"
+    extension = ".graphml"
+    
+    def lines(self) -> Iterator[str]:
+        names = self.store.names
+        yield '<?xml version="1.0" encoding="UTF-8"?>'
+        yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">'
+        yield '  <key id="cyclic" for="edge" attr.name="cyclic" attr.type="boolean"/>'
+        yield '  <graph id="dependencies" edgedefault="directed">'
+        for node in range(self.store.node_count):
+            yield f'    <node id={quoteattr(names[node])}/>'
+        for node in self._known_nodes():
+            source = quoteattr(names[node])
+            for dep in self.store.successors(node):
+                cyclic = "true" if self._is_cyclic(node, dep) else "false"
+                yield (f'    <edge source={source} target={quoteattr(names[dep])}>'
+                       f'<data key="cyclic">{cyclic}</data></edge>')
+        yield '  </graph>'
+        yield '</graphml>'
+
+
+class JsonAdjacencyExporter(GraphExporter):
+    """JSON: {"graph": {пакет: [зависимости]}, "cycle_groups": [[...]]}"""
+    
+    name = "json"
+    extension = ".json"
+    
+    def lines(self) -> Iterator[str]:
+        names = self.store.names
+        yield '{"graph": {'
+        first = True
+        for node in self._known_nodes():
+            dependencies = [names[dep] for dep in self.store.successors(node)]
+            prefix = "" if first else ","
+            first = False
+            yield f"{prefix}{json.dumps(names[node], ensure_ascii=False)}: {json.dumps(dependencies, ensure_ascii=False)}"
+        yield f'}}, "cycle_groups": {json.dumps(self.graph.cycle_groups, ensure_ascii=False)}}}'
+
+
+EXPORTERS = {
+    exporter.name: exporter
+    for exporter in (MermaidExporter, DotExporter, GraphMLExporter, JsonAdjacencyExporter)
+}
+
+
+def open_export_file(filename: str, compress: bool = False) -> TextIO:
+    """Открывает файл для экспорта, при compress или расширении .gz - со сжатием gzip"""
+    if compress or filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', encoding='utf-8')
+    return open(filename, 'w', encoding='utf-8')
+
+
+def detect_format(filename: str) -> str:
+    """Формат экспорта по расширению файла"""
+    base = filename[:-3] if filename.endswith('.gz') else filename
+    for exporter in EXPORTERS.values():
+        if base.endswith(exporter.extension):
+            return exporter.name
+    raise ValueError(f"Не удалось определить формат экспорта по имени файла: {filename}")
+
 
 class GraphVisualizer:
     def __init__(self, graph: DependencyGraph):
@@ -7,56 +206,40 @@ class GraphVisualizer:
     
     def generate_mermaid_graph(self) -> str:
         """Генерирует Mermaid диаграмму графа зависимостей"""
-        mermaid_lines = ["graph TD"]
-        
-        # Добавляем все узлы и связи
-        for package, dependencies in sorted(self.graph.graph.items()):
-            if dependencies:
-                for dep in dependencies:
-                    # Для циклических зависимостей добавляем специальный стиль
-                    is_cyclic = self._is_cyclic_connection(package, dep)
-                    if is_cyclic:
-                        mermaid_lines.append(f"    {package} -.-> {dep}")
-                    else:
-                        mermaid_lines.append(f"    {package} --> {dep}")
-            else:
-                # Пакет без зависимостей
-                mermaid_lines.append(f"    {package}")
-        
-        # Добавляем стили для циклических зависимостей
-        if self.graph.cycles:
-            mermaid_lines.append("    linkStyle default stroke:red,stroke-width:1px")
+        return "\n".join(MermaidExporter(self.graph).lines())
+    
+    def export(self, filename: str, fmt: Optional[str] = None, compress: bool = False) -> None:
+        """Потоково записывает граф в файл в формате mermaid, dot, graphml или json"""
+        fmt = fmt or detect_format(filename)
+        if fmt not in EXPORTERS:
+            raise ValueError(f"Неизвестный формат экспорта: {fmt}")
         
-        return "\n".join(mermaid_lines)
+        exporter = EXPORTERS[fmt](self.graph)
+        with open_export_file(filename, compress) as f:
+            exporter.write(f)
+        
+        print(f"\n Граф сохранен в файл: {filename} ({fmt})")
     
     def _is_cyclic_connection(self, package: str, dep: str) -> bool:
         """Проверяет является ли связь частью цикла"""
-        for cycle in self.graph.cycles:
-            for i in range(len(cycle) - 1):
-                if cycle[i] == package and cycle[i + 1] == dep:
-                    return True
-            # Проверяем замыкание цикла
-            if len(cycle) > 1 and cycle[0] == dep and cycle[-1] == package:
-                return True
-        return False
+        # Ребро лежит на цикле тогда и только тогда, когда оба конца в одной компоненте
+        return self.graph.in_same_cycle_group(package, dep)
     
     def generate_mermaid_reverse_graph(self, target_package: str) -> str:
-        """Генерирует Mermaid диаграмму обратных зависимостей"""
-        mermaid_lines = ["graph TD"]
+        """Генерирует Mermaid диаграмму обратных зависимостей
         
-        # Находим все обратные зависимости
-        reverse_deps = list(self.graph.find_transitive_reverse_dependencies(target_package))
+        Рисуются настоящие ребра между пакетами, зависящими от целевого,
+        а не прямые стрелки от каждого из них к цели.
+        """
+        if self.graph.store.id_of(target_package) is None:
+            return f"graph TD\n    {mermaid_node(MermaidExporter.node_id(0), target_package)}"
         
-        if not reverse_deps:
-            mermaid_lines.append(f"    {target_package}")
-            return "\n".join(mermaid_lines)
-        
-        # Добавляем связи от зависимых пакетов к целевому
-        for dep_package in sorted(reverse_deps):
-            mermaid_lines.append(f"    {dep_package} --> {target_package}")
+        subgraph = self.graph.reverse_dependency_subgraph(target_package)
+        exporter = MermaidExporter(subgraph)
+        mermaid_lines = list(exporter.lines())
         
         # Выделяем целевой пакет
-        mermaid_lines.append(f"    style {target_package} fill:#f9f,stroke:#333,stroke-width:2px")
+        mermaid_lines.append(f"    style {exporter.package_id(target_package)} fill:#f9f,stroke:#333,stroke-width:2px")
         
         return "\n".join(mermaid_lines)
     
@@ -85,11 +268,9 @@ class GraphVisualizer:
         print("```")
     
     def save_mermaid_to_file(self, filename: str = "dependency_graph.mmd") -> None:
-        """Сохраняет Mermaid код в файл"""
-        mermaid_code = self.generate_mermaid_graph()
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(mermaid_code)
+        """Сохраняет Mermaid код в файл, не собирая диаграмму в памяти"""
+        with open_export_file(filename) as f:
+            MermaidExporter(self.graph).write(f)
         
         print(f"\n Mermaid код сохранен в файл: {filename}")
     
@@ -117,6 +298,6 @@ class GraphVisualizer:
         
         print("\3.   Возможные расхождения:")
         print("   - Мы используем упрощенный парсер Cargo.toml")
-        print("   - Не обрабатываем условные зависимости (features)")
-        print("   - Не учитываем версии пакетов")
+        print("   - Фичи и платформенные зависимости учитываются упрощенно (без cfg от build.rs)")
+        print("   - Версии выбираются жадно, без отката при конфликте требований")
         print("   - Для зависимостей используем тот же репозиторий")
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""Общие помощники тестов"""
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from dependency_graph import DependencyGraph
+
+
+def graph_from_adjacency(adjacency, package_name='A'):
+    """Граф из словаря смежности с найденными группами циклов; сообщения о пакетах не печатаются"""
+    config = Config()
+    config.package_name = package_name
+    config.quiet = True
+    graph = DependencyGraph(config)
+    graph.graph = {package: list(deps) for package, deps in adjacency.items()}
+    graph.find_cycle_groups(report=False)
+    return graph
+
+
+def mermaid_with_names(text):
+    """Mermaid-диаграмма, в которой идентификаторы узлов в ребрах и стилях заменены именами пакетов"""
+    labels = {}
+    for line in text.splitlines():
+        declaration = line.strip()
+        if declaration.endswith('"]') and '["' in declaration:
+            node_id, label = declaration[:-2].split('["', 1)
+            labels[node_id] = label.replace('#quot;', '"')
+    return "\n".join(" ".join(labels.get(token, token) for token in line.split(' '))
+                     for line in text.splitlines())
@@ -0,0 +1,227 @@
+"""Локальный HTTP-сервер, отдающий JSON в формате crates.io, для тестов загрузчика"""
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class RegistryState:
+    """Данные и статистика фиктивного реестра"""
+
+    def __init__(self, crates, delay=0.0):
+        # crates: {имя: [имена зависимостей]} - одна версия 1.0.0 с требованиями ^1,
+        # или {имя: {версия: [(зависимость, требование) или dict полей зависимости, ...]}}
+        self.crates = crates
+        self.yanked = set()
+        # Таблицы фич: {(имя, версия): {фича: [...]}}
+        self.features = {}
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Сколько раз подряд отвечать 503 для пакета перед успешным ответом
+        self.failures = {}
+        # Пакеты, для которых эндпоинт зависимостей отдает не JSON
+        self.malformed = set()
+        self.not_modified = 0
+
+    def fetched_crates(self):
+        """Имена пакетов, о которых запрашивались сведения, версии из индекса или зависимости"""
+        names = set()
+        for path in self.requests:
+            path = path.split('?', 1)[0]
+            if path.startswith('/index/'):
+                names.add(self.index_name(path))
+            elif path.startswith('/api/v1/crates/'):
+                names.add(path.split('/')[4])
+        return names
+
+    def index_name(self, path):
+        """Пакет по пути файла в индексе: имена в индексе записаны строчными буквами"""
+        lowered = path.rsplit('/', 1)[1]
+        return next((name for name in self.crates if name.lower() == lowered), lowered)
+
+    def versions(self, name):
+        """{версия: [(зависимость, требование)]} в порядке публикации"""
+        crate = self.crates[name]
+        if isinstance(crate, dict):
+            return crate
+        return {'1.0.0': [(dep, '^1') for dep in crate]}
+
+    def crate_document(self, name, include_versions=False):
+        """Сведения о пакете; объекты версий (как в crates.io, с метаданными) - только с include=versions"""
+        versions = list(self.versions(name))
+        published = [v for v in versions if (name, v) not in self.yanked]
+        default = published[-1] if published else versions[-1]
+        document = {'crate': {'id': name, 'name': name, 'default_version': default, 'max_version': default}}
+        if include_versions:
+            document['versions'] = [
+                {'num': v, 'crate': name, 'yanked': (name, v) in self.yanked,
+                 'features': self.features.get((name, v), {}),
+                 'dl_path': f"/api/v1/crates/{name}/{v}/download",
+                 'readme_path': f"/api/v1/crates/{name}/{v}/readme",
+                 'checksum': '0' * 64, 'license': 'MIT OR Apache-2.0', 'crate_size': 1024,
+                 'created_at': '2024-01-01T00:00:00.000000+00:00',
+                 'updated_at': '2024-01-01T00:00:00.000000+00:00', 'downloads': 0,
+                 'published_by': {'id': 1, 'login': 'author', 'name': 'Author',
+                                  'avatar': 'https://avatars.example/u/1', 'url': 'https://example.com/author'},
+                 'links': {'dependencies': f"/api/v1/crates/{name}/{v}/dependencies",
+                           'version_downloads': f"/api/v1/crates/{name}/{v}/downloads"}}
+                for v in reversed(versions)
+            ]
+        return document
+
+    def index_document(self, name):
+        """Файл пакета в sparse-индексе: JSON-строка на версию в порядке публикации"""
+        lines = []
+        for v, deps in self.versions(name).items():
+            index_deps = []
+            for dep in deps:
+                if not isinstance(dep, dict):
+                    dep = {'crate_id': dep[0], 'req': dep[1]}
+                index_deps.append({'name': dep['crate_id'], 'req': dep.get('req', '*'),
+                                   'features': dep.get('features', []), 'optional': dep.get('optional', False),
+                                   'default_features': dep.get('default_features', True),
+                                   'target': dep.get('target'), 'kind': dep.get('kind', 'normal')})
+            lines.append(json.dumps({'name': name, 'vers': v, 'deps': index_deps, 'cksum': '0' * 64,
+                                     'features': self.features.get((name, v), {}),
+                                     'yanked': (name, v) in self.yanked}))
+        return '\n'.join(lines) + '\n'
+
+    def crate_list_document(self, page, per_page):
+        """Страница списка всех пакетов по алфавиту, как /api/v1/crates"""
+        names = sorted(self.crates)
+        chunk = names[(page - 1) * per_page:page * per_page]
+        next_page = f"?page={page + 1}&per_page={per_page}" if page * per_page < len(names) else None
+        return {
+            'crates': [{'id': name, 'name': name} for name in chunk],
+            'meta': {'total': len(names), 'next_page': next_page},
+        }
+
+    def dependencies_document(self, name, version):
+        dependencies = []
+        for dep in self.versions(name).get(version, []):
+            if not isinstance(dep, dict):
+                dep = {'crate_id': dep[0], 'req': dep[1]}
+            dependencies.append(dict({'kind': 'normal', 'optional': False, 'default_features': True,
+                                      'features': [], 'target': None}, **dep))
+        return {'dependencies': dependencies}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят отдельными пакетами: без этого каждый ответ ждет отложенного ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        state = self.server.state
+        with state.lock:
+            state.requests.append(self.path)
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+
+        try:
+            if state.delay:
+                time.sleep(state.delay)
+            self._respond(state)
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+    def _respond(self, state):
+        prefix = '/api/v1/crates/'
+        path = self.path.split('?', 1)[0]
+        if path.startswith('/index/'):
+            name = state.index_name(path)
+            if name not in state.crates:
+                self._send(404, {'errors': [{'detail': 'Not Found'}]})
+            else:
+                self._send_versioned(state, state.index_document(name).encode('utf-8'), 'text/plain')
+            return
+        parts = path[len(prefix):].split('/') if path.startswith(prefix) else []
+        name = parts[0] if parts else None
+
+        if path == '/api/v1/crates':
+            query = parse_qs(self.path.partition('?')[2])
+            page = int(query.get('page', ['1'])[0])
+            per_page = int(query.get('per_page', ['10'])[0])
+            self._send(200, state.crate_list_document(page, per_page))
+        elif name not in state.crates:
+            self._send(404, {'errors': [{'detail': 'Not Found'}]})
+        elif len(parts) == 3 and parts[2] == 'dependencies' and name in state.malformed:
+            self._send_body(200, b'{"dependencies": [', 'application/json')
+        elif len(parts) == 3 and parts[2] == 'dependencies':
+            self._send(200, state.dependencies_document(name, parts[1]))
+        elif len(parts) == 1:
+            self._respond_crate(state, name)
+        else:
+            self._send(404, {'errors': [{'detail': 'Not Found'}]})
+
+    def _respond_crate(self, state, name):
+        with state.lock:
+            pending_failures = state.failures.get(name, 0)
+            if pending_failures:
+                state.failures[name] = pending_failures - 1
+
+        if pending_failures:
+            self._send(503, {'errors': [{'detail': 'try again'}]})
+            return
+
+        include = parse_qs(self.path.partition('?')[2]).get('include', [''])[0].split(',')
+        document = state.crate_document(name, include_versions='versions' in include)
+        self._send_versioned(state, json.dumps(document).encode('utf-8'), 'application/json')
+
+    def _send_versioned(self, state, body, content_type):
+        """Ответ с ETag; при совпадении If-None-Match - 304 без тела"""
+        etag = '"%08x"' % zlib.crc32(body)
+        if self.headers.get('If-None-Match') == etag:
+            with state.lock:
+                state.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self._send_body(200, body, content_type, {'ETag': etag})
+
+    def _send(self, status, payload, headers=None):
+        self._send_body(status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+
+    def _send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class RegistryServer:
+    """Запускает фиктивный реестр в фоновом потоке"""
+
+    def __init__(self, crates, delay=0.0):
+        self.state = RegistryState(crates, delay)
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.state = self.state
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
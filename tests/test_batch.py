@@ -0,0 +1,117 @@
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from batch import load_graph, run_batch
+from config import Config
+from registry_server import RegistryServer
+
+REGISTRY = {
+    'web': ['http', 'json'],
+    'cli': ['args', 'json'],
+    'http': ['bytes', 'io'],
+    'json': ['bytes'],
+    'args': [],
+    'bytes': [],
+    'io': ['http'],
+}
+
+
+def make_config(url: str, package: str, max_depth: int = 5) -> Config:
+    config = Config()
+    config.package_name = package
+    config.registry_url = url
+    config.max_depth = max_depth
+    config.retry_backoff = 0.01
+    return config
+
+
+def test_load_all_returns_config_per_row(tmp_path):
+    """Каждая строка CSV становится отдельной конфигурацией"""
+    path = tmp_path / "config.csv"
+    path.write_text("package_name,test_mode,max_depth,batch_workers\n"
+                    "serde,false,2,4\n"
+                    "tokio,false,,\n", encoding='utf-8')
+
+    configs = Config.load_all(str(path))
+
+    assert [c.package_name for c in configs] == ['serde', 'tokio']
+    assert [c.max_depth for c in configs] == [2, 3]
+    assert [c.batch_workers for c in configs] == [4, 1]
+    assert configs[0].source_key() == configs[1].source_key()
+
+
+def test_load_all_rejects_empty_file(tmp_path):
+    path = tmp_path / "config.csv"
+    path.write_text("package_name,test_mode\n", encoding='utf-8')
+    with pytest.raises(ValueError):
+        Config.load_all(str(path))
+
+
+def test_run_batch_reuses_shared_subtrees():
+    """Общие зависимости корней загружаются один раз и попадают в один граф"""
+    with RegistryServer(REGISTRY) as server:
+        configs = [make_config(server.url, 'web'), make_config(server.url, 'cli'),
+                   make_config(server.url, 'missing')]
+        summaries, graph = run_batch(configs, workers=1)
+
+    # Каждый пакет и его зависимости запрошены не больше одного раза
+    assert len(server.state.requests) == len(set(server.state.requests))
+
+    web, cli, missing = summaries
+    assert (web.node, web.packages, web.edges, web.new_packages) == ('web@1.0.0', 5, 6, 5)
+    assert web.cycle_groups == 1
+    # json и bytes уже разобраны для web
+    assert (cli.node, cli.packages, cli.new_packages) == ('cli@1.0.0', 4, 2)
+    assert missing.error == '' and missing.packages == 1
+
+    assert 'json@1.0.0' in graph.graph['cli@1.0.0']
+    assert graph.cycle_groups == [['http@1.0.0', 'io@1.0.0']]
+
+
+def test_run_batch_with_process_pool_matches_serial_run():
+    """Разбиение корней между процессами не меняет ни сводки, ни общий граф"""
+    configs = []
+    for package, depth in (('A', 3), ('C', 2), ('B', 3), ('D', 1)):
+        config = Config()
+        config.package_name = package
+        config.test_mode = True
+        config.max_depth = depth
+        configs.append(config)
+
+    serial, serial_graph = run_batch(configs, workers=1)
+    parallel, parallel_graph = run_batch(configs, workers=2)
+
+    strip = lambda summaries: [s._replace(seconds=0, new_packages=0) for s in summaries]
+    assert strip(parallel) == strip(serial)
+    assert [s.package for s in parallel] == ['A', 'C', 'B', 'D']
+    assert dict(parallel_graph.graph) == dict(serial_graph.graph)
+
+
+def test_load_graph_rebuilds_snapshot_of_another_root(tmp_path):
+    """Снимок другого пакета или с другими настройками не загружается, а перестраивается"""
+    snapshot = str(tmp_path / "graph.snap")
+    with RegistryServer(REGISTRY) as server:
+        configs = [make_config(server.url, package) for package in ('web', 'cli', 'cli')]
+        configs[2].max_depth = 1
+        for config in configs:
+            config.snapshot_path = snapshot
+            config.quiet = True
+
+        web = load_graph(configs[0])
+        requests = len(server.state.requests)
+        cli = load_graph(configs[1])
+        assert len(server.state.requests) > requests
+        requests = len(server.state.requests)
+        again = load_graph(configs[1])
+        assert len(server.state.requests) == requests
+        shallow = load_graph(configs[2])
+
+    assert 'http@1.0.0' in web.graph and 'http@1.0.0' not in cli.graph
+    assert dict(again.graph) == dict(cli.graph)
+    assert shallow.graph['cli@1.0.0'] == ['args@1.0.0', 'json@1.0.0']
+    assert 'bytes@1.0.0' not in shallow.graph
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from batch import load_graph
+from config import Config
+from conftest import mermaid_with_names
+from main import main
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+SAMPLE = "A\nB\nC\n\nB\nD\n\nC\nE\nF\n\nE\nC\n\nF\nG\n"
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    repo = tmp_path / "repo.txt"
+    repo.write_text(SAMPLE, encoding='utf-8')
+    path = tmp_path / "config.csv"
+    path.write_text(f"package_name,test_mode,test_repo_path\nA,true,{repo}\n", encoding='utf-8')
+    return str(path)
+
+
+def test_graph_and_reverse_commands(config_path, capsys):
+    main(['--config', config_path, 'graph'])
+    output = capsys.readouterr().out
+    assert "C -> E, F" in output
+    assert "C -> E -> C" in output
+
+    main(['--config', config_path, 'reverse', 'G', '--mermaid'])
+    output = capsys.readouterr().out
+    assert "Транзитивные обратные зависимости" in output
+    assert "style G" in mermaid_with_names(output)
+
+
+def test_export_command_detects_format(config_path, tmp_path):
+    output = tmp_path / "graph.dot"
+    main(['--config', config_path, 'export', str(output)])
+    assert '"A" -> "B"' in output.read_text(encoding='utf-8')
+
+
+def test_render_command_writes_svg(config_path, tmp_path):
+    output = tmp_path / "graph.svg"
+    main(['--config', config_path, 'render', str(output), '--highlight', 'G'])
+    svg = output.read_text(encoding='utf-8')
+    assert svg.startswith('<svg') and 'class="target"' in svg
+
+
+def test_diff_command_compares_snapshot_with_current_graph(config_path, tmp_path, capsys):
+    snapshot = str(tmp_path / "before.snap")
+    load_graph(Config.load_all(config_path)[0]).save_snapshot(snapshot)
+    repo = tmp_path / "repo.txt"
+    repo.write_text(SAMPLE.replace("F\nG\n", "F\nG\nB\n"), encoding='utf-8')
+
+    output = tmp_path / "changes.mmd"
+    main(['--config', config_path, 'diff', snapshot, '--mermaid', str(output)])
+    assert "+ F -> B" in capsys.readouterr().out
+    assert "F ==> B" in mermaid_with_names(output.read_text(encoding='utf-8'))
+
+
+def test_package_option_overrides_config(config_path, capsys):
+    main(['--config', config_path, '--package', 'C', 'graph'])
+    output = capsys.readouterr().out
+    assert "Полный граф зависимостей для 'C'" in output
+    assert "A ->" not in output
+
+
+def test_errors_exit_with_status(tmp_path, capsys):
+    with pytest.raises(SystemExit) as error:
+        main(['--config', str(tmp_path / "missing.csv"), 'config'])
+    assert error.value.code == 1
+    assert "Ошибка" in capsys.readouterr().out
+
+
+def test_offline_commands_do_not_import_network_stack(config_path):
+    """config и команды тестового режима не загружают requests и сервер"""
+    code = ("import sys, main; main.main(sys.argv[1:]); "
+            "print(sorted(m for m in ('requests', 'crates_fetcher', 'http.server', 'multiprocessing') "
+            "if m in sys.modules))")
+    for command in (['config'], ['graph'], ['reverse', 'C']):
+        result = subprocess.run([sys.executable, '-c', code, '--config', config_path] + command,
+                                cwd=SRC, capture_output=True, text=True, check=True)
+        assert result.stdout.strip().splitlines()[-1] == '[]', command
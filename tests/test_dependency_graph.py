@@ -0,0 +1,284 @@
+import json
+import os
+import random
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from conftest import graph_from_adjacency, mermaid_with_names
+from dependency_graph import DependencyGraph
+from dependency_parser import DependencyParser
+from graph_algorithms import Condensation
+from registry_server import RegistryServer
+from visualizer import GraphVisualizer
+
+SAMPLE = {
+    'A': ['B', 'C'],
+    'B': ['D'],
+    'C': ['E', 'F'],
+    'D': [],
+    'E': ['C'],
+    'F': ['G'],
+    'G': [],
+}
+
+
+def test_cycle_groups_back_visualizer():
+    """Визуализатор помечает только ребра внутри групп циклов"""
+    graph = graph_from_adjacency(SAMPLE)
+    visualizer = GraphVisualizer(graph)
+
+    assert graph.cycle_groups == [['C', 'E']]
+    assert graph.cycles == [['C', 'E', 'C']]
+    assert visualizer._is_cyclic_connection('C', 'E')
+    assert visualizer._is_cyclic_connection('E', 'C')
+    assert not visualizer._is_cyclic_connection('A', 'C')
+    assert "    C -.-> E" in mermaid_with_names(visualizer.generate_mermaid_graph())
+
+
+def naive_reverse_closure(adjacency, package):
+    """Эталон: обход обратных ребер в ширину"""
+    reverse = {}
+    for source, deps in adjacency.items():
+        for dep in deps:
+            reverse.setdefault(dep, []).append(source)
+    result, queue = set(), [package]
+    while queue:
+        for parent in reverse.get(queue.pop(), []):
+            if parent not in result:
+                result.add(parent)
+                queue.append(parent)
+    return result
+
+
+def test_batch_reverse_closure_matches_naive_search():
+    """Пакетный запрос совпадает с поиском по каждому пакету отдельно"""
+    rng = random.Random(7)
+    nodes = [f"crate{i}" for i in range(300)]
+    adjacency = {node: rng.sample(nodes, rng.randint(0, 4)) for node in nodes}
+    graph = graph_from_adjacency(adjacency)
+
+    closures = graph.find_transitive_reverse_dependencies_batch(nodes)
+    # Маленькие пачки проверяют границы между ними
+    store = graph.store
+    chunked = Condensation(store.id_adjacency()).reverse_closures(
+        [store.id_of(node) for node in nodes], chunk_size=7)
+
+    for node, closure in zip(nodes, chunked):
+        expected = naive_reverse_closure(adjacency, node)
+        assert closures[node] == expected
+        assert {store.names[i] for i in closure} == expected
+
+
+def test_reverse_closure_cache_is_invalidated_on_edge_change():
+    """После замены ребер кеш транзитивных ответов пересчитывается"""
+    graph = graph_from_adjacency(SAMPLE)
+
+    assert graph.find_transitive_reverse_dependencies('E') == {'A', 'C', 'E'}
+    assert graph.find_transitive_reverse_dependencies('D') == {'A', 'B'}
+    assert graph.find_transitive_reverse_dependencies('missing') == set()
+
+    graph.graph = {'X': ['D'], 'D': []}
+    assert graph.find_transitive_reverse_dependencies('D') == {'X'}
+
+
+def test_incremental_updates_match_full_rebuild():
+    """Точечные изменения дают те же ребра и группы циклов, что и полное перестроение"""
+    rng = random.Random(11)
+    nodes = [f"crate{i}" for i in range(60)]
+    adjacency = {node: rng.sample(nodes, rng.randint(0, 2)) for node in nodes}
+    graph = graph_from_adjacency(adjacency)
+    graph.COMPACT_THRESHOLD = 16
+
+    for _ in range(300):
+        package = rng.choice(nodes)
+        action = rng.random()
+        if action < 0.4:
+            graph.add_dependency(package, rng.choice(nodes))
+        elif action < 0.8 and adjacency[package]:
+            graph.remove_dependency(package, rng.choice(graph.graph[package]))
+        else:
+            graph.set_dependencies(package, rng.sample(nodes, rng.randint(0, 3)))
+        adjacency = dict(graph.graph)
+
+        expected = graph_from_adjacency(adjacency)
+        assert graph.cycle_groups == expected.cycle_groups
+        assert {k: sorted(v) for k, v in graph.reverse_graph.items() if v} == \
+            {k: sorted(v) for k, v in expected.reverse_graph.items() if v}
+        for group, cycle in zip(graph.cycle_groups, graph.cycles):
+            assert cycle[0] == cycle[-1] == group[0]
+
+
+def test_remove_package_keeps_incoming_edges():
+    """Удаление пакета убирает его зависимости, но не ссылки на него"""
+    graph = graph_from_adjacency(SAMPLE)
+    graph.remove_package('E')
+
+    assert 'E' not in graph.graph
+    assert graph.reverse_graph['E'] == ['C']
+    assert graph.cycle_groups == []
+    assert graph.find_transitive_reverse_dependencies('C') == {'A'}
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """Сохраненный граф загружается без повторного построения"""
+    graph = graph_from_adjacency(SAMPLE)
+    filename = str(tmp_path / 'graph.json')
+    graph.save_to_file(filename)
+
+    loaded = DependencyGraph(graph.config)
+    loaded.load_from_file(filename)
+
+    assert dict(loaded.graph) == SAMPLE
+    assert loaded.cycle_groups == [['C', 'E']]
+
+
+def test_update_package_fetches_new_subtree():
+    """Обновление пакета загружает только его и новые пакеты"""
+    graph = graph_from_adjacency(SAMPLE)
+    registry = dict(SAMPLE, D=['X'], X=['Y'], Y=[])
+
+    with RegistryServer(registry) as server:
+        graph.config.registry_url = server.url
+        parser = DependencyParser(graph.config)
+        parser.dependency_cache.update(SAMPLE)
+        try:
+            graph.update_package('D', parser)
+        finally:
+            parser.close()
+
+    fetched = server.state.fetched_crates()
+    assert fetched == {'D', 'X', 'Y'}
+
+    assert graph.graph['D'] == ['X@1.0.0']
+    assert graph.graph['X@1.0.0'] == ['Y@1.0.0']
+    assert graph.find_transitive_reverse_dependencies('Y@1.0.0') == {'A', 'B', 'D', 'X@1.0.0'}
+
+
+def test_mermaid_marks_exactly_the_cyclic_edges():
+    """Пунктиром и красным выделяются ровно ребра внутри групп циклов"""
+    rng = random.Random(5)
+    nodes = [f"crate{i}" for i in range(80)]
+    graph = graph_from_adjacency({node: rng.sample(nodes, rng.randint(0, 3)) for node in nodes})
+    visualizer = GraphVisualizer(graph)
+    lines = mermaid_with_names(visualizer.generate_mermaid_graph()).splitlines()
+
+    links = [line.split() for line in lines[1:] if '->' in line]
+    styled = {int(i) for i in lines[-1].split()[1].split(',')}
+    for i, (package, arrow, dep) in enumerate(links):
+        cyclic = visualizer._is_cyclic_connection(package, dep)
+        assert (arrow == '-.->') == cyclic
+        assert (i in styled) == cyclic
+
+
+def naive_reachable(adjacency, package):
+    seen, stack = set(), [package]
+    while stack:
+        for dep in adjacency.get(stack.pop(), []):
+            if dep not in seen:
+                seen.add(dep)
+                stack.append(dep)
+    return seen
+
+
+def test_neighbourhood_and_shortest_paths():
+    """k-окрестность и кратчайшие пути возвращают подграфы с настоящими ребрами"""
+    graph = graph_from_adjacency(SAMPLE)
+
+    forward = graph.neighbourhood('C', hops=1, direction='forward')
+    assert set(forward.graph) == {'C', 'E', 'F'}
+    assert forward.graph['E'] == ['C']
+    assert forward.cycle_groups == [['C', 'E']]
+    assert set(graph.neighbourhood('C', hops=1, direction='reverse').graph) == {'A', 'C', 'E'}
+    assert set(graph.neighbourhood('G', hops=2).graph) == {'C', 'F', 'G'}
+
+    assert graph.shortest_path('A', 'G') == ['A', 'C', 'F', 'G']
+    assert graph.shortest_path('G', 'A') == []
+
+    diamond = graph_from_adjacency({'A': ['B', 'C', 'X'], 'B': ['D'], 'C': ['D'], 'X': ['Y'], 'Y': ['D'], 'D': []})
+    paths = diamond.shortest_paths_subgraph('A', 'D')
+    assert dict(paths.graph) == {'A': ['B', 'C'], 'B': ['D'], 'C': ['D'], 'D': []}
+
+
+def test_top_by_fan_in():
+    graph = graph_from_adjacency({'A': ['C', 'D'], 'B': ['C', 'D'], 'E': ['C'], 'C': [], 'D': []})
+    assert graph.top_by_fan_in(2) == [('C', 3), ('D', 2)]
+    assert set(graph.top_by_fan_in_subgraph(2).graph) == {'C', 'D'}
+
+
+def test_condensed_graph_collapses_cycle_groups():
+    graph = graph_from_adjacency(SAMPLE)
+    condensed = graph.condensed()
+
+    assert condensed.collapsed_groups == {'cycle_C_E': ['C', 'E']}
+    assert sorted(condensed.graph['A']) == ['B', 'cycle_C_E']
+    assert condensed.graph['cycle_C_E'] == ['F']
+    assert condensed.cycle_groups == []
+
+
+def test_transitive_reduction_preserves_reachability():
+    """Сокращение удаляет лишние ребра, но не меняет достижимость"""
+    rng = random.Random(11)
+    nodes = [f"crate{i}" for i in range(60)]
+    adjacency = {node: rng.sample(nodes, rng.randint(0, 4)) for node in nodes}
+    graph = graph_from_adjacency(adjacency)
+    reduced = graph.transitive_reduction()
+
+    assert reduced.store.edge_count < graph.store.edge_count
+    for node in nodes:
+        assert naive_reachable(reduced.graph, node) == naive_reachable(adjacency, node)
+    assert reduced.cycle_groups == graph.cycle_groups
+
+    chain = graph_from_adjacency({'A': ['B', 'C'], 'B': ['C'], 'C': []}).transitive_reduction()
+    assert dict(chain.graph) == {'A': ['B'], 'B': ['C'], 'C': []}
+
+
+def test_reverse_mermaid_graph_keeps_real_edges():
+    visualizer = GraphVisualizer(graph_from_adjacency(SAMPLE))
+    lines = mermaid_with_names(visualizer.generate_mermaid_reverse_graph('F')).splitlines()
+
+    assert "    C --> F" in lines
+    assert "    A --> C" in lines
+    assert "    E -.-> C" in lines
+    assert "    A --> F" not in lines
+    assert lines[-1].startswith("    style F")
+    assert visualizer.generate_mermaid_reverse_graph('missing') == 'graph TD\n    n0["missing"]'
+
+
+def test_quiet_mode_and_metrics(tmp_path, capsys):
+    """Тихий режим не печатает строки по пакетам, а метрики выгружаются в JSON"""
+    from metrics import METRICS
+
+    path = tmp_path / 'repo.txt'
+    path.write_text("A\nB\nC\n\nB\nC\n\nC\nA\n", encoding='utf-8')
+    config = Config()
+    config.package_name = 'A'
+    config.test_mode = True
+    config.test_repo_path = str(path)
+    config.quiet = True
+
+    METRICS.reset()
+    graph = DependencyGraph(config)
+    graph.build_graph()
+    graph.find_transitive_reverse_dependencies_batch(['A', 'B'])
+    graph.find_transitive_reverse_dependencies_batch(['A'])
+    GraphVisualizer(graph).export(str(tmp_path / 'graph.dot'))
+
+    output = capsys.readouterr().out
+    assert "A -> " not in output
+    assert "Обнаружена циклическая зависимость" not in output
+
+    METRICS.save(str(tmp_path / 'metrics.json'))
+    with open(tmp_path / 'metrics.json', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot['gauges'] == {'graph.nodes': 3, 'graph.edges': 4}
+    assert snapshot['counters']['parse.lines'] == 9
+    assert snapshot['counters']['graph.reverse_cache_misses'] == 2
+    assert snapshot['counters']['graph.reverse_cache_hits'] == 1
+    assert snapshot['counters']['messages.suppressed'] == 3 + 1
+    exported = (tmp_path / 'graph.dot').read_text(encoding='utf-8').splitlines()
+    assert snapshot['counters']['export.lines'] == len(exported)
+    for span in ('graph.build', 'graph.parse', 'graph.cycles', 'graph.reverse_closures', 'export.dot'):
+        assert snapshot['spans'][span]['count'] >= 1
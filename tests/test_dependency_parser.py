@@ -0,0 +1,373 @@
+import io
+import json
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from crates_fetcher import CratesFetcher
+from dependency_parser import DependencyParser
+from edge_filter import Requirement
+from persistent_cache import PersistentCache
+from registry_index import crate_index_parts
+from registry_server import RegistryServer
+
+REGISTRY = {
+    'root': ['a', 'b', 'c', 'd'],
+    'a': ['shared'],
+    'b': ['shared'],
+    'c': ['shared', 'e'],
+    'd': [],
+    'e': ['root'],
+    'shared': [],
+}
+# Узлы графа в рабочем режиме - пары (пакет, версия)
+RESOLVED = {f"{name}@1.0.0": [f"{dep}@1.0.0" for dep in deps] for name, deps in REGISTRY.items()}
+CRATE_URL = "/api/v1/crates/{}?include=default_version"
+
+
+def index_url(name: str) -> str:
+    return "/index/" + "/".join(crate_index_parts(name))
+
+
+def make_config(url: str, max_depth: int = 5) -> Config:
+    config = Config()
+    config.package_name = 'root'
+    config.registry_url = url
+    config.max_depth = max_depth
+    config.max_workers = 4
+    config.retry_backoff = 0.01
+    return config
+
+
+def test_resolve_dependencies_fetches_frontier_concurrently():
+    """Пакеты одного уровня загружаются параллельно и попадают в кеш"""
+    with RegistryServer(REGISTRY, delay=0.05) as server:
+        parser = DependencyParser(make_config(server.url))
+        try:
+            parser.resolve_dependencies('root')
+        finally:
+            parser.close()
+
+    assert parser.dependency_cache == RESOLVED
+    # Основная версия запрашивается только для корня, для каждого пакета -
+    # один файл индекса с версиями и фичами и один запрос зависимостей
+    expected = [CRATE_URL.format('root')]
+    for name in REGISTRY:
+        expected.append(index_url(name))
+        expected.append(f"/api/v1/crates/{name}/1.0.0/dependencies")
+    assert sorted(server.state.requests) == sorted(expected)
+    assert server.state.max_in_flight > 1
+
+
+def test_resolve_dependencies_respects_max_depth():
+    """Пакеты глубже max_depth не загружаются"""
+    with RegistryServer(REGISTRY) as server:
+        parser = DependencyParser(make_config(server.url, max_depth=1))
+        try:
+            parser.resolve_dependencies('root')
+        finally:
+            parser.close()
+
+    assert list(parser.dependency_cache) == ['root@1.0.0']
+
+
+def test_fetcher_retries_transient_errors():
+    """Ответ 503 повторяется с задержкой, 404 дает пустой список"""
+    with RegistryServer(REGISTRY) as server:
+        server.state.failures['a'] = 2
+        parser = DependencyParser(make_config(server.url))
+        try:
+            assert parser.get_dependencies('a') == ['shared@1.0.0']
+            assert parser.get_dependencies('missing') == []
+        finally:
+            parser.close()
+
+    assert server.state.requests.count(CRATE_URL.format('a')) == 3
+
+
+def test_fetcher_reports_traffic_statistics():
+    """Загрузчик считает запросы и объем полученных данных"""
+    with RegistryServer(REGISTRY) as server:
+        parser = DependencyParser(make_config(server.url))
+        try:
+            parser.resolve_dependencies('root')
+            fetcher = parser.fetcher
+        finally:
+            parser.close()
+
+    assert fetcher.requests_made == len(server.state.requests)
+    assert fetcher.bytes_downloaded > 0
+    assert fetcher.request_seconds > 0
+
+
+def test_persistent_cache_serves_warm_run_without_network(tmp_path):
+    """Повторный запуск с теплым кешем не делает сетевых запросов"""
+    with RegistryServer(REGISTRY) as server:
+        config = make_config(server.url)
+        config.cache_path = str(tmp_path / 'crates.sqlite3')
+
+        cold = DependencyParser(config)
+        try:
+            cold.resolve_dependencies('root')
+        finally:
+            cold.close()
+        cold_requests = len(server.state.requests)
+
+        warm = DependencyParser(config)
+        try:
+            warm.resolve_dependencies('root')
+        finally:
+            warm.close()
+
+    assert cold_requests == 2 * len(REGISTRY) + 1
+    assert len(server.state.requests) == cold_requests
+    assert warm.dependency_cache == RESOLVED
+
+
+def test_persistent_cache_revalidates_expired_entries(tmp_path):
+    """Устаревшие записи перепроверяются по ETag и не скачиваются заново"""
+    with RegistryServer(REGISTRY) as server:
+        config = make_config(server.url)
+        config.cache_path = str(tmp_path / 'crates.sqlite3')
+        config.cache_ttl = 0
+
+        for _ in range(2):
+            parser = DependencyParser(config)
+            try:
+                parser.resolve_dependencies('root')
+            finally:
+                parser.close()
+
+    assert server.state.not_modified == len(REGISTRY) + 1
+    assert parser.dependency_cache == RESOLVED
+
+
+def test_cache_entries_of_old_format_are_refetched(tmp_path):
+    """Свежая запись прежнего формата не используется: пакет загружается заново"""
+    config = make_config('')
+    config.cache_path = str(tmp_path / 'crates.sqlite3')
+    cache = PersistentCache(config.cache_path)
+    cache.put('a', '', {'version': '0.1.0'})
+    cache.close()
+
+    with RegistryServer(REGISTRY) as server:
+        config.registry_url = server.url
+        parser = DependencyParser(config)
+        try:
+            assert parser.get_dependencies('a') == ['shared@1.0.0']
+        finally:
+            parser.close()
+
+    assert CRATE_URL.format('a') in server.state.requests
+
+
+def test_offline_mode_answers_from_cache_only(tmp_path):
+    """В автономном режиме загрузчик не обращается к сети"""
+    config = make_config('http://127.0.0.1:9')
+    config.cache_path = str(tmp_path / 'crates.sqlite3')
+    config.offline = True
+    config.cache_ttl = 0
+
+    cache = PersistentCache(config.cache_path)
+    cache.put('root', '', {'format': CratesFetcher.CACHE_FORMAT, 'version': '1.0.0', 'releases': {'1.0.0': {}}})
+    cache.put('root', '1.0.0', {'format': CratesFetcher.CACHE_FORMAT,
+                                'edges': [Requirement('a'), Requirement('b')]})
+    cache.close()
+
+    parser = DependencyParser(config)
+    try:
+        # Устаревшая запись все равно используется, отсутствующая дает пустой список
+        assert parser.get_dependencies('root') == ['a', 'b']
+        assert parser.get_dependencies('a') == []
+    finally:
+        parser.close()
+
+
+def make_diamond_parser(layers: int, width: int, tree_mode: str = 'dag') -> DependencyParser:
+    """Граф из слоев, где каждый пакет зависит от всех пакетов следующего слоя"""
+    config = Config()
+    config.test_mode = True
+    config.max_depth = layers + 1
+    config.tree_mode = tree_mode
+    parser = DependencyParser(config)
+
+    parser.dependency_cache['root'] = [f"n0_{i}" for i in range(width)]
+    for layer in range(layers):
+        next_layer = [f"n{layer + 1}_{i}" for i in range(width)] if layer + 1 < layers else []
+        for i in range(width):
+            parser.dependency_cache[f"n{layer}_{i}"] = next_layer
+    return parser
+
+
+def test_dag_tree_renders_each_subtree_once():
+    """Общие поддеревья раскрываются один раз, повторы - ссылкой назад"""
+    parser = make_diamond_parser(layers=10, width=4)
+    output = io.StringIO()
+    parser.print_dependency_tree('root', output)
+    lines = output.getvalue().splitlines()
+
+    expanded = [line for line in lines if '→' in line]
+    references = [line for line in lines if '(см. выше)' in line]
+    edges = 4 + 9 * 4 * 4
+    # Одна строка на ребро (плюс корень) вместо 4^10 строк полного развертывания
+    assert len(lines) == edges + 1
+    assert len(expanded) == 41
+    assert len(references) == edges + 1 - 41
+
+
+def test_tree_marks_cycles_and_depth_limit():
+    """Циклы и обрезка по глубине печатаются как раньше"""
+    config = Config()
+    config.test_mode = True
+    config.max_depth = 3
+    parser = DependencyParser(config)
+    output = io.StringIO()
+    parser.print_dependency_tree('A', output)
+
+    assert output.getvalue().splitlines() == [
+        "📦 A → B, C",
+        "  📦 B → D",
+        "    📦 D → нет зависимостей",
+        "  📦 C → E, F",
+        "    📦 E → C",
+        "      ↻ C (ЦИКЛ!)",
+        "    📦 F → G",
+        "      ... (достигнута максимальная глубина 3)",
+    ]
+
+
+def test_dag_tree_reexpands_package_found_closer_to_root():
+    """Пакет, обрезанный глубиной, раскрывается заново на меньшей глубине"""
+    config = Config()
+    config.test_mode = True
+    config.max_depth = 3
+    parser = DependencyParser(config)
+    parser.dependency_cache.update({
+        'root': ['a', 'shared'], 'a': ['b'], 'b': ['shared'], 'shared': ['leaf'], 'leaf': [],
+    })
+    output = io.StringIO()
+    parser.print_dependency_tree('root', output)
+
+    assert "  📦 shared → leaf" in output.getvalue().splitlines()
+
+
+VERSIONED = {
+    'app': {'1.0.0': [('log', '^0.4'), ('serde', '^1.0'), ('helper', '^2')]},
+    'log': {'0.3.9': [('old-dep', '*')], '0.4.0': [], '0.4.8': [('cfg-if', '^1')], '0.5.0': []},
+    'serde': {'1.0.100': [], '1.0.200': [], '2.0.0': []},
+    'helper': {'2.0.0': [('serde', '^1.0.150'), ('log', '=0.4.0')], '2.1.0': [('serde', '^1')]},
+    'cfg-if': {'1.0.0': []},
+    'old-dep': {'1.0.0': []},
+}
+
+
+def test_requirements_select_best_matching_versions():
+    """Для каждой зависимости выбирается наибольшая версия, подходящая под требование"""
+    with RegistryServer(VERSIONED) as server:
+        server.state.yanked.add(('helper', '2.1.0'))
+        parser = DependencyParser(make_config(server.url))
+        try:
+            root = parser.resolve_dependencies('app')
+        finally:
+            parser.close()
+
+    assert root == 'app@1.0.0'
+    assert parser.dependency_cache == {
+        'app@1.0.0': ['log@0.4.8', 'serde@1.0.200', 'helper@2.0.0'],
+        'log@0.4.8': ['cfg-if@1.0.0'],
+        'serde@1.0.200': [],
+        # ^1.0.150 переиспользует уже выбранную 1.0.200, =0.4.0 требует отдельную версию
+        'helper@2.0.0': ['serde@1.0.200', 'log@0.4.0'],
+        'log@0.4.0': [],
+        'cfg-if@1.0.0': [],
+    }
+    # Зависимости невыбранных версий не загружаются
+    fetched = {path for path in server.state.requests if path.endswith('/dependencies')}
+    assert fetched == {f"/api/v1/crates/{node.replace('@', '/')}/dependencies" for node in parser.dependency_cache}
+    assert not any('old-dep' in path for path in server.state.requests)
+    # Список версий каждого пакета запрашивается один раз
+    assert server.state.requests.count(index_url('serde')) == 1
+    assert server.state.requests.count(index_url('log')) == 1
+
+
+def test_version_lists_come_from_compact_index():
+    """Списки версий и фичи берутся из sparse-индекса, а не из объектов версий API"""
+    history = {f"1.0.{patch}": [('log', '^0.4')] for patch in range(200)}
+    registry = {'app': {'1.0.0': [('serde', '^1')]}, 'serde': history,
+                'log': {f"0.4.{patch}": [] for patch in range(200)}}
+    with RegistryServer(registry) as server:
+        for name, versions in registry.items():
+            for version in versions:
+                server.state.features[(name, version)] = {'default': ['std'], 'std': [], 'derive': []}
+        parser = DependencyParser(make_config(server.url))
+        try:
+            parser.resolve_dependencies('app')
+            downloaded = parser.fetcher.bytes_downloaded
+        finally:
+            parser.close()
+        full_documents = sum(len(json.dumps(server.state.crate_document(name, include_versions=True)))
+                             for name in registry)
+
+    assert not any('include=versions' in path for path in server.state.requests)
+    assert [path for path in server.state.requests if '?include=' in path] == [CRATE_URL.format('app')]
+    assert sorted(path for path in server.state.requests if path.startswith('/index/')) == \
+        sorted(index_url(name) for name in registry)
+    # Одни только полные объекты версий весили бы вдвое больше всего, что загружено
+    assert downloaded * 2 < full_documents
+
+
+def test_unsatisfiable_requirement_keeps_dependency_name():
+    registry = {'app': {'1.0.0': [('log', '^9')]}, 'log': {'0.4.0': []}}
+    with RegistryServer(registry) as server:
+        parser = DependencyParser(make_config(server.url))
+        try:
+            assert parser.get_dependencies('app@1.0.0') == ['log']
+        finally:
+            parser.close()
+
+
+def test_fetch_metrics_count_requests_and_cache_hits(tmp_path, capsys):
+    """Метрики считают запросы, байты и попадания в кеш; тихий режим молчит о пакетах"""
+    from metrics import METRICS
+
+    with RegistryServer(REGISTRY) as server:
+        config = make_config(server.url)
+        config.cache_path = str(tmp_path / 'crates.sqlite3')
+        config.quiet = True
+
+        METRICS.reset()
+        for _ in range(2):
+            parser = DependencyParser(config)
+            try:
+                parser.resolve_dependencies('root')
+            finally:
+                parser.close()
+
+    counters = METRICS.snapshot()['counters']
+    assert counters['registry.requests'] == len(server.state.requests) == 2 * len(REGISTRY) + 1
+    assert counters['registry.bytes'] > 0
+    assert counters['cache.misses'] == 2 * len(REGISTRY) + 1
+    assert counters['cache.hits'] == 2 * len(REGISTRY) + 1
+    assert counters['parser.nodes_expanded'] == 2 * len(REGISTRY)
+    assert METRICS.snapshot()['spans']['registry.request']['count'] == counters['registry.requests']
+    assert "Получение зависимостей" not in capsys.readouterr().out
+
+
+def test_malformed_response_is_silent_in_quiet_mode(capsys):
+    with RegistryServer(REGISTRY) as server:
+        server.state.malformed.update({'a', 'b'})
+        config = make_config(server.url)
+        parser = DependencyParser(config)
+        try:
+            assert parser.fetcher.fetch_requirements('a', '1.0.0') == []
+            assert "❌ Некорректный ответ для a" in capsys.readouterr().out
+
+            config.quiet = True
+            assert parser.fetcher.fetch_requirements('b', '1.0.0') == []
+        finally:
+            parser.close()
+
+    assert "Некорректный ответ" not in capsys.readouterr().out
@@ -0,0 +1,169 @@
+import os
+import sys
+
+import pytest
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from dependency_parser import DependencyParser
+from edge_filter import EdgeFilter, Requirement, eval_cfg, resolve_features, target_cfg
+from registry_server import RegistryServer
+
+
+def test_cfg_expressions_for_target_triples():
+    linux = target_cfg('x86_64-unknown-linux-gnu')
+    windows = target_cfg('x86_64-pc-windows-msvc')
+    wasm = target_cfg('wasm32-unknown-unknown')
+
+    assert eval_cfg('unix', linux) and not eval_cfg('unix', windows)
+    assert eval_cfg('all(windows, target_env = "msvc")', windows)
+    assert eval_cfg('all(unix, not(target_os = "macos"))', linux)
+    assert eval_cfg('any(target_arch = "wasm32", target_os = "wasi")', wasm)
+    assert eval_cfg('target_pointer_width = "32"', wasm)
+    assert not eval_cfg('any()', linux)
+    with pytest.raises(ValueError):
+        eval_cfg('all(unix', linux)
+
+
+def test_feature_table_resolution():
+    """dep:, имя/фича, имя?/фича и неявные фичи необязательных зависимостей"""
+    requirements = [
+        Requirement('serde', optional=True), Requirement('tokio', optional=True),
+        Requirement('log'), Requirement('rayon', optional=True), Requirement('bytes', optional=True),
+    ]
+    table = {
+        'default': ['std'],
+        'std': ['log/std', 'serde?/std', 'tokio?/rt'],
+        'async': ['dep:tokio'],
+        'parallel': ['rayon/threads'],
+    }
+
+    enabled, features = resolve_features(table, {'default', 'async'}, requirements)
+    assert enabled == {'tokio'}
+    assert features == {'log': {'std'}, 'tokio': {'rt'}}
+
+    enabled, features = resolve_features(table, {'parallel', 'bytes'}, requirements)
+    assert enabled == {'rayon', 'bytes'}
+    assert features == {'rayon': {'threads'}}
+
+
+def test_edge_filter_applies_kinds_target_and_features():
+    config = Config()
+    config.dependency_kinds = ['normal', 'dev']
+    config.features = ['async']
+    config.target = 'x86_64-unknown-linux-gnu'
+    edge_filter = EdgeFilter(config)
+    requirements = [
+        Requirement('log'),
+        Requirement('cc', kind='build'),
+        Requirement('criterion', kind='dev'),
+        Requirement('winapi', target='cfg(windows)'),
+        Requirement('libc', target='cfg(unix)'),
+        Requirement('exact', target='x86_64-unknown-linux-gnu'),
+        Requirement('tokio', optional=True, default_features=False),
+    ]
+
+    assert edge_filter.root_features() == {'default', 'async'}
+    assert [r.name for r in edge_filter.filter(requirements)] == [
+        'log', 'criterion', 'libc', 'exact', 'tokio']
+
+    table = {'async': ['dep:tokio', 'tokio/rt']}
+    selected = dict((r.name, features) for r, features in
+                    edge_filter.select(edge_filter.filter(requirements), table, {'async'}))
+    # dev-зависимости не относятся к зависимостям зависимостей
+    assert 'criterion' not in selected
+    assert selected['tokio'] == {'rt'}
+    assert selected['log'] == {'default'}
+
+    root = [r.name for r, _ in edge_filter.select(edge_filter.filter(requirements), table, set(), root=True)]
+    assert root == ['log', 'criterion', 'libc', 'exact']
+
+
+APP = {
+    'app': {'1.0.0': [
+        {'crate_id': 'serde', 'req': '^1', 'features': ['derive']},
+        {'crate_id': 'winapi', 'req': '^0.3', 'target': 'cfg(windows)'},
+        {'crate_id': 'criterion', 'req': '^0.5', 'kind': 'dev'},
+        {'crate_id': 'cc', 'req': '^1', 'kind': 'build'},
+        {'crate_id': 'tokio', 'req': '^1', 'optional': True},
+        ('log', '^0.4'),
+    ]},
+    'serde': {'1.0.0': [{'crate_id': 'serde_derive', 'req': '^1', 'optional': True}]},
+    'log': {'0.4.0': [{'crate_id': 'value-bag', 'req': '^1', 'optional': True}],
+            '0.4.1': [{'crate_id': 'criterion', 'req': '^0.5', 'kind': 'dev'}]},
+    'winapi': {'0.3.9': []},
+    'criterion': {'0.5.0': []},
+    'cc': {'1.0.0': []},
+    'tokio': {'1.0.0': []},
+    'serde_derive': {'1.0.0': []},
+    'value-bag': {'1.0.0': []},
+}
+FEATURES = {
+    ('app', '1.0.0'): {'default': ['std'], 'std': ['log/std'], 'async': ['dep:tokio']},
+    ('serde', '1.0.0'): {'default': ['std'], 'std': [], 'derive': ['serde_derive']},
+    ('log', '0.4.1'): {'std': [], 'kv': ['dep:value-bag']},
+}
+
+
+def resolve_app(**settings):
+    with RegistryServer(APP) as server:
+        server.state.features.update(FEATURES)
+        config = Config()
+        config.registry_url = server.url
+        config.retry_backoff = 0.01
+        config.max_depth = 10
+        for key, value in settings.items():
+            setattr(config, key, value)
+        parser = DependencyParser(config)
+        try:
+            root = parser.resolve_dependencies('app')
+        finally:
+            parser.close()
+    requested = server.state.fetched_crates()
+    return parser.dependency_cache[root], parser.dependency_cache, requested
+
+
+def test_default_build_configuration_prunes_edges_before_download():
+    """Платформенные, dev, build и выключенные необязательные зависимости не загружаются"""
+    direct, graph, requested = resolve_app(target='x86_64-unknown-linux-gnu')
+
+    assert direct == ['serde@1.0.0', 'log@0.4.1']
+    assert graph['serde@1.0.0'] == ['serde_derive@1.0.0']
+    assert graph['log@0.4.1'] == []
+    assert requested == {'app', 'serde', 'log', 'serde_derive'}
+
+
+def test_configured_kinds_features_and_target_add_edges():
+    direct, graph, requested = resolve_app(target='x86_64-pc-windows-msvc', features=['async'],
+                                           dependency_kinds=['normal', 'build', 'dev'])
+
+    assert direct == ['serde@1.0.0', 'winapi@0.3.9', 'criterion@0.5.0', 'cc@1.0.0', 'tokio@1.0.0', 'log@0.4.1']
+    # dev-зависимости зависимостей не нужны для сборки корня
+    assert graph['log@0.4.1'] == []
+
+    direct, _, _ = resolve_app(all_features=True)
+    assert 'tokio@1.0.0' in direct and 'winapi@0.3.9' in direct
+
+
+def test_features_requested_later_reexpand_shared_dependency():
+    """Фичи объединяются: узел, раскрытый раньше, пересчитывается после нового запроса"""
+    registry = {
+        'a': {'1.0.0': [('b', '^1'), ('c', '^1')]},
+        'b': {'1.0.0': [{'crate_id': 'x', 'req': '^1', 'optional': True}]},
+        'c': {'1.0.0': [{'crate_id': 'b', 'req': '^1', 'features': ['extra']}]},
+        'x': {'1.0.0': []},
+    }
+    with RegistryServer(registry) as server:
+        server.state.features[('b', '1.0.0')] = {'extra': ['dep:x']}
+        config = Config()
+        config.registry_url = server.url
+        parser = DependencyParser(config)
+        try:
+            graph = parser.collect_graph([parser.resolve_root('a')])
+        finally:
+            parser.close()
+
+    assert graph['b@1.0.0'] == ['x@1.0.0']
+    assert parser.requested_features['b@1.0.0'] == {'default', 'extra'}
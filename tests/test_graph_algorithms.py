@@ -0,0 +1,67 @@
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from graph_algorithms import Condensation, cycle_path, find_cycle_groups, strongly_connected_components
+from synthetic_graphs import generate
+
+
+def test_scc_finds_every_cycle_group():
+    """Все группы циклов находятся за один проход, а не только первая от корня"""
+    graph = {
+        'A': ['B', 'C'],
+        'B': ['D'],
+        'C': ['E', 'F'],
+        'D': [],
+        'E': ['C'],
+        'F': ['G', 'F'],
+        'G': ['H'],
+        'H': ['G'],
+    }
+
+    assert find_cycle_groups(graph) == [['C', 'E'], ['F'], ['G', 'H']]
+
+
+def test_scc_order_is_reverse_topological():
+    """Компонента идет раньше компонент, которые от нее зависят"""
+    graph = {'app': ['lib'], 'lib': ['core', 'util'], 'util': ['lib'], 'core': []}
+    components = strongly_connected_components(graph)
+    position = {member: i for i, component in enumerate(components) for member in component}
+
+    assert sorted(map(sorted, components)) == [['app'], ['core'], ['lib', 'util']]
+    assert position['core'] < position['lib'] < position['app']
+
+
+def test_deep_chain_does_not_hit_recursion_limit():
+    """Глубина графа не ограничена стеком вызовов Python"""
+    size = sys.getrecursionlimit() * 5
+    graph = {str(i): [str(i + 1)] for i in range(size)}
+    graph[str(size)] = ['0']
+
+    groups = find_cycle_groups(graph)
+
+    assert len(groups) == 1
+    assert len(groups[0]) == size + 1
+
+
+def test_cycle_path_closes_on_start():
+    """Пример цикла начинается и заканчивается одним пакетом"""
+    graph = {'A': ['B'], 'B': ['C', 'D'], 'C': ['A'], 'D': ['B']}
+    group = find_cycle_groups(graph)[0]
+
+    assert group == ['A', 'B', 'C', 'D']
+    assert cycle_path(graph, group) == ['A', 'B', 'C', 'A']
+
+
+def test_reverse_closure_sizes_match_closures():
+    """Побитовые счетчики дают те же размеры, что и построенные множества, в том числе по нескольким пачкам"""
+    adjacency = dict(enumerate(generate('many_cycles', 600, seed=3)))
+    condensation = Condensation(adjacency)
+    targets = list(range(0, 600, 3))
+
+    sizes = condensation.reverse_closure_sizes(targets, chunk_size=64)
+
+    assert sizes == [len(closure) for closure in condensation.reverse_closures(targets)]
+    assert any(size > 1 for size in sizes)
@@ -0,0 +1,101 @@
+import os
+import random
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from conftest import graph_from_adjacency, mermaid_with_names
+from graph_diff import diff_graphs, diff_snapshots
+from synthetic_graphs import generate, node_name
+
+OLD = {
+    'A': ['B', 'C'],
+    'B': ['D'],
+    'C': ['E', 'F'],
+    'D': [],
+    'E': ['C'],
+    'F': ['G'],
+    'G': [],
+    'X': ['G'],
+}
+NEW = {
+    'A': ['B', 'C', 'N'],
+    'B': ['D'],
+    'C': ['F'],
+    'D': ['B'],
+    'E': ['C'],
+    'F': ['G'],
+    'G': [],
+    'N': ['G'],
+}
+
+
+def test_diff_finds_nodes_edges_and_cycles():
+    diff = diff_graphs(graph_from_adjacency(OLD), graph_from_adjacency(NEW))
+
+    assert diff.added_nodes == ['N']
+    assert diff.removed_nodes == ['X']
+    assert diff.added_edges == [('A', 'N'), ('D', 'B'), ('N', 'G')]
+    assert diff.removed_edges == [('C', 'E'), ('X', 'G')]
+    assert diff.new_cycle_groups == [['B', 'D']]
+    assert diff.resolved_cycle_groups == [['C', 'E']]
+    # У G было пять зависящих пакетов (с X) и осталось пять (с N), поэтому G нет в списке
+    assert diff.reverse_count_changes == [('E', 3, 0), ('B', 1, 3), ('C', 3, 2), ('D', 2, 3)]
+
+
+def test_reverse_count_changes_match_full_recount():
+    """Пересчет только достижимых из измененных ребер пакетов совпадает с полным пересчетом"""
+    adjacency = generate('many_cycles', 400, seed=7)
+    old_adjacency = {node_name(node): [node_name(dep) for dep in deps] for node, deps in enumerate(adjacency)}
+    new_adjacency = {package: list(deps) for package, deps in old_adjacency.items()}
+    rng = random.Random(1)
+    packages = sorted(old_adjacency)
+    for _ in range(15):
+        package = rng.choice(packages)
+        if new_adjacency[package] and rng.random() < 0.5:
+            new_adjacency[package].pop(rng.randrange(len(new_adjacency[package])))
+        else:
+            new_adjacency[package].append(rng.choice(packages))
+    old, new = graph_from_adjacency(old_adjacency), graph_from_adjacency(new_adjacency)
+
+    diff = diff_graphs(old, new)
+
+    expected = []
+    for package in packages:
+        before = len(old.find_transitive_reverse_dependencies(package))
+        after = len(new.find_transitive_reverse_dependencies(package))
+        if before != after:
+            expected.append((package, before, after))
+    assert sorted(diff.reverse_count_changes) == expected
+    assert diff.reverse_count_changes
+    changed = {(source, target) for source, deps in new_adjacency.items() for target in deps}
+    original = {(source, target) for source, deps in old_adjacency.items() for target in deps}
+    assert set(diff.added_edges) == changed - original
+    assert set(diff.removed_edges) == original - changed
+
+
+def test_identical_snapshots_have_no_changes(tmp_path, capsys):
+    path = str(tmp_path / "graph.snap")
+    graph_from_adjacency(OLD).save_snapshot(path)
+
+    diff = diff_snapshots(path, path)
+    diff.display()
+
+    assert diff.is_empty
+    assert not (diff.new_cycle_groups or diff.resolved_cycle_groups or diff.reverse_count_changes)
+    assert "Графы совпадают" in capsys.readouterr().out
+
+
+def test_mermaid_renders_only_changed_region():
+    diff = diff_graphs(graph_from_adjacency(OLD), graph_from_adjacency(NEW))
+    lines = mermaid_with_names(diff.mermaid()).splitlines()
+
+    assert lines[0] == "graph TD"
+    assert "    A ==> N" in lines
+    assert "    X -.-> G" in lines
+    assert "    style N fill:#cfc,stroke:#080" in lines
+    assert any(line.startswith("    style X fill:#fcc") for line in lines)
+    # Пакеты и ребра вне изменений в диаграмму не попадают
+    assert not any(" F" in line or line.startswith("    F") for line in lines)
+    assert set(diff.changed_region().graph) == set(diff.changed_packages())
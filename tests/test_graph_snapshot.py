@@ -0,0 +1,207 @@
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from config import Config
+from dependency_graph import DependencyGraph
+from graph_snapshot import _HEADER, _SECTION, read_snapshot
+from synthetic_graphs import generate, node_name, write_edge_list
+from visualizer import GraphVisualizer
+
+SAMPLE = """A
+B
+C
+
+B
+D
+
+C
+E
+F
+
+E
+C
+
+F
+G
+"""
+
+
+def make_config(repo_path, snapshot_path=''):
+    config = Config()
+    config.package_name = 'A'
+    config.test_mode = True
+    config.test_repo_path = str(repo_path)
+    config.snapshot_path = str(snapshot_path)
+    return config
+
+
+def test_snapshot_roundtrip_preserves_queries(tmp_path):
+    """Загруженный снимок отвечает на запросы так же, как исходный граф"""
+    repo = tmp_path / "repo.txt"
+    repo.write_text(SAMPLE, encoding='utf-8')
+    original = DependencyGraph(make_config(repo))
+    original.build_graph()
+    path = str(tmp_path / "graph.snap")
+    original.save_snapshot(path)
+
+    loaded = DependencyGraph(make_config(repo))
+    meta = loaded.load_snapshot(path)
+
+    assert meta['package_name'] == 'A'
+    assert dict(loaded.graph) == dict(original.graph)
+    assert dict(loaded.reverse_graph) == dict(original.reverse_graph)
+    assert loaded.cycle_groups == original.cycle_groups == [['C', 'E']]
+    assert loaded.cycles == original.cycles
+    assert loaded.find_transitive_reverse_dependencies('G') == {'A', 'C', 'E', 'F'}
+    assert GraphVisualizer(loaded).generate_mermaid_graph() == GraphVisualizer(original).generate_mermaid_graph()
+
+    # Массивы ребер не копируются, а читаются из отображенного файла
+    assert isinstance(loaded.store.forward_targets, memoryview)
+    # Изменения ложатся поверх снимка и не трогают файл
+    loaded.add_dependency('G', 'A')
+    assert loaded.graph['G'] == ['A']
+    reopened = read_snapshot(path).store
+    assert list(reopened.successors(reopened.id_of('G'))) == []
+
+
+def test_large_snapshot_matches_source(tmp_path):
+    adjacency = generate('power_law', 5000, seed=3)
+    repo = tmp_path / "repo.edges"
+    write_edge_list(adjacency, str(repo))
+    config = make_config(repo)
+    config.package_name = node_name(0)
+    config.test_repo_format = 'edges'
+    config.quiet = True
+    graph = DependencyGraph(config)
+    graph.build_graph()
+    path = str(tmp_path / "graph.snap")
+    graph.save_snapshot(path)
+
+    snapshot = read_snapshot(path)
+    assert snapshot.store.node_count == 5000
+    assert snapshot.store.edge_count == sum(len(deps) for deps in adjacency)
+    node = snapshot.store.id_of(node_name(10))
+    assert [snapshot.store.names[i] for i in snapshot.store.successors(node)] == [node_name(dep) for dep in adjacency[10]]
+
+
+def test_build_graph_reuses_fresh_snapshot(tmp_path, capsys):
+    """snapshot_path: следующий запуск загружает снимок, пока данные не изменились"""
+    repo = tmp_path / "repo.txt"
+    repo.write_text(SAMPLE, encoding='utf-8')
+    snapshot = tmp_path / "graph.snap"
+
+    DependencyGraph(make_config(repo, snapshot)).build_graph()
+    assert snapshot.exists()
+
+    capsys.readouterr()
+    graph = DependencyGraph(make_config(repo, snapshot))
+    graph.build_graph()
+    assert "загружен из снимка" in capsys.readouterr().out
+    assert graph.cycle_groups == [['C', 'E']]
+
+    # Тестовый репозиторий изменился - граф строится заново
+    repo.write_text(SAMPLE + "\nG\nH\n", encoding='utf-8')
+    graph = DependencyGraph(make_config(repo, snapshot))
+    graph.build_graph()
+    assert "загружен из снимка" not in capsys.readouterr().out
+    assert graph.graph['G'] == ['H']
+
+
+def test_stale_snapshot_mapping_is_released(tmp_path, monkeypatch):
+    """Снимок другого пакета не подходит, и его отображение сразу закрывается"""
+    import dependency_graph
+
+    repo = tmp_path / "repo.txt"
+    repo.write_text(SAMPLE, encoding='utf-8')
+    snapshot = tmp_path / "graph.snap"
+    DependencyGraph(make_config(repo, snapshot)).build_graph()
+
+    opened = []
+    monkeypatch.setattr(dependency_graph, 'read_snapshot',
+                        lambda path: opened.append(read_snapshot(path)) or opened[-1])
+    config = make_config(repo, snapshot)
+    config.package_name = 'C'
+    graph = DependencyGraph(config)
+    graph.build_graph()
+
+    assert len(opened) == 1 and opened[0].mapping.closed
+    with pytest.raises(ValueError):
+        len(opened[0].store.forward_targets)
+    assert graph.graph['C'] == ['E', 'F']
+
+
+def test_read_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "graph.snap"
+    path.write_bytes(b"graph TD\n    A --> B\n")
+    with pytest.raises(ValueError):
+        read_snapshot(str(path))
+
+
+def assert_rejected(path):
+    """Поврежденный снимок дает ValueError, а файл не остается отображенным в память"""
+    with pytest.raises(ValueError, match="поврежден"):
+        read_snapshot(str(path))
+    if os.path.exists('/proc/self/maps'):
+        with open('/proc/self/maps', encoding='utf-8') as maps:
+            assert str(path) not in maps.read()
+
+
+def test_truncated_snapshot_is_rejected(tmp_path, capsys):
+    repo = tmp_path / "repo.txt"
+    repo.write_text(SAMPLE, encoding='utf-8')
+    snapshot = tmp_path / "graph.snap"
+    DependencyGraph(make_config(repo, snapshot)).build_graph()
+    data = snapshot.read_bytes()
+
+    for size in range(_HEADER.size, len(data), 7):
+        snapshot.write_bytes(data[:size])
+        assert_rejected(snapshot)
+
+    # Сборка графа не падает на поврежденном снимке, а строит граф заново
+    capsys.readouterr()
+    graph = DependencyGraph(make_config(repo, snapshot))
+    graph.build_graph()
+    output = capsys.readouterr().out
+    assert "поврежден" in output and "загружен из снимка" not in output
+    assert graph.cycle_groups == [['C', 'E']]
+
+
+def test_corrupted_bytes_are_rejected(tmp_path):
+    repo = tmp_path / "repo.txt"
+    repo.write_text(SAMPLE, encoding='utf-8')
+    snapshot = tmp_path / "graph.snap"
+    DependencyGraph(make_config(repo, snapshot)).build_graph()
+    data = snapshot.read_bytes()
+    count = _HEADER.unpack_from(data)[2]
+    table = {}
+    for i in range(count):
+        position = _HEADER.size + i * _SECTION.size
+        tag, offset, length = _SECTION.unpack_from(data, position)
+        table[tag] = (position, offset, length)
+
+    def corrupt(position, value):
+        damaged = bytearray(data)
+        damaged[position] = value
+        snapshot.write_bytes(bytes(damaged))
+        assert_rejected(snapshot)
+
+    # Тег, старший байт смещения и длины секции в оглавлении
+    position, offset, length = table[b'FTGT']
+    corrupt(position, ord('X'))
+    corrupt(position + 11, 0x40)
+    corrupt(position + 19, 0x40)
+    # Число секций в заголовке
+    corrupt(12, 0xff)
+    # Некорректный UTF-8 в имени и сломанный JSON сведений
+    corrupt(table[b'NAME'][1], 0xff)
+    corrupt(table[b'META'][1], ord('['))
+    # Номер участника группы циклов за пределами графа
+    corrupt(table[b'GMEM'][1] + 3, 0x7f)
+    # Последнее прямое смещение не совпадает с числом ребер
+    position, offset, length = table[b'FOFF']
+    corrupt(offset + length - 8, 0x7f)
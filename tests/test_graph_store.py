@@ -0,0 +1,41 @@
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from graph_store import AdjacencyView, CompactGraph
+
+
+def test_rows_in_any_order_build_consistent_csr():
+    """Строки в произвольном порядке дают корректные прямые и обратные ребра"""
+    store = CompactGraph.from_adjacency([
+        ('app', ['log', 'serde']),
+        ('serde', ['serde_derive']),
+        ('log', []),
+        ('serde_derive', ['proc-macro2', 'serde']),
+    ])
+
+    assert store.node_count == 5
+    assert store.edge_count == 5
+    assert [store.names[i] for i in store.successors(store.id_of('serde_derive'))] == ['proc-macro2', 'serde']
+    assert sorted(store.names[i] for i in store.predecessors(store.id_of('serde'))) == ['app', 'serde_derive']
+
+
+def test_views_behave_like_old_dicts():
+    """Представления повторяют прежние словари graph и reverse_graph"""
+    store = CompactGraph.from_adjacency([('A', ['B', 'C']), ('B', ['C']), ('C', [])])
+    graph = AdjacencyView(store)
+    reverse = AdjacencyView(store, reverse=True)
+
+    assert dict(graph) == {'A': ['B', 'C'], 'B': ['C'], 'C': []}
+    assert dict(reverse) == {'A': [], 'B': ['A'], 'C': ['A', 'B']}
+
+
+def test_dependency_only_nodes_are_not_graph_keys():
+    """Пакеты без известного списка зависимостей есть только в обратном графе"""
+    store = CompactGraph.from_adjacency([('A', ['B'])])
+
+    assert 'B' not in AdjacencyView(store)
+    assert AdjacencyView(store, reverse=True)['B'] == ['A']
+    assert len(AdjacencyView(store)) == 1
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from persistent_cache import PersistentCache
+
+
+def test_entries_survive_reopen(tmp_path):
+    """Записи сохраняются между запусками"""
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = PersistentCache(path)
+    cache.put('serde', '1.0.0', {'dependencies': ['serde_derive']}, etag='"abc"')
+    cache.close()
+
+    cache = PersistentCache(path)
+    entry = cache.get('serde', '1.0.0')
+    cache.close()
+
+    assert entry.data == {'dependencies': ['serde_derive']}
+    assert entry.etag == '"abc"'
+    assert len(cache) == 1
+
+
+def test_ttl_applies_only_to_crate_level_entries(tmp_path):
+    """Срок годности ограничивает только записи без версии"""
+    cache = PersistentCache(str(tmp_path / 'cache.sqlite3'), ttl=0)
+    cache.put('serde', '', {'version': '1.0.0'})
+    cache.put('serde', '1.0.0', {'dependencies': []})
+
+    assert not cache.is_fresh(cache.get('serde'))
+    assert cache.is_fresh(cache.get('serde', '1.0.0'), '1.0.0')
+    cache.close()
+
+
+def test_lru_eviction(tmp_path):
+    """При переполнении вытесняются давно не использованные записи"""
+    cache = PersistentCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    cache.put('a', '1', {})
+    cache.put('b', '1', {})
+    cache.get('a', '1')
+    cache.put('c', '1', {})
+
+    assert cache.get('b', '1') is None
+    assert cache.get('a', '1') is not None
+    assert cache.get('c', '1') is not None
+    assert len(cache) == 2
+    cache.close()
+
+
+def test_reads_do_not_write_until_flush(tmp_path):
+    """Попадание в кеш не пишет в базу; время обращения сохраняется при закрытии"""
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = PersistentCache(path)
+    cache.put('serde', '1.0.0', {})
+    changes = cache._connection.total_changes
+    for _ in range(100):
+        cache.get('serde', '1.0.0')
+    assert cache._connection.total_changes == changes
+
+    accessed = cache._accessed[('serde', '1.0.0')]
+    cache.close()
+    connection = sqlite3.connect(path)
+    stored = connection.execute("SELECT accessed_at FROM entries").fetchone()[0]
+    connection.close()
+    assert stored == accessed
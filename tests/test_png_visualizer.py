@@ -0,0 +1,149 @@
+import math
+import os
+import random
+import struct
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+from fractions import Fraction
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from conftest import graph_from_adjacency
+from png_visualizer import COLORS, Canvas, LayeredLayout, PNGVisualizer
+from synthetic_graphs import generate, node_name
+
+SAMPLE = {
+    'A': ['B', 'C', 'H'],
+    'B': ['D'],
+    'C': ['E', 'F'],
+    'D': [],
+    'E': ['C'],
+    'F': ['G'],
+    'G': [],
+    'H': ['G'],
+}
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+def decode_png(data):
+    """Размеры, палитра и пиксели PNG с палитрой без фильтрации строк"""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks = {}
+    offset = 8
+    while offset < len(data):
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        assert struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])[0] == zlib.crc32(kind + body)
+        chunks[kind] = body
+        offset += 12 + length
+    width, height, depth, color_type = struct.unpack(">IIBB", chunks[b'IHDR'][:10])
+    assert (depth, color_type) == (8, 3)
+    palette = [tuple(chunks[b'PLTE'][i:i + 3]) for i in range(0, len(chunks[b'PLTE']), 3)]
+    raw = zlib.decompress(chunks[b'IDAT'])
+    rows = [raw[y * (width + 1) + 1:(y + 1) * (width + 1)] for y in range(height)]
+    return width, height, palette, rows
+
+
+def test_layers_follow_edges_outside_cycles():
+    graph = graph_from_adjacency(SAMPLE)
+    layout = LayeredLayout(graph, max_row_width=2)
+    store = graph.store
+    layer = {store.names[node]: layout.layer_of[node] for node in range(store.node_count)}
+
+    for package, dependencies in SAMPLE.items():
+        for dep in dependencies:
+            if not graph.in_same_cycle_group(package, dep):
+                assert layer[package] < layer[dep]
+    # Узлы цикла C <-> E расходятся по соседним слоям
+    assert abs(layer['C'] - layer['E']) == 1
+    assert max(len(row) for row in layout.rows) == 2
+    assert all(layout.y[store.index[dep]] > layout.y[store.index[package]]
+               for package, deps in SAMPLE.items() for dep in deps if not graph.in_same_cycle_group(package, dep))
+
+
+def test_barycenter_sweeps_reduce_crossings():
+    adjacency = generate('random_dag', 400, seed=2)
+    graph = graph_from_adjacency({node_name(node): [node_name(dep) for dep in deps] for node, deps in enumerate(adjacency)})
+
+    before = LayeredLayout(graph, sweeps=0).crossings()
+    after = LayeredLayout(graph, sweeps=4).crossings()
+    assert after < before
+
+
+def test_svg_highlights_cycles_and_reverse_paths(tmp_path):
+    path = str(tmp_path / "graph.svg")
+    PNGVisualizer(graph_from_adjacency(SAMPLE)).render(path, highlight='G')
+
+    root = ET.parse(path).getroot()
+    kinds = {group.find(f'{SVG}title').text: group.get('class') for group in root.iter(f'{SVG}g')}
+    assert kinds['G'] == 'target'
+    assert {name for name, kind in kinds.items() if kind == 'dependent'} == {'A', 'C', 'E', 'F', 'H'}
+    assert kinds['B'] is None and kinds['D'] is None
+
+    edges = [edge.get('class') for edge in root.iter(f'{SVG}path')]
+    assert len(edges) == sum(len(deps) for deps in SAMPLE.values())
+    # Все ребра между пакетами, зависящими от G, и в G, кроме A -> B и B -> D
+    assert edges.count('path') == 7
+
+
+def test_png_colours_nodes_by_highlight(tmp_path):
+    graph = graph_from_adjacency(SAMPLE)
+    visualizer = PNGVisualizer(graph)
+    path = str(tmp_path / "graph.png")
+    visualizer.render(path, highlight='D')
+
+    with open(path, 'rb') as f:
+        width, height, palette, rows = decode_png(f.read())
+    layout = visualizer.layout
+    assert (width, height) == (int(layout.width), int(layout.height))
+
+    def colour_at(package):
+        node = graph.store.index[package]
+        # Левый край узла, внутри рамки и в стороне от подписи
+        return palette[rows[int(layout.y[node])][int(layout.x[node] - 50)]]
+
+    assert colour_at('D') == COLORS['target'][0]
+    assert colour_at('B') == COLORS['dependent'][0]
+    assert colour_at('E') == COLORS['cycle'][0]
+    assert colour_at('G') == COLORS['node'][0]
+
+
+def test_png_is_scaled_to_max_size(tmp_path):
+    adjacency = generate('random_dag', 500, seed=1)
+    graph = graph_from_adjacency({node_name(node): [node_name(dep) for dep in deps] for node, deps in enumerate(adjacency)})
+    path = str(tmp_path / "graph.png")
+    PNGVisualizer(graph).render(path, max_size=300)
+
+    with open(path, 'rb') as f:
+        width, height, _, _ = decode_png(f.read())
+    assert max(width, height) == 300
+
+
+def rounded_line(x0, y0, x1, y1):
+    """Наивный растр: по пикселю на шаг главной оси, побочная координата округляется вверх от половины"""
+    steps = max(abs(x1 - x0), abs(y1 - y0))
+    if not steps:
+        return {(x0, y0)}
+    half = Fraction(1, 2)
+    return {(math.floor(x0 + Fraction((x1 - x0) * k, steps) + half),
+             math.floor(y0 + Fraction((y1 - y0) * k, steps) + half)) for k in range(steps + 1)}
+
+
+def test_canvas_lines_match_reference():
+    """Отрезки, собранные из прогрессий индексов, совпадают с наивным растром попиксельно"""
+    rng = random.Random(5)
+    for case in range(1000):
+        width, height = rng.randint(2, 120), rng.randint(2, 120)
+        canvas = Canvas(width, height)
+        colour = canvas.color((1, 2, 3))
+        x0, x1 = rng.randint(0, width - 1), rng.randint(0, width - 1)
+        y0, y1 = rng.randint(0, height - 1), rng.randint(0, height - 1)
+        if case % 4 == 0:
+            # Пологие и крутые отрезки с наклоном, близким к простой дроби, дольше копят ошибку
+            y1 = min(max(y0 + (x1 - x0) // rng.randint(1, 5), 0), height - 1)
+        canvas.line(x0, y0, x1, y1, colour)
+
+        drawn = {(i % width, i // width) for i, value in enumerate(canvas.pixels) if value == colour}
+        assert drawn == rounded_line(x0, y0, x1, y1)
@@ -0,0 +1,117 @@
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from conftest import graph_from_adjacency, mermaid_with_names
+from metrics import METRICS
+from query_server import QueryServer, QueryService
+from synthetic_graphs import generate, node_name
+
+SAMPLE = {
+    'A': ['B', 'C'],
+    'B': ['D'],
+    'C': ['E', 'F'],
+    'D': [],
+    'E': ['C'],
+    'F': ['G'],
+    'G': [],
+}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__('localhost')
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+def get(connection, path):
+    connection.request('GET', path)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_http_queries_answer_from_hot_graph():
+    with QueryServer(graph_from_adjacency(SAMPLE), '127.0.0.1:0') as server:
+        connection = http.client.HTTPConnection(server.url[len('http://'):])
+        try:
+            assert get(connection, '/health')[1]['nodes'] == 7
+            assert get(connection, '/reverse?package=C')[1]['dependents'] == ['A', 'E']
+            status, body = get(connection, '/reverse/transitive?package=G')
+            assert status == 200 and body['dependents'] == ['A', 'C', 'E', 'F']
+            assert get(connection, '/reverse/transitive?package=G&limit=2')[1]['dependents'] == ['A', 'C']
+
+            assert get(connection, '/cycles')[1]['groups'] == [{'packages': ['C', 'E'], 'cycle': ['C', 'E', 'C']}]
+            assert get(connection, '/cycles?package=E')[1]['in_cycle'] is True
+            assert get(connection, '/cycles?package=B')[1] == {'package': 'B', 'in_cycle': False}
+
+            mermaid = mermaid_with_names(get(connection, '/mermaid?package=F&hops=1&direction=forward')[1]['mermaid'])
+            assert "F --> G" in mermaid and "A" not in mermaid
+            assert "style G" in mermaid_with_names(get(connection, '/mermaid/reverse?package=G')[1]['mermaid'])
+
+            assert get(connection, '/reverse?package=missing')[0] == 404
+            assert get(connection, '/reverse')[0] == 400
+            assert get(connection, '/mermaid?package=A&hops=x')[0] == 400
+            assert get(connection, '/unknown')[0] == 404
+
+            stats = get(connection, '/stats')[1]
+            assert stats['/reverse']['count'] == 3 and stats['/reverse']['errors'] == 2
+            assert stats['/reverse/transitive']['p99_ms'] >= stats['/reverse/transitive']['p50_ms']
+        finally:
+            connection.close()
+
+
+def test_unix_socket_transport():
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'query.sock')
+        with QueryServer(graph_from_adjacency(SAMPLE), f"unix:{path}") as server:
+            assert server.url == f"unix:{path}"
+            connection = UnixHTTPConnection(path)
+            try:
+                assert get(connection, '/reverse?package=D') == (200, {'package': 'D', 'count': 1,
+                                                                        'dependents': ['B']})
+            finally:
+                connection.close()
+        assert not os.path.exists(path)
+
+
+def test_concurrent_transitive_queries_are_batched():
+    """Одновременные запросы замыканий считаются общими пачками, а ответы совпадают с эталоном"""
+    # Граф достаточно велик, чтобы запросы успевали накопиться, пока считается пачка
+    adjacency = generate('many_cycles', 20000, seed=4)
+    graph = graph_from_adjacency({node_name(node): [node_name(dep) for dep in deps] for node, deps in enumerate(adjacency)})
+    service = QueryService(graph)
+    packages = [node_name(node) for node in range(10000, 20000, 50)]
+    reference = graph_from_adjacency(dict(graph.graph))
+    expected = {package: sorted(reference.find_transitive_reverse_dependencies(package))
+                for package in packages[:5]}
+
+    METRICS.reset()
+    results = {}
+    barrier = threading.Barrier(len(packages))
+
+    def query(package):
+        barrier.wait()
+        results[package] = service.handle('/reverse/transitive', {'package': package})
+
+    threads = [threading.Thread(target=query, args=(package,)) for package in packages]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(status == 200 for status, _ in results.values())
+    for package, dependents in expected.items():
+        assert results[package][1]['dependents'] == dependents
+    assert METRICS.counters['query.reverse_batches'] < len(packages)
+    assert service.latency({})['/reverse/transitive']['count'] == len(packages)
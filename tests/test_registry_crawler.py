@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from config import Config
+from crates_fetcher import TokenBucket
+from registry_crawler import RegistryCrawler
+from registry_server import RegistryServer
+from synthetic_graphs import node_name, power_law
+
+
+def synthetic_registry(size: int, seed: int = 0):
+    """Реестр из size пакетов со степенным распределением популярности"""
+    adjacency = power_law(size, seed=seed)
+    return {node_name(node): [node_name(dep) for dep in deps] for node, deps in enumerate(adjacency)}
+
+
+def expected_rows(registry):
+    return {f"{name}@1.0.0": [f"{dep}@1.0.0" for dep in deps] for name, deps in registry.items()}
+
+
+def make_config(url: str, tmp_path, page_size: int = 50) -> Config:
+    config = Config()
+    config.registry_url = url
+    config.max_workers = 8
+    config.retry_backoff = 0.01
+    config.quiet = True
+    config.crawl_output = str(tmp_path / "registry.edges")
+    config.crawl_page_size = page_size
+    return config
+
+
+def read_snapshot(path):
+    rows = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split()
+            assert fields[0] not in rows
+            rows[fields[0]] = fields[1:]
+    return rows
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    now = [0.0]
+    bucket = TokenBucket(10, burst=2, clock=lambda: now[0])
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.1)]
+    # Ожидание накапливается: следующий токен появится еще через 0.1 с
+    assert bucket.reserve() == pytest.approx(0.2)
+    now[0] = 1.0
+    assert bucket.reserve() == 0.0
+
+
+def test_crawl_writes_every_crate_once(tmp_path):
+    """Каждый пакет реестра попадает в снимок и хранилище со своими ребрами"""
+    registry = synthetic_registry(2000)
+    with RegistryServer(registry) as server:
+        crawler = RegistryCrawler(make_config(server.url, tmp_path, page_size=100))
+        try:
+            checkpoint = crawler.crawl()
+        finally:
+            crawler.close()
+
+    assert checkpoint.finished
+    assert checkpoint.crates == len(registry) and checkpoint.pages == 20
+    assert read_snapshot(crawler.config.crawl_output) == expected_rows(registry)
+
+    store = crawler.store
+    assert store.known_count == len(registry)
+    assert store.edge_count == sum(len(deps) for deps in registry.values())
+    graph = crawler.to_graph()
+    assert sorted(graph.graph['crate0@1.0.0']) == sorted(f"{dep}@1.0.0" for dep in registry['crate0'])
+
+    # Основная версия, файл индекса и зависимости каждого пакета запрошены по одному разу
+    crate_requests = [path for path in server.state.requests if not path.startswith('/api/v1/crates?')]
+    assert len(crate_requests) == len(set(crate_requests)) == 3 * len(registry)
+
+
+def test_crawl_resumes_from_checkpoint(tmp_path):
+    """Прерванный обход продолжается со следующей страницы, недописанный хвост отбрасывается"""
+    registry = synthetic_registry(300, seed=1)
+    with RegistryServer(registry) as server:
+        config = make_config(server.url, tmp_path, page_size=40)
+        crawler = RegistryCrawler(config)
+        try:
+            first = crawler.crawl(max_pages=3)
+        finally:
+            crawler.close()
+        assert not first.finished and first.crates == 120
+
+        # Сбой посреди записи страницы
+        with open(config.crawl_output, 'a', encoding='utf-8') as f:
+            f.write("crate299@1.0.0 crate1@")
+        server.state.requests.clear()
+
+        resumed = RegistryCrawler(config)
+        try:
+            final = resumed.crawl()
+        finally:
+            resumed.close()
+
+    listing = [path for path in server.state.requests if path.startswith('/api/v1/crates?')]
+    assert listing[0] == '/api/v1/crates?page=4&per_page=40'
+    assert final.finished and final.crates == len(registry) and final.pages == 8
+    assert read_snapshot(config.crawl_output) == expected_rows(registry)
+    assert resumed.store.known_count == len(registry)
+
+    # Завершенный обход не повторяется
+    again = RegistryCrawler(config)
+    assert again.crawl() == final
+
+
+def test_crawl_starts_over_when_snapshot_is_missing(tmp_path):
+    """Контрольная точка без файла снимка не мешает начать обход заново"""
+    registry = synthetic_registry(60, seed=3)
+    with RegistryServer(registry) as server:
+        config = make_config(server.url, tmp_path, page_size=20)
+        crawler = RegistryCrawler(config)
+        try:
+            crawler.crawl(max_pages=1)
+        finally:
+            crawler.close()
+        os.remove(config.crawl_output)
+
+        restarted = RegistryCrawler(config)
+        try:
+            final = restarted.crawl()
+        finally:
+            restarted.close()
+
+    assert final.finished and final.crates == len(registry) and final.pages == 3
+    assert read_snapshot(config.crawl_output) == expected_rows(registry)
+
+
+def test_crawl_obeys_rate_limit(tmp_path):
+    registry = synthetic_registry(20, seed=2)
+    with RegistryServer(registry) as server:
+        config = make_config(server.url, tmp_path)
+        config.rate_limit = 100
+        config.rate_burst = 1
+        crawler = RegistryCrawler(config)
+        started = time.perf_counter()
+        try:
+            crawler.crawl()
+        finally:
+            crawler.close()
+        elapsed = time.perf_counter() - started
+
+    requests_made = len(server.state.requests)
+    assert requests_made == 3 * len(registry) + 1
+    assert elapsed >= (requests_made - 1) / config.rate_limit
+
+
+def test_crawler_requires_registry_source(tmp_path):
+    config = Config()
+    config.test_mode = True
+    config.crawl_output = str(tmp_path / "registry.edges")
+    with pytest.raises(ValueError):
+        RegistryCrawler(config)
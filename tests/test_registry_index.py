@@ -0,0 +1,130 @@
+import json
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from dependency_parser import DependencyParser
+from registry_index import LocalRegistryIndex
+
+
+def write_crate(index_dir, name, versions):
+    """Записывает файл пакета в раскладке индекса crates.io"""
+    index = LocalRegistryIndex(str(index_dir))
+    path = index.crate_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for version in versions:
+            f.write(json.dumps(version, separators=(',', ':')) + '\n')
+
+
+def version(name, vers, deps, yanked=False):
+    return {'name': name, 'vers': vers, 'deps': deps, 'cksum': '0' * 64,
+            'features': {}, 'yanked': yanked}
+
+
+def dep(name, kind='normal', package=None, req='*'):
+    record = {'name': name, 'req': req, 'features': [], 'optional': False,
+              'default_features': True, 'target': None, 'kind': kind}
+    if package:
+        record['package'] = package
+    return record
+
+
+def test_crate_path_layout(tmp_path):
+    """Раскладка файлов совпадает с индексом crates.io"""
+    index = LocalRegistryIndex(str(tmp_path))
+
+    assert index.crate_path('a') == os.path.join(str(tmp_path), '1', 'a')
+    assert index.crate_path('cc') == os.path.join(str(tmp_path), '2', 'cc')
+    assert index.crate_path('syn') == os.path.join(str(tmp_path), '3', 's', 'syn')
+    assert index.crate_path('Serde') == os.path.join(str(tmp_path), 'se', 'rd', 'serde')
+
+
+def test_latest_version_skips_yanked_lines(tmp_path):
+    """Берется последняя не отозванная версия"""
+    write_crate(tmp_path, 'serde', [
+        version('serde', '1.0.0', []),
+        version('serde', '1.0.1', [dep('serde_derive')]),
+        version('serde', '1.0.2', [dep('broken')], yanked=True),
+    ])
+    index = LocalRegistryIndex(str(tmp_path))
+
+    assert index.latest_version('serde')['vers'] == '1.0.1'
+    assert index.latest_version('missing') is None
+
+
+def test_parser_resolves_from_local_index(tmp_path):
+    """Источник local_index выбирается настройкой и не использует сеть"""
+    write_crate(tmp_path, 'app', [version('app', '0.1.0', [
+        dep('log'), dep('rand_alias', package='rand'), dep('criterion', kind='dev'),
+    ])])
+    write_crate(tmp_path, 'log', [version('log', '0.4.0', [])])
+    write_crate(tmp_path, 'rand', [version('rand', '0.8.0', [dep('log')])])
+
+    config = Config()
+    config.package_name = 'app'
+    config.dependency_source = 'local_index'
+    config.index_path = str(tmp_path)
+    parser = DependencyParser(config)
+    parser.resolve_dependencies('app')
+
+    assert parser.dependency_cache == {
+        'app@0.1.0': ['log@0.4.0', 'rand@0.8.0'], 'log@0.4.0': [], 'rand@0.8.0': ['log@0.4.0'],
+    }
+    assert parser._fetcher is None
+
+
+def test_index_requirements_pick_matching_versions(tmp_path):
+    """Требования из индекса сопоставляются со всеми не отозванными версиями"""
+    write_crate(tmp_path, 'app', [version('app', '1.0.0', [dep('log', req='^0.3'), dep('rand', req='~0.8')])])
+    write_crate(tmp_path, 'log', [version('log', '0.3.8', []), version('log', '0.3.9', [], yanked=True),
+                                  version('log', '0.4.0', [])])
+    write_crate(tmp_path, 'rand', [version('rand', '0.8.5', []), version('rand', '0.9.0', [])])
+
+    index = LocalRegistryIndex(str(tmp_path))
+    assert index.fetch_versions('log') == ['0.3.8', '0.4.0']
+    assert [(r.name, r.req) for r in index.fetch_requirements('app', '1.0.0')] == [('log', '^0.3'), ('rand', '~0.8')]
+
+    config = Config()
+    config.dependency_source = 'local_index'
+    config.index_path = str(tmp_path)
+    parser = DependencyParser(config)
+    assert parser.get_dependencies('app') == ['log@0.3.8', 'rand@0.8.5']
+
+
+def test_missing_packages_are_silent_in_quiet_mode(tmp_path, capsys):
+    """Сообщения об отсутствующих пакетах подчиняются тихому режиму"""
+    config = Config()
+    config.quiet = True
+    index = LocalRegistryIndex(str(tmp_path), config=config)
+
+    assert index.fetch_versions('missing') == []
+    assert index.fetch_requirements('missing', '1.0.0') == []
+    assert capsys.readouterr().out == ''
+
+    LocalRegistryIndex(str(tmp_path)).fetch_versions('missing')
+    assert "не найден в локальном индексе" in capsys.readouterr().out
+
+
+def test_package_file_is_read_once_and_parsed_lazily(tmp_path, monkeypatch):
+    """Файл пакета читается один раз, JSON разбирается только для запрошенных версий"""
+    import registry_index
+
+    write_crate(tmp_path, 'log', [version('log', f"0.4.{patch}", [dep('cfg-if')]) for patch in range(50)]
+                + [version('log', '0.5.0', [], yanked=True)])
+    opened, parsed = [], []
+    real_open, real_loads = open, json.loads
+    monkeypatch.setattr(registry_index, 'open', lambda *args: opened.append(args[0]) or real_open(*args),
+                        raising=False)
+    monkeypatch.setattr(registry_index.json, 'loads', lambda line: parsed.append(line) or real_loads(line))
+    index = LocalRegistryIndex(str(tmp_path))
+
+    assert index.resolve_version('log') == '0.4.49'
+    assert len(index.fetch_versions('log')) == 50
+    assert index.fetch_features('log', '0.4.10') == {}
+    assert [r.name for r in index.fetch_requirements('log', '0.4.10')] == ['cfg-if']
+    assert len(opened) == 1
+    assert len(parsed) == 2
@@ -0,0 +1,65 @@
+import io
+import os
+import sys
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from dependency_graph import DependencyGraph
+from repo_reader import ParseStats, iter_block_format, iter_edge_list
+
+REPO_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_block_format_accepts_arbitrary_identifiers():
+    """Имена пакетов не ограничены одной заглавной буквой"""
+    text = "serde\nserde_derive\n\n# комментарий\nserde_derive\nproc-macro2\nsyn\n\nsyn\n"
+    stats = ParseStats()
+    edges = list(iter_block_format(io.StringIO(text), stats))
+
+    assert edges == [
+        ('serde', None), ('serde', 'serde_derive'),
+        ('serde_derive', None), ('serde_derive', 'proc-macro2'), ('serde_derive', 'syn'),
+        ('syn', None),
+    ]
+    assert (stats.packages, stats.edges) == (3, 3)
+
+
+def test_edge_list_format():
+    """Компактный формат: пакет и его зависимости в одной строке"""
+    text = "app log serde\nlog\napp rand\n"
+    edges = list(iter_edge_list(io.StringIO(text)))
+
+    assert edges == [('app', None), ('app', 'log'), ('app', 'serde'),
+                     ('log', None), ('app', None), ('app', 'rand')]
+
+
+def test_build_graph_from_bundled_test_repo():
+    """Тестовый репозиторий загружается с зависимостями и циклами"""
+    config = Config()
+    config.package_name = 'A'
+    config.test_mode = True
+    config.test_repo_path = os.path.join(REPO_DIR, 'test_repo.txt')
+    graph = DependencyGraph(config)
+    graph.build_graph()
+
+    assert graph.graph['A'] == ['B', 'C', 'D']
+    assert graph.graph['H'] == []
+    assert graph.cycle_groups == [['A', 'B', 'C']]
+
+
+def test_build_graph_keeps_only_reachable_packages(tmp_path):
+    """В граф попадают только пакеты, достижимые из начального"""
+    path = tmp_path / 'repo.edges'
+    path.write_text("tokio bytes mio\nmio libc\nunrelated libc\n", encoding='utf-8')
+    config = Config()
+    config.package_name = 'tokio'
+    config.test_mode = True
+    config.test_repo_path = str(path)
+    config.test_repo_format = 'edges'
+    graph = DependencyGraph(config)
+    graph.build_graph()
+
+    assert dict(graph.graph) == {'tokio': ['bytes', 'mio'], 'bytes': [], 'mio': ['libc'], 'libc': []}
+    assert graph.find_reverse_dependencies('libc') == ['mio']
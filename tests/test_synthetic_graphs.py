@@ -0,0 +1,38 @@
+import os
+import sys
+
+# Добавляем src и benchmarks в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from graph_algorithms import find_cycle_groups
+from graph_store import CompactGraph
+from run_benchmarks import run_benchmarks
+from synthetic_graphs import GENERATORS, generate, to_edges
+
+
+def test_generators_are_reproducible_and_rooted():
+    """Графы воспроизводимы по seed, и из узла 0 достижимы все узлы"""
+    for shape in GENERATORS:
+        adjacency = generate(shape, 500, seed=3)
+        assert adjacency == generate(shape, 500, seed=3)
+
+        store = CompactGraph.from_edges(to_edges(adjacency))
+        assert len(store.reachable_from([0])) == 500, shape
+
+
+def test_only_cyclic_shapes_contain_cycles():
+    """Циклы есть только в графе many_cycles"""
+    for shape in GENERATORS:
+        adjacency = generate(shape, 200)
+        groups = find_cycle_groups(dict(enumerate(adjacency)))
+        assert bool(groups) == (shape == 'many_cycles'), shape
+
+
+def test_benchmark_report_is_machine_readable():
+    """Отчет бенчмарков содержит время каждого этапа"""
+    report = run_benchmarks([10], ['deep_chain'])
+    phases = {result['phase'] for result in report['results']}
+
+    assert {'build_graph', 'cycle_detection', 'reverse_batch_100', 'mermaid', 'tree_printer'} <= phases
+    assert all(result['seconds'] >= 0 for result in report['results'])
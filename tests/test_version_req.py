@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from version_req import compatibility_key, parse_req, parse_version, sort_versions
+
+
+@pytest.mark.parametrize('req, matching, not_matching', [
+    ('1.2.3', ['1.2.3', '1.9.0'], ['1.2.2', '2.0.0']),
+    ('^0.2.3', ['0.2.3', '0.2.9'], ['0.3.0', '0.2.2']),
+    ('^0.0.3', ['0.0.3'], ['0.0.4']),
+    ('^0', ['0.0.1', '0.9.9'], ['1.0.0']),
+    ('~1.2', ['1.2.0', '1.2.9'], ['1.3.0']),
+    ('~1', ['1.0.0', '1.9.0'], ['2.0.0']),
+    ('=1.2', ['1.2.0', '1.2.7'], ['1.3.0']),
+    ('1.*', ['1.0.0', '1.5.1'], ['2.0.0', '0.9.0']),
+    ('*', ['0.0.1', '7.0.0'], ['1.0.0-alpha']),
+    ('>1.2', ['1.3.0'], ['1.2.9']),
+    ('<=1.2', ['1.2.9', '0.1.0'], ['1.3.0']),
+    ('>=1.2.0, <1.5', ['1.2.0', '1.4.9'], ['1.5.0', '1.1.0']),
+    ('^1.0.0-beta.2', ['1.0.0-beta.10', '1.0.0', '1.2.0'], ['1.0.0-beta.1', '1.1.0-rc.1']),
+    ('^1', ['1.0.0+build'], ['1.1.0-alpha']),
+])
+def test_requirement_matching(req, matching, not_matching):
+    """Требования Cargo: каретка по умолчанию, тильда, маски, диапазоны и пре-релизы"""
+    requirement = parse_req(req)
+    for version in matching:
+        assert requirement.matches(parse_version(version)), (req, version)
+    for version in not_matching:
+        assert not requirement.matches(parse_version(version)), (req, version)
+
+
+def test_version_ordering_and_best_match():
+    versions = sort_versions(['1.0.0', '1.0.0-rc.1', '1.0.0-alpha', '1.10.0', '1.9.0', 'junk', '0.9.0'])
+    assert [text for _, text in versions] == ['1.10.0', '1.9.0', '1.0.0', '1.0.0-rc.1', '1.0.0-alpha', '0.9.0']
+
+    assert parse_req('^1.0').best_match(versions) == '1.10.0'
+    assert parse_req('<1.5').best_match(versions) == '1.0.0'
+    assert parse_req('=1.0.0-rc.1').best_match(versions) == '1.0.0-rc.1'
+    assert parse_req('^2').best_match(versions) is None
+
+
+def test_compatibility_key_and_invalid_input():
+    assert compatibility_key(parse_version('1.4.2')) == compatibility_key(parse_version('1.0.0'))
+    assert compatibility_key(parse_version('0.2.1')) != compatibility_key(parse_version('0.3.0'))
+    assert compatibility_key(parse_version('0.0.3')) != compatibility_key(parse_version('0.0.4'))
+    with pytest.raises(ValueError):
+        parse_req('^one')
+    with pytest.raises(ValueError):
+        parse_version('1.2')
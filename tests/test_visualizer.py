@@ -0,0 +1,98 @@
+import gzip
+import io
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+# Добавляем src в путь для импорта
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config import Config
+from dependency_graph import DependencyGraph
+from visualizer import EXPORTERS, GraphVisualizer
+
+SAMPLE = {
+    'A': ['B', 'C'],
+    'B': ['D'],
+    'C': ['E', 'F'],
+    'D': [],
+    'E': ['C'],
+    'F': ['G "quoted"'],
+}
+
+
+def make_visualizer():
+    config = Config()
+    config.package_name = 'A'
+    graph = DependencyGraph(config)
+    graph.graph = SAMPLE
+    graph.find_cycle_groups()
+    return GraphVisualizer(graph)
+
+
+def export_to_string(visualizer, fmt):
+    out = io.StringIO()
+    EXPORTERS[fmt](visualizer.graph).write(out)
+    return out.getvalue()
+
+
+def test_json_export_roundtrip():
+    """JSON-экспорт восстанавливает исходный граф и группы циклов"""
+    data = json.loads(export_to_string(make_visualizer(), 'json'))
+
+    assert data['graph'] == SAMPLE
+    assert data['cycle_groups'] == [['C', 'E']]
+
+
+def test_graphml_export_is_valid_xml():
+    """GraphML разбирается XML-парсером, циклические ребра помечены"""
+    root = ET.fromstring(export_to_string(make_visualizer(), 'graphml'))
+    ns = {'g': 'http://graphml.graphdrawing.org/xmlns'}
+    edges = {
+        (edge.get('source'), edge.get('target')): edge.find('g:data', ns).text
+        for edge in root.iter('{http://graphml.graphdrawing.org/xmlns}edge')
+    }
+
+    assert len(root.findall('.//g:node', ns)) == 7
+    assert edges[('C', 'E')] == 'true'
+    assert edges[('F', 'G "quoted"')] == 'false'
+
+
+def test_dot_export_escapes_names():
+    """DOT экранирует кавычки и выделяет циклические ребра"""
+    text = export_to_string(make_visualizer(), 'dot')
+
+    assert '    "F" -> "G \\"quoted\\"";' in text
+    assert '    "E" -> "C" [color=red, style=dashed];' in text
+
+
+def test_mermaid_uses_safe_ids_for_versioned_nodes():
+    """Узлы name@version объявляются безопасными идентификаторами с подписью в кавычках"""
+    config = Config()
+    config.package_name = 'app@0.1.0'
+    graph = DependencyGraph(config)
+    graph.graph = {'app@0.1.0': ['serde@1.0.1'], 'serde@1.0.1': ['app@0.1.0']}
+    graph.find_cycle_groups()
+    visualizer = GraphVisualizer(graph)
+
+    lines = visualizer.generate_mermaid_graph().splitlines()
+    assert lines[1:4] == ['    n0["app@0.1.0"]', '    n1["serde@1.0.1"]', '    n0 -.-> n1']
+    assert not any('@' in line for line in lines if '["' not in line)
+
+    reverse = visualizer.generate_mermaid_reverse_graph('serde@1.0.1').splitlines()
+    target = next(line.split('[')[0].strip() for line in reverse if '["serde@1.0.1"]' in line)
+    assert reverse[-1] == f"    style {target} fill:#f9f,stroke:#333,stroke-width:2px"
+
+    quoted = export_to_string(make_visualizer(), 'mermaid')
+    assert '["G #quot;quoted#quot;"]' in quoted
+
+
+def test_export_detects_format_and_compresses(tmp_path):
+    """Формат определяется по расширению, .gz включает сжатие"""
+    visualizer = make_visualizer()
+    filename = str(tmp_path / 'graph.mmd.gz')
+    visualizer.export(filename)
+
+    with gzip.open(filename, 'rt', encoding='utf-8') as f:
+        assert f.read() == visualizer.generate_mermaid_graph() + "\n"